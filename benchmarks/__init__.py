@@ -0,0 +1,3 @@
+from dataPipelines import REPO_ROOT as _REPO_ROOT
+
+BENCHMARK_ROOT = _REPO_ROOT / "benchmarks"
@@ -0,0 +1,66 @@
+"""
+Startup cost of resolving spiders in the CLI, each case runs in a fresh interpreter
+
+    python -m benchmarks.bench_cli_startup [--runs 5] [--spiders-file-location paasJobs/crawler_schedule/tuesday.txt]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from textwrap import dedent
+
+from dataPipelines import REPO_ROOT
+
+CASES = {
+    "import cli": dedent("""
+        import dataPipelines.gc_scrapy.cli
+    """),
+    "registry lookup (plan)": dedent("""
+        from dataPipelines.gc_scrapy.cli import get_spider_entries, get_spiders_to_run
+        from dataPipelines.gc_scrapy.spider_registry import SpiderRegistry
+        get_spider_entries(get_spiders_to_run({spiders_file!r}), SpiderRegistry())
+    """),
+    "registry lookup + import listed spiders": dedent("""
+        from dataPipelines.gc_scrapy.cli import get_spider_entries, get_spiders_to_run, resolve_spiders
+        from dataPipelines.gc_scrapy.spider_registry import SpiderRegistry
+        resolve_spiders(get_spider_entries(get_spiders_to_run({spiders_file!r}), SpiderRegistry()))
+    """),
+    "import every spider module": dedent("""
+        from dataPipelines.gc_scrapy.cli import resolve_spider
+        from dataPipelines.gc_scrapy.schedule_balancer import list_spider_modules
+        for module_name in list_spider_modules():
+            resolve_spider(f"dataPipelines.gc_scrapy.gc_scrapy.spiders.{{module_name}}")
+    """),
+}
+
+
+def time_case(code: str) -> float:
+    timer = f"import time\n_start = time.perf_counter()\n{code}\nprint(time.perf_counter() - _start)\n"
+    result = subprocess.run(
+        [sys.executable, "-c", timer],
+        cwd=REPO_ROOT,
+        env={"PYTHONPATH": str(REPO_ROOT), "PATH": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--spiders-file-location", default=str(REPO_ROOT / "paasJobs" / "crawler_schedule" / "tuesday.txt")
+    )
+    args = parser.parse_args()
+
+    print(f"{'case':<45}{'median (s)':>12}{'min (s)':>12}")
+    for name, code in CASES.items():
+        code = code.format(spiders_file=args.spiders_file_location)
+        timings = [time_case(code) for _ in range(args.runs)]
+        print(f"{name:<45}{statistics.median(timings):>12.3f}{min(timings):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Memory per item of DocItem and CompactDocItem, each case runs in a fresh interpreter
+
+    python -m benchmarks.bench_item_memory [--items 50000] [--sub-files 20]
+
+Items have the fields a typical spider sets, with strings unique to each item. The nested zip cases measure the
+items create_items_from_nested_zip makes for an archive of sub_files documents, deepcopies before and copies now
+"""
+import argparse
+import json
+import subprocess
+import sys
+from textwrap import dedent
+
+from dataPipelines import REPO_ROOT
+
+CASES = {
+    "DocItem": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.items import DocItem
+        items = [DocItem(make_fields(i)) for i in range(count)]
+    """),
+    "CompactDocItem": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.items import CompactDocItem
+        items = [CompactDocItem(make_fields(i)) for i in range(count)]
+    """),
+    "nested zip, deepcopy": dedent("""
+        import copy
+        from dataPipelines.gc_scrapy.gc_scrapy.items import DocItem
+        zipped = DocItem(make_fields(0))
+        items = []
+        for i in range(count):
+            item = copy.deepcopy(zipped)
+            item["doc_name"] = f"EX {i} - Sub File"
+            item["version_hash_raw_data"]["doc_name"] = item["doc_name"]
+            items.append(item)
+    """),
+    "nested zip, copy on write": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.items import CompactDocItem
+        zipped = CompactDocItem(make_fields(0))
+        items = []
+        for i in range(count):
+            item = zipped.copy()
+            item["doc_name"] = f"EX {i} - Sub File"
+            item["version_hash_raw_data"] = {**zipped["version_hash_raw_data"], "doc_name": item["doc_name"]}
+            items.append(item)
+    """),
+}
+
+RUNNER = dedent("""
+    import json, tracemalloc
+
+    def make_fields(i):
+        url = f"https://example.local/pubs/{{i}}.pdf"
+        return {{
+            "doc_name": f"EX {{i}}", "doc_title": f"Example Document {{i}}", "doc_num": str(i), "doc_type": "EX",
+            "display_doc_type": "Document", "display_org": "Example Org", "display_source": "Example Source",
+            "display_title": f"EX {{i}} Example Document {{i}}", "data_source": "Example Source",
+            "source_title": "Example Title", "file_ext": "pdf", "publication_date": "2021-05-13",
+            "cac_login_required": False, "crawler_used": "bench_spider", "is_revoked": False,
+            "source_page_url": "https://example.local/pubs", "source_fqdn": "example.local", "download_url": url,
+            "downloadable_items": [{{"doc_type": "pdf", "download_url": url, "compression_type": None}}],
+            "version_hash_raw_data": {{"item_currency": f"{{i}}.pdf", "pub_date": "2021-05-13",
+                                      "document_title": f"Example Document {{i}}"}},
+            "version_hash": f"{{i:064x}}", "access_timestamp": "2021-05-13T16:55:48",
+        }}
+
+    # imported before tracing so the module isn't counted
+    import dataPipelines.gc_scrapy.gc_scrapy.items
+
+    count = {count}
+    tracemalloc.start()
+    {case}
+    current, _ = tracemalloc.get_traced_memory()
+    print(json.dumps({{"bytes_per_item": current / count}}))
+""")
+
+
+def run_case(code: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        env={"PYTHONPATH": str(REPO_ROOT), "PATH": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--sub-files", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'case':<28}{'bytes/item':>12}")
+    for name, case in CASES.items():
+        count = args.sub_files if name.startswith("nested zip") else args.items
+        r = run_case(RUNNER.format(count=count, case=case.strip()))
+        print(f"{name:<28}{r['bytes_per_item']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
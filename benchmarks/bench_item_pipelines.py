@@ -0,0 +1,100 @@
+"""
+Items per second through the staged item pipelines and FusedItemPipeline, each case runs in a fresh interpreter
+
+    python -m benchmarks.bench_item_pipelines [--items 100000] [--duplicate-every 10] [--invalid-every 20]
+
+Items pass through a Deferred chain of the pipelines the way Scrapy's ItemPipelineManager chains them.
+FileDownloadPipeline isn't included, it is the same in both
+"""
+import argparse
+import json
+import subprocess
+import sys
+from textwrap import dedent
+
+from dataPipelines import REPO_ROOT
+
+CASES = {
+    "staged (4 pipelines)": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.pipelines import (
+            AdditionalFieldsPipeline, DeduplicaterPipeline, FileNameFixerPipeline, ValidateJsonPipeline)
+        pipelines = [FileNameFixerPipeline(), DeduplicaterPipeline(), AdditionalFieldsPipeline(), ValidateJsonPipeline()]
+    """),
+    "fused": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.pipelines import FusedItemPipeline
+        pipelines = [FusedItemPipeline()]
+    """),
+}
+
+RUNNER = dedent("""
+    import json, time
+    from scrapy.exceptions import DropItem
+    from twisted.internet.defer import Deferred
+    from dataPipelines.gc_scrapy.gc_scrapy.items import DocItem
+
+    class BenchSpider:
+        name = "bench_spider"
+        start_urls = ["https://example.local/pubs"]
+        display_org = "Example Org"
+        data_source = "Example Source"
+        source_title = "Example Title"
+        display_source = "Example Display Source"
+
+    def make_item(i):
+        doc_name = f"EX/{{i - 1 if i % {duplicate_every} == 0 else i}}"
+        return DocItem(
+            doc_name=doc_name, doc_title="Title", doc_num=str(i), doc_type="EX", display_doc_type="Document",
+            display_title=f"EX {{i}}", file_ext="pdf", is_revoked=False,
+            download_url=f"https://example.local/pubs/{{i}}.pdf",
+            downloadable_items=[] if i % {invalid_every} == 0 else [
+                {{"doc_type": "pdf", "download_url": f"https://example.local/pubs/{{i}}.pdf",
+                  "compression_type": None}}],
+            version_hash_raw_data={{"item_currency": f"{{i}}.pdf"}}, version_hash=f"{{i:064x}}",
+        )
+
+    items = [make_item(i) for i in range(1, {items} + 1)]
+    spider = BenchSpider()
+    {case}
+
+    passed, dropped = [], []
+    start = time.perf_counter()
+    for item in items:
+        d = Deferred()
+        for pipeline in pipelines:
+            d.addCallback(pipeline.process_item, spider)
+        d.addCallbacks(passed.append, lambda f: dropped.append(f.trap(DropItem)))
+        d.callback(item)
+    seconds = time.perf_counter() - start
+    print(json.dumps({{"items_per_second": len(items) / seconds, "passed": len(passed), "dropped": len(dropped)}}))
+""")
+
+
+def run_case(code: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        env={"PYTHONPATH": str(REPO_ROOT), "PATH": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--duplicate-every", type=int, default=10)
+    parser.add_argument("--invalid-every", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'case':<24}{'items/s':>12}{'passed':>9}{'dropped':>9}")
+    for name, case in CASES.items():
+        code = RUNNER.format(items=args.items, duplicate_every=args.duplicate_every,
+                             invalid_every=args.invalid_every, case=case.strip())
+        r = run_case(code)
+        print(f"{name:<24}{r['items_per_second']:>12.0f}{r['passed']:>9}{r['dropped']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Items per second validating against output_spec.json, each case runs in a fresh interpreter
+
+    python -m benchmarks.bench_output_validation [--items 20000] [--invalid-every 20]
+
+Every invalid_every-th item is missing its doc_name, the rest are valid. "schema per item" is how
+JsonWriterPipeline validated before, reading the spec and building a Draft7Validator for every item
+"""
+import argparse
+import json
+import subprocess
+import sys
+from textwrap import dedent
+
+from dataPipelines import REPO_ROOT
+
+CASES = {
+    "schema per item": dedent("""
+        from jsonschema import Draft7Validator
+        from dataPipelines.gc_scrapy.gc_scrapy import OUTPUT_SPEC_PATH
+
+        def validate(item):
+            Draft7Validator(json.load(open(OUTPUT_SPEC_PATH))).validate(item)
+    """),
+    "shared Draft7Validator": dedent("""
+        from jsonschema import Draft7Validator
+        from dataPipelines.gc_scrapy.gc_scrapy import OUTPUT_SPEC_PATH
+        with open(OUTPUT_SPEC_PATH) as f:
+            validate = Draft7Validator(json.load(f)).validate
+    """),
+    "compiled (validators)": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.validators import DefaultOutputSchemaValidator
+        validate = DefaultOutputSchemaValidator().validate_dict
+    """),
+}
+
+RUNNER = dedent("""
+    import json, time
+    from jsonschema import ValidationError
+
+    def make_item(i):
+        item = {{
+            "doc_name": f"AFI {{i}}", "doc_title": "Air Force Standards", "doc_num": str(i), "doc_type": "AFI",
+            "display_doc_type": "Instruction", "display_org": "Dept. of the Air Force",
+            "display_source": "Air Force Publications", "display_title": f"AFI {{i}} Air Force Standards",
+            "data_source": "Air Force Publications", "source_title": "Air Force Publications", "file_ext": "pdf",
+            "publication_date": "2021-05-13", "cac_login_required": False, "crawler_used": "bench_spider",
+            "is_revoked": False, "source_page_url": "https://example.local/pubs", "source_fqdn": "example.local",
+            "download_url": f"https://example.local/pubs/{{i}}.pdf",
+            "downloadable_items": [{{"doc_type": "pdf", "download_url": f"https://example.local/pubs/{{i}}.pdf",
+                                    "compression_type": None}}],
+            "version_hash_raw_data": {{"item_currency": f"{{i}}.pdf"}}, "version_hash": f"{{i:064x}}",
+            "access_timestamp": "2021-05-13T16:55:48.734478",
+        }}
+        if i % {invalid_every} == 0:
+            del item["doc_name"]
+        return item
+
+    items = [make_item(i) for i in range(1, {items} + 1)]
+    {case}
+
+    invalid = 0
+    start = time.perf_counter()
+    for item in items:
+        try:
+            validate(item)
+        except ValidationError:
+            invalid += 1
+    seconds = time.perf_counter() - start
+    print(json.dumps({{"items_per_second": len(items) / seconds, "invalid": invalid}}))
+""")
+
+
+def run_case(code: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        env={"PYTHONPATH": str(REPO_ROOT), "PATH": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--invalid-every", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'case':<26}{'items/s':>12}{'invalid':>9}")
+    for name, case in CASES.items():
+        code = RUNNER.format(items=args.items, invalid_every=args.invalid_every, case=case.strip())
+        r = run_case(code)
+        print(f"{name:<26}{r['items_per_second']:>12.0f}{r['invalid']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Memory and lookup throughput of the previous hash filters at manifest scale, each case runs in a fresh interpreter
+
+    python -m benchmarks.bench_previous_hashes [--hashes 1000000] [--lookups 200000]
+
+Half of the lookups are hashes in the manifest, half are new ones. RSS after lookups includes the index pages
+the lookups touched
+"""
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from textwrap import dedent
+
+from dataPipelines import REPO_ROOT
+from dataPipelines.gc_scrapy.gc_scrapy.hash_index import build_hash_index
+
+CRAWLER = "bench_spider"
+
+CASES = {
+    "set (manifest_index)": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.manifest_index import ManifestIndex
+        hashes = ManifestIndex.from_file({manifest!r}).hashes_for({crawler!r})
+    """),
+    "mmap index": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.hash_index import HashIndex
+        hashes = HashIndex({index_dir!r}, use_bloom=False).hashes_for({crawler!r})
+    """),
+    "mmap index + bloom": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.hash_index import HashIndex
+        hashes = HashIndex({index_dir!r}, use_bloom=True).hashes_for({crawler!r})
+    """),
+}
+
+RUNNER = dedent("""
+    import hashlib, json, time
+
+    def rss_bytes():
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * {page_size}
+
+    first = {hashes} - {lookups} // 2
+    lookups = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(first, first + {lookups})]
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    {case}
+    load_seconds = time.perf_counter() - start
+    rss_after_load = rss_bytes()
+
+    start = time.perf_counter()
+    found = sum(h in hashes for h in lookups)
+    lookup_seconds = time.perf_counter() - start
+    print(json.dumps({{
+        "load_seconds": load_seconds,
+        "rss_mib": (rss_after_load - rss_before) / 2 ** 20,
+        "rss_after_lookups_mib": (rss_bytes() - rss_before) / 2 ** 20,
+        "lookups_per_second": len(lookups) / lookup_seconds,
+        "found": found,
+    }}))
+""")
+
+
+def write_manifest(location: Path, num_hashes: int) -> None:
+    with location.open(mode="w") as f:
+        for i in range(num_hashes):
+            version_hash = hashlib.sha256(str(i).encode()).hexdigest()
+            f.write(json.dumps({"version_hash": version_hash, "doc_name": f"doc {i}", "crawler_used": CRAWLER,
+                                "access_timestamp": "2022-01-01 00:00:00.000000"}))
+            f.write("\n")
+
+
+def run_case(code: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        env={"PYTHONPATH": str(REPO_ROOT), "PATH": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hashes", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    import resource
+    page_size = resource.getpagesize()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest = Path(tmp_dir, "cumulative-manifest.json")
+        index_dir = Path(tmp_dir, "index")
+        write_manifest(manifest, args.hashes)
+        build_hash_index(manifest, index_dir, bloom=True)
+        print(f"{args.hashes} hashes, manifest {manifest.stat().st_size / 2 ** 20:.0f} MiB, index "
+              f"{sum(p.stat().st_size for p in index_dir.iterdir()) / 2 ** 20:.1f} MiB on disk\n")
+
+        print(f"{'case':<24}{'load (s)':>10}{'RSS (MiB)':>12}{'RSS after lookups':>20}{'lookups/s':>12}{'hits':>9}")
+        for name, case in CASES.items():
+            code = RUNNER.format(
+                page_size=page_size,
+                hashes=args.hashes,
+                lookups=args.lookups,
+                case=case.format(manifest=str(manifest), index_dir=str(index_dir), crawler=CRAWLER).strip(),
+            )
+            r = run_case(code)
+            print(f"{name:<24}{r['load_seconds']:>10.2f}{r['rss_mib']:>12.1f}{r['rss_after_lookups_mib']:>20.1f}"
+                  f"{r['lookups_per_second']:>12.0f}{r['found']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Seconds to unpack a zip of zipped pdfs the way us_code's Title 42 is, each case runs in a fresh interpreter
+
+    python -m benchmarks.bench_unzip [--inner-zips 200] [--pdf-kb 512] [--threads 4]
+
+Every inner zip holds one pdf and a txt. "unzip_all" is how unzip_docs_as_needed unpacked before, extracting
+everything to a temp dir and moving the pdfs out of it
+"""
+import argparse
+import json
+import subprocess
+import sys
+from textwrap import dedent
+
+from dataPipelines import REPO_ROOT
+
+CASES = {
+    "unzip_all + safe_move_file": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.utils import extract_title_42_subfile_names, safe_move_file, unzip_all
+
+        def unpack(archive, output_path, threads):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                pdfs = sorted(f for f in unzip_all(archive, temp_dir) if f.suffix == ".pdf")
+                for pdf in pdfs:
+                    name = extract_title_42_subfile_names(pdf.name, archive.name)
+                    safe_move_file(pdf, output_path.parent / name)
+                return pdfs
+    """),
+    "streaming, 1 thread": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.utils import unzip_docs_as_needed
+
+        def unpack(archive, output_path, threads):
+            return unzip_docs_as_needed(archive, output_path, "pdf", threads=1)
+    """),
+    "streaming": dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.utils import unzip_docs_as_needed
+
+        def unpack(archive, output_path, threads):
+            return unzip_docs_as_needed(archive, output_path, "pdf", threads=threads)
+    """),
+}
+
+RUNNER = dedent("""
+    import io, json, os, random, tempfile, time, zipfile
+    from pathlib import Path
+
+    def zip_bytes(members):
+        f = io.BytesIO()
+        with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+            for name, data in members.items():
+                zip_ref.writestr(name, data)
+        return f.getvalue()
+
+    # half random, half repeated, so deflate has some work
+    rng = random.Random(0)
+    pdf = rng.randbytes({pdf_kb} * 512) + b"%PDF-1.7 stream" * ({pdf_kb} * 512 // 15)
+    members = {{}}
+    for i in range({inner_zips}):
+        name = f"usc42@ch{{i}}to{{i}}@Secs{{i}}to{{i}}"
+        members[f"{{name}}.zip"] = zip_bytes({{f"{{name}}.pdf": pdf, f"{{name}}.txt": b"notes" * 100}})
+    archive_bytes = zip_bytes(members)
+    {case}
+
+    with tempfile.TemporaryDirectory() as out:
+        archive = Path(out, "US Code Title 42.zip")
+        archive.write_bytes(archive_bytes)
+        start = time.perf_counter()
+        written = unpack(archive, Path(out, "US Code Title 42.pdf"), {threads})
+        seconds = time.perf_counter() - start
+    print(json.dumps({{"seconds": seconds, "pdfs": len(written)}}))
+""")
+
+
+def run_case(code: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        env={"PYTHONPATH": str(REPO_ROOT), "PATH": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inner-zips", type=int, default=200)
+    parser.add_argument("--pdf-kb", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'case':<30}{'seconds':>10}{'pdfs':>7}")
+    for name, case in CASES.items():
+        code = RUNNER.format(inner_zips=args.inner_zips, pdf_kb=args.pdf_kb, threads=args.threads, case=case.strip())
+        r = run_case(code)
+        print(f"{name:<30}{r['seconds']:>10.2f}{r['pdfs']:>7}")
+
+
+if __name__ == "__main__":
+    main()
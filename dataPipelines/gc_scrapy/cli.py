@@ -1,14 +1,36 @@
 import click
 from textwrap import dedent
 
-from scrapy.crawler import CrawlerRunner
+from scrapy import signals
+from scrapy.crawler import Crawler, CrawlerRunner
 import importlib
 import os
 from scrapy.utils.project import get_project_settings
 from scrapy.utils.spider import iter_spider_classes
 from twisted.internet import reactor, defer
 from dataPipelines.notification import slack
+from dataPipelines.gc_scrapy.gc_scrapy import SPIDER_REGISTRY_PATH
+from dataPipelines.gc_scrapy.gc_scrapy.hash_index import build_hash_index
+from dataPipelines.gc_scrapy.gc_scrapy.manifest_shards import shard_file_name, shard_manifests, SHARD_INDEX_FILE_NAME
+from dataPipelines.gc_scrapy.gc_scrapy.runspider_settings import fused_item_pipelines
+from dataPipelines.gc_scrapy.spider_registry import SpiderRegistry, build_spider_registry, import_spider, write_spider_registry
+from dataPipelines.gc_scrapy.manifest_store import ManifestStore
+from dataPipelines.gc_scrapy.run_state import CrawlRunState
+from dataPipelines.gc_scrapy.runtime_history import RuntimeHistory, DEFAULT_RUNTIME_HISTORY_LOCATION
+from dataPipelines.gc_scrapy.scheduling import order_longest_first, pack_longest_first, predict_wall_time
+from dataPipelines.gc_scrapy.schedule_balancer import (
+    DEFAULT_SCHEDULE_DIR,
+    balance_day_schedules,
+    get_spider_domains,
+    list_spider_modules,
+    read_day_schedules,
+    read_other_schedules,
+    spider_module_name,
+    write_day_schedules,
+)
 import copy
+import multiprocessing
+import shutil
 from pathlib import Path
 
 ####
@@ -47,14 +69,39 @@ def cli():
 )
 @click.option(
     '--previous-manifest-location',
-    help='File location of previous manifest',
+    help='File location of previous manifest, required unless a shard dir or hash index is given',
     type=click.Path(
         exists=True,
         file_okay=True,
         dir_okay=False,
         resolve_path=True
     ),
-    required=True
+    default=None,
+    required=False
+)
+@click.option(
+    '--previous-manifest-shard-dir',
+    help='Directory of per crawler previous manifest shards, each spider reads only its own',
+    type=click.Path(
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True
+    ),
+    default=None,
+    required=False
+)
+@click.option(
+    '--previous-hash-index-dir',
+    help='Directory of the previous hash index made by build-hash-index, filtered with instead of the previous manifest',
+    type=click.Path(
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True
+    ),
+    default=None,
+    required=False
 )
 @click.option(
     '--spiders-file-location',
@@ -89,14 +136,112 @@ def cli():
     required=False,
     type=click.BOOL
 )
+@click.option(
+    '--max-concurrent-spiders',
+    help='Number of spiders to run at once in the same reactor, 1 runs them sequentially',
+    type=click.IntRange(min=1),
+    default=1,
+    required=False
+)
+@click.option(
+    '--workers',
+    help='Number of OS processes to split the spiders across, each runs its own reactor',
+    type=click.IntRange(min=1),
+    default=1,
+    required=False
+)
+@click.option(
+    '--selenium-workers',
+    help='Number of dedicated worker processes for selenium spiders, 0 mixes them in with the other spiders',
+    type=click.IntRange(min=0),
+    default=0,
+    required=False
+)
+@click.option(
+    '--runtime-history-location',
+    help='File location of the per spider runtime history used to order spiders, updated after the run',
+    type=click.Path(
+        exists=False,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    default=DEFAULT_RUNTIME_HISTORY_LOCATION,
+    required=False
+)
+@click.option(
+    '--state-dir',
+    help='Directory to checkpoint the run in, a rerun skips finished spiders and resumes interrupted ones',
+    type=click.Path(
+        exists=False,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True
+    ),
+    default=None,
+    required=False
+)
+@click.option(
+    '--content-store-dir',
+    help='Content-addressed store of downloads, on the same filesystem as but outside the download output dir',
+    type=click.Path(
+        exists=False,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True
+    ),
+    default=None,
+    required=False
+)
+@click.option(
+    '--validator-cache-location',
+    help='SQLite cache of the ETag, Last-Modified and content hash of each download url, kept between runs',
+    type=click.Path(
+        exists=False,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    default=None,
+    required=False
+)
+@click.option(
+    '--listing-cache-location',
+    help='SQLite cache of listing pages and the items they led to, kept between runs to skip unchanged listings',
+    type=click.Path(
+        exists=False,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    default=None,
+    required=False
+)
+@click.option(
+    '--fused-item-pipeline',
+    help='Fix names, deduplicate, add fields and validate items in one pipeline stage instead of four',
+    is_flag=True,
+    default=False
+)
 def crawl(
     download_output_dir,
     crawler_output_location,
     previous_manifest_location,
+    previous_manifest_shard_dir,
+    previous_hash_index_dir,
     spiders_file_location,
     slack_hook_channel_id,
     slack_hook_url,
     dont_filter_previous_hashes,
+    max_concurrent_spiders,
+    workers,
+    selenium_workers,
+    runtime_history_location,
+    state_dir,
+    content_store_dir,
+    validator_cache_location,
+    listing_cache_location,
+    fused_item_pipeline,
 ):
     print(dedent(f"""
     CRAWLING INITIATED
@@ -105,12 +250,460 @@ def crawl(
     download_output_dir={download_output_dir}
     crawler_output_location={crawler_output_location}
     previous_manifest_location={previous_manifest_location}
+    previous_manifest_shard_dir={previous_manifest_shard_dir}
+    previous_hash_index_dir={previous_hash_index_dir}
     spiders_file_location={spiders_file_location}
     slack_hook_channel_id={slack_hook_channel_id}
     slack_hook_url={slack_hook_url}
     dont_filter_previous_hashes={dont_filter_previous_hashes}
+    max_concurrent_spiders={max_concurrent_spiders}
+    workers={workers}
+    selenium_workers={selenium_workers}
+    runtime_history_location={runtime_history_location}
+    state_dir={state_dir}
+    content_store_dir={content_store_dir}
+    validator_cache_location={validator_cache_location}
+    listing_cache_location={listing_cache_location}
+    fused_item_pipeline={fused_item_pipeline}
     """))
 
+    if not (previous_manifest_location or previous_manifest_shard_dir or previous_hash_index_dir
+            or dont_filter_previous_hashes):
+        raise click.UsageError(
+            'Pass --previous-manifest-location, --previous-manifest-shard-dir or --previous-hash-index-dir, '
+            'or --dont-filter-previous-hashes=true')
+
+    spiders_to_run = get_spiders_to_run(spiders_file_location)
+
+    print('Done resolving spiders, will run', len(spiders_to_run))
+    for s in spiders_to_run:
+        print(' - ', s)
+    print()
+
+    spider_entries = get_spider_entries(spiders_to_run, SpiderRegistry())
+    runtime_history = RuntimeHistory(runtime_history_location)
+
+    run_state = None
+    if state_dir:
+        run_state = CrawlRunState(state_dir)
+        run_state.start_run([entry['name'] for entry in spider_entries])
+        for entry in spider_entries:
+            if run_state.is_completed(entry['name']):
+                print(f'{entry["name"]} already finished in this run, skipping')
+        spider_entries = [entry for entry in spider_entries if not run_state.is_completed(entry['name'])]
+        if not spider_entries:
+            print('Every spider already finished in this run, nothing to crawl')
+            run_state.finish_run()
+            return
+
+    crawl_kwargs = {
+        'download_output_dir': download_output_dir,
+        'previous_manifest_location': previous_manifest_location,
+        'previous_manifest_shard_dir': previous_manifest_shard_dir,
+        'previous_hash_index_location': previous_hash_index_dir,
+        'content_store_location': content_store_dir,
+        'validator_cache_location': validator_cache_location,
+        'listing_cache_location': listing_cache_location,
+        'dont_filter_previous_hashes': dont_filter_previous_hashes,
+        'output': crawler_output_location
+    }
+
+    all_stats = None
+    if workers > 1 or selenium_workers:
+        try:
+            all_stats = run_crawl_workers(
+                spider_entries, crawl_kwargs, workers, selenium_workers, max_concurrent_spiders, runtime_history,
+                state_dir, fused_item_pipeline)
+        except Exception as e:
+            print("ERROR RUNNING SPIDERS IN WORKER PROCESSES", e)
+
+    elif max_concurrent_spiders > 1:
+        runner = CrawlerRunner(get_crawl_settings(crawler_output_location, fused_item_pipeline))
+
+        spider_class_refs = resolve_spiders(order_longest_first(
+            spider_entries, lambda entry: runtime_history.predict_elapsed(entry['name'])))
+        try:
+            queue_spiders_concurrently(runner, spider_class_refs, crawl_kwargs, max_concurrent_spiders, run_state)
+            reactor.run()
+            all_stats = copy.deepcopy(spider_class_refs[0].stats)
+        except Exception as e:
+            print("ERROR RUNNING SPIDERS CONCURRENTLY", e)
+
+    else:
+        runner = CrawlerRunner(get_crawl_settings(crawler_output_location, fused_item_pipeline))
+
+        spider_class_refs = resolve_spiders(spider_entries)
+        try:
+            queue_spiders_sequentially(runner, spider_class_refs, crawl_kwargs, run_state)
+            reactor.run()
+            all_stats = copy.deepcopy(spider_class_refs[0].stats)
+        except Exception as e:
+            print("ERROR RUNNING SPIDERS SEQUENTIALLY", e)
+
+    if run_state:
+        # kept when a spider or worker failed, the next run with this state dir resumes the unfinished spiders
+        run_state.finish_run()
+
+    if all_stats is not None:
+        send_stats(all_stats=all_stats, slack_hook_channel_id=slack_hook_channel_id, slack_hook_url=slack_hook_url)
+        try:
+            runtime_history.record_stats(all_stats)
+            runtime_history.save()
+        except Exception as e:
+            print('Error saving runtime history', e)
+
+
+@cli.command(name='plan')
+@click.option(
+    '--spiders-file-location',
+    help='Location of the file listing spiders to run, all spiders if not given',
+    type=click.Path(
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    default=None,
+    required=False
+)
+@click.option(
+    '--workers',
+    help='Number of worker processes the spiders would be split across',
+    type=click.IntRange(min=1),
+    default=1,
+    required=False
+)
+@click.option(
+    '--max-concurrent-spiders',
+    help='Number of spiders that would run at once in each worker',
+    type=click.IntRange(min=1),
+    default=1,
+    required=False
+)
+@click.option(
+    '--runtime-history-location',
+    help='File location of the per spider runtime history',
+    type=click.Path(
+        exists=False,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    default=DEFAULT_RUNTIME_HISTORY_LOCATION,
+    required=False
+)
+def plan(spiders_file_location, workers, max_concurrent_spiders, runtime_history_location):
+    """Prints the predicted wall time of a crawl from the runtime history"""
+    runtime_history = RuntimeHistory(runtime_history_location)
+    spider_entries = get_spider_entries(get_spiders_to_run(spiders_file_location), SpiderRegistry())
+    spider_names = [entry['name'] for entry in spider_entries]
+
+    def duration(spider_name):
+        return runtime_history.predict_elapsed(spider_name)
+
+    print(f'Predicted elapsed time per spider ({runtime_history.location}):')
+    for spider_name in order_longest_first(spider_names, duration):
+        known = '' if runtime_history.known_elapsed(spider_name) is not None else ' (no history)'
+        print(f' - {spider_name}: {duration(spider_name):.0f}s{known}')
+
+    wall_time = 0.0
+    for i, partition in enumerate(pack_longest_first(spider_names, workers, duration)):
+        worker_wall_time = predict_wall_time([duration(name) for name in partition], max_concurrent_spiders)
+        wall_time = max(wall_time, worker_wall_time)
+        if workers > 1:
+            print(f'worker{i}: {worker_wall_time:.0f}s - {", ".join(partition)}')
+
+    print(f'Predicted wall time: {wall_time:.0f}s ({wall_time / 60:.1f} minutes)')
+
+
+@cli.command(name='balance-schedule')
+@click.option(
+    '--schedule-dir',
+    help='Directory with the <day>.txt schedule files to rebalance',
+    type=click.Path(
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True
+    ),
+    default=str(DEFAULT_SCHEDULE_DIR),
+    required=False
+)
+@click.option(
+    '--output-dir',
+    help='Directory to write the rebalanced <day>.txt files to, defaults to --schedule-dir',
+    type=click.Path(
+        exists=False,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True
+    ),
+    default=None,
+    required=False
+)
+@click.option(
+    '--runtime-history-location',
+    help='File location of the per spider runtime history',
+    type=click.Path(
+        exists=False,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    default=DEFAULT_RUNTIME_HISTORY_LOCATION,
+    required=False
+)
+def balance_schedule(schedule_dir, output_dir, runtime_history_location):
+    """Rebalances the day schedule files so the longest day is as short as possible"""
+    runtime_history = RuntimeHistory(runtime_history_location)
+    day_schedules = read_day_schedules(schedule_dir)
+
+    # every spider has to stay in some schedule, unscheduled ones are added to the days
+    entries = [entry for day_entries in day_schedules.values() for entry in day_entries]
+    scheduled = {spider_module_name(entry) for entry in entries + read_other_schedules(schedule_dir)}
+    for module_name in list_spider_modules():
+        if module_name not in scheduled:
+            print(f'{module_name} is not in a schedule, adding it')
+            entries.append(f'{module_name}.py')
+
+    spider_registry = SpiderRegistry()
+    spider_names = {}
+    spider_domains = {}
+    for entry in entries:
+        registry_entry = spider_registry.get(entry)
+        if registry_entry:
+            spider_names[entry] = registry_entry['name']
+            spider_domains[entry] = get_spider_domains(
+                registry_entry['allowed_domains'], registry_entry['start_urls'])
+        else:
+            print(f'{entry} is not in the spider registry, scheduling it without history or domains')
+            spider_names[entry] = spider_module_name(entry)
+            spider_domains[entry] = []
+
+    def duration(entry):
+        return runtime_history.predict_elapsed(spider_names[entry])
+
+    def print_schedules(title, schedules):
+        print(title)
+        for day, day_entries in schedules.items():
+            total = sum(duration(entry) for entry in day_entries)
+            print(f' - {day}: {total:.0f}s - {", ".join(spider_module_name(e) for e in day_entries)}')
+        longest = max(sum(duration(entry) for entry in day_entries) for day_entries in schedules.values())
+        print(f'Longest day: {longest:.0f}s ({longest / 60:.1f} minutes)')
+        print()
+
+    balanced = balance_day_schedules(entries, duration, spider_domains.get)
+
+    print_schedules('Current schedule:', day_schedules)
+    print_schedules('Balanced schedule:', balanced)
+
+    output_dir = output_dir or schedule_dir
+    write_day_schedules(balanced, output_dir)
+    print('Wrote balanced schedule files to', output_dir)
+
+
+@cli.command(name='build-registry')
+def build_registry():
+    """Regenerates the spider registry from the spider module sources"""
+    registry = build_spider_registry()
+    write_spider_registry(registry)
+    print(f'Wrote {len(registry)} spiders to {SPIDER_REGISTRY_PATH}')
+
+
+@cli.command(name='build-hash-index')
+@click.option(
+    '--previous-manifest-location',
+    help='File location of the cumulative manifest to index',
+    type=click.Path(
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    required=True
+)
+@click.option(
+    '--index-dir',
+    help='Directory to write the per crawler hash shards to, for crawl --previous-hash-index-dir',
+    type=click.Path(
+        exists=False,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True
+    ),
+    required=True
+)
+@click.option(
+    '--bloom/--no-bloom',
+    help='Write a Bloom filter with each shard, only faster when most lookups are for new hashes',
+    default=False
+)
+def build_previous_hash_index(previous_manifest_location, index_dir, bloom):
+    """Builds the compact previous hash index from a cumulative manifest"""
+    counts = build_hash_index(previous_manifest_location, index_dir, bloom=bloom)
+    print(f'Wrote {sum(counts.values())} hashes for {len(counts)} crawlers to {index_dir}')
+
+
+MANIFEST_STORE_OPTION = click.option(
+    '--store-location',
+    help='File location of the SQLite manifest store, created if it does not exist',
+    type=click.Path(
+        exists=False,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    required=True
+)
+
+
+@cli.group(name='manifest')
+def manifest():
+    """Manage the SQLite store the cumulative manifest is kept in"""
+    pass
+
+
+@manifest.command(name='import')
+@MANIFEST_STORE_OPTION
+@click.argument(
+    'manifest_locations',
+    nargs=-1,
+    required=True,
+    type=click.Path(
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    )
+)
+def manifest_import(store_location, manifest_locations):
+    """Adds json lines manifests (gzipped if named .gz) to the store, versions already in it are skipped"""
+    with ManifestStore(store_location) as store:
+        for manifest_location in manifest_locations:
+            added = store.import_jsonl(manifest_location)
+            print(f'Imported {added} new records from {manifest_location}')
+        print(f'{store.count()} records in {store_location}')
+
+
+@manifest.command(name='compact')
+@MANIFEST_STORE_OPTION
+@click.option(
+    '--keep-versions',
+    help='Number of most recently accessed versions to keep per crawler and document',
+    type=click.IntRange(min=1),
+    required=True
+)
+def manifest_compact(store_location, keep_versions):
+    """Removes all but the latest versions of each document"""
+    with ManifestStore(store_location) as store:
+        removed = store.compact(keep_versions)
+        print(f'Removed {removed} records, {store.count()} left in {store_location}')
+
+
+@manifest.command(name='export')
+@MANIFEST_STORE_OPTION
+@click.option(
+    '--output-location',
+    help='File location to write the json lines manifest to, gzipped if it ends in .gz',
+    type=click.Path(
+        exists=False,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    required=True
+)
+@click.option(
+    '--crawler-used',
+    help='Only export records of this crawler',
+    type=str,
+    default=None,
+    required=False
+)
+@click.option(
+    '--since',
+    help='Only export records accessed at or after this timestamp, e.g. "2022-01-01"',
+    type=str,
+    default=None,
+    required=False
+)
+def manifest_export(store_location, output_location, crawler_used, since):
+    """Writes the store as a json lines manifest, in the format of the cumulative manifest"""
+    with ManifestStore(store_location) as store:
+        count = store.export_jsonl(output_location, crawler_used=crawler_used, since=since)
+        print(f'Exported {count} records to {output_location}')
+
+
+@manifest.command(name='shard')
+@click.option(
+    '--shard-dir',
+    help='Directory of per crawler manifest shards to append to, created if it does not exist',
+    type=click.Path(
+        exists=False,
+        file_okay=False,
+        dir_okay=True,
+        resolve_path=True
+    ),
+    required=True
+)
+@click.argument(
+    'manifest_locations',
+    nargs=-1,
+    required=True,
+    type=click.Path(
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    )
+)
+def manifest_shard(shard_dir, manifest_locations):
+    """Appends json lines manifests to the shards of their crawlers, e.g. a run's manifest.json or, once, the cumulative manifest"""
+    appended = shard_manifests(manifest_locations, shard_dir)
+    print(f'Appended {sum(appended.values())} records to {len(appended)} shards in {shard_dir}')
+
+
+@manifest.command(name='shard-names')
+@click.option(
+    '--spiders-file-location',
+    help='Location of the file listing spiders to run, all spiders if not given',
+    type=click.Path(
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    default=None,
+    required=False
+)
+@click.option(
+    '--output-location',
+    help='File to write the shard file names to, one per line',
+    type=click.Path(
+        exists=False,
+        file_okay=True,
+        dir_okay=False,
+        resolve_path=True
+    ),
+    required=True
+)
+def manifest_shard_names(spiders_file_location, output_location):
+    """Lists the shard index and the shard files the spiders to run read, for jobs to fetch only those"""
+    spider_entries = get_spider_entries(get_spiders_to_run(spiders_file_location), SpiderRegistry())
+    names = [SHARD_INDEX_FILE_NAME, shard_file_name('')] + [shard_file_name(entry['name']) for entry in spider_entries]
+    with open(output_location, 'w') as f:
+        f.writelines(f'{name}\n' for name in names)
+    print(f'Wrote {len(names)} shard file names to {output_location}')
+
+
+def get_spiders_to_run(spiders_file_location: str = None) -> list:
+    """
+    Args:
+        spiders_file_location: file listing spider module names, one per line
+
+    Returns:
+        list of spider module names from the file, or every module in gc_scrapy/spiders if no file is given
+    """
     current_dir = os.path.dirname(os.path.realpath(__file__))
     spiders_to_run = []
     if spiders_file_location:
@@ -132,43 +725,48 @@ def crawl(
         else:
             raise RuntimeError('NO SPIDERS FOUND IN SPIDERS DIR... EXITING')
 
-    print('Done resolving spiders, will run', len(spiders_to_run))
-    for s in spiders_to_run:
-        print(' - ', s)
-    print()
+    return spiders_to_run
 
-    settings = get_project_settings()
-    settings.set('FEED_URI', crawler_output_location)
-    runner = CrawlerRunner(settings)
 
-    spider_class_refs = []
+def get_spider_entries(spiders_to_run: list, spider_registry: SpiderRegistry) -> list:
+    """
+    Args:
+        spiders_to_run: list of spider module names from gc_scrapy/spiders
+        spider_registry: registry to look the modules up in
+
+    Returns:
+        list of spider registry entries, modules not in the registry are skipped
+    """
+    spider_entries = []
     for spider_module_name in spiders_to_run:
+        entry = spider_registry.get(spider_module_name)
+        if not entry:
+            print(f'No spider found for {spider_module_name} in the spider registry, skipping')
+            continue
+        spider_entries.append(entry)
+
+    return spider_entries
+
+
+def resolve_spiders(spider_entries: list) -> list:
+    """
+    Imports only the modules of the given spiders
+
+    Args:
+        spider_entries: list of spider registry entries
+
+    Returns:
+        list of spider class references, spiders that fail to import are skipped
+    """
+    spider_class_refs = []
+    for entry in spider_entries:
         try:
-            spider_path = f'dataPipelines.gc_scrapy.gc_scrapy.spiders.{spider_module_name}'
-            spider_class = resolve_spider(spider_path)
-            if not spider_class:
-                print(f'Failed to resolve spider from {spider_path}, skipping')
-                continue
-            spider_class_refs.append(spider_class)
+            spider_class_refs.append(import_spider(entry))
         except Exception as e:
-            print(e)
-            print('Error running spider at path', spider_path)
-            raise e
+            print('Error getting spider to run:', e)
+            print('Skipping', entry['module'], 'because of error')
 
-    crawl_kwargs = {
-        'download_output_dir': download_output_dir,
-        'previous_manifest_location': previous_manifest_location,
-        'dont_filter_previous_hashes': dont_filter_previous_hashes,
-        'output': crawler_output_location
-    }
-
-    try:
-        queue_spiders_sequentially(runner, spider_class_refs, crawl_kwargs)
-        reactor.run()
-        all_stats = copy.deepcopy(spider_class_refs[0].stats)
-        send_stats(all_stats=all_stats, slack_hook_channel_id=slack_hook_channel_id, slack_hook_url=slack_hook_url)
-    except Exception as e:
-        print("ERROR RUNNING SPIDERS SEQUENTIALLY", e)
+    return spider_class_refs
 
 
 def get_git_branch() -> str:
@@ -208,20 +806,62 @@ def send_stats(all_stats: dict, slack_hook_channel_id: str, slack_hook_url: str)
         print('Slack send error', e)
 
 
+def get_crawl_settings(crawler_output_location: str, fused_item_pipeline: bool = False):
+    """
+    Args:
+        crawler_output_location: FEED_URI of the crawlers
+        fused_item_pipeline: replace the spiders' ITEM_PIPELINES with runspider_settings.fused_item_pipelines
+
+    Returns:
+        project settings for a CrawlerRunner
+    """
+    settings = get_project_settings()
+    settings.set('FEED_URI', crawler_output_location)
+    if fused_item_pipeline:
+        # cmdline priority so it wins over the ITEM_PIPELINES in spider custom_settings
+        settings.set('ITEM_PIPELINES', fused_item_pipelines, priority='cmdline')
+    return settings
+
+
+def create_crawler(runner: CrawlerRunner, spider, feed_uri: str = None, run_state: CrawlRunState = None) -> Crawler:
+    """
+    Args:
+        runner: CrawlerRunner whose settings the crawler gets a copy of
+        spider: spider class reference
+        feed_uri: crawler output location for this crawler only, the runner's FEED_URI if not given
+        run_state: if given the spider keeps its requests in its own JOBDIR and is marked completed when it finishes
+
+    Returns:
+        Crawler to pass CrawlerRunner.crawl
+    """
+    settings = runner.settings.copy()
+    if feed_uri:
+        settings.set('FEED_URI', feed_uri)
+    if run_state:
+        settings.set('JOBDIR', run_state.get_jobdir(spider.name))
+
+    crawler = Crawler(spider, settings)
+    if run_state:
+        crawler.signals.connect(run_state.spider_closed, signal=signals.spider_closed)
+    return crawler
+
+
 @defer.inlineCallbacks
-def queue_spiders_sequentially(runner: CrawlerRunner, spiders: list, crawl_kwargs: dict) -> None:
+def queue_spiders_sequentially(runner: CrawlerRunner, spiders: list, crawl_kwargs: dict,
+                               run_state: CrawlRunState = None) -> None:
     """
     Args:
         runner: CrawlerRunner instance
         spiders: list of spider class references to run
         crawl_kwards: dict of args to pass CrawlerRunner
+        run_state: optional checkpoint state of the run
     """
 
     try:
         for spider in spiders:
             try:
                 yield runner.crawl(
-                    spider,
+                    create_crawler(runner, spider, run_state=run_state),
                     **crawl_kwargs
                 )
             except Exception as e:
@@ -236,6 +876,220 @@ def queue_spiders_sequentially(runner: CrawlerRunner, spiders: list, crawl_kwarg
             exit(1)
 
 
+def get_feed_shard_location(crawler_output_location: str, shard_name: str) -> str:
+    """
+    Args:
+        crawler_output_location: final crawler output file
+        shard_name: name unique to the crawler/worker writing the shard
+
+    Returns:
+        file location for a partial crawler output that is merged in to crawler_output_location
+    """
+    return f'{crawler_output_location}.{shard_name}.part'
+
+
+def merge_feed_shards(shard_locations: list, crawler_output_location: str) -> None:
+    """
+    Appends each jsonlines shard to crawler_output_location and removes the shard
+
+    Args:
+        shard_locations: list of partial crawler output files
+        crawler_output_location: final crawler output file
+    """
+    with open(crawler_output_location, 'ab') as output:
+        for shard_location in shard_locations:
+            if not os.path.isfile(shard_location):
+                continue
+            with open(shard_location, 'rb') as shard:
+                shutil.copyfileobj(shard, output)
+            os.remove(shard_location)
+
+
+@defer.inlineCallbacks
+def queue_spiders_concurrently(runner: CrawlerRunner, spiders: list, crawl_kwargs: dict, max_concurrent: int,
+                               run_state: CrawlRunState = None) -> None:
+    """
+    Runs up to max_concurrent spiders at once, the next queued spider starts as soon as one finishes.
+    Each spider writes its feed to its own shard which is merged in to crawl_kwargs['output'] at the end.
+
+    Args:
+        runner: CrawlerRunner instance
+        spiders: list of spider class references to run
+        crawl_kwargs: dict of args to pass CrawlerRunner
+        max_concurrent: max number of spiders crawling at the same time
+        run_state: optional checkpoint state of the run
+    """
+    crawler_output_location = crawl_kwargs['output']
+    shard_locations = []
+    semaphore = defer.DeferredSemaphore(max_concurrent)
+
+    def crawl_spider(spider):
+        shard_location = get_feed_shard_location(crawler_output_location, spider.name)
+        shard_locations.append(shard_location)
+
+        d = runner.crawl(
+            create_crawler(runner, spider, feed_uri=shard_location, run_state=run_state),
+            **crawl_kwargs
+        )
+
+        def log_error(failure):
+            print(f'ERROR RUNNING SPIDER CLASS: {spider}')
+            print(failure.value)
+
+        d.addErrback(log_error)
+        return d
+
+    try:
+        yield defer.DeferredList(
+            [semaphore.run(crawl_spider, spider) for spider in spiders]
+        )
+    finally:
+        print("Done running spiders, merging outputs, stopping twisted.reactor and sending stats")
+        try:
+            merge_feed_shards(shard_locations, crawler_output_location)
+        except Exception as e:
+            print('Error merging crawler output shards', e)
+        try:
+            reactor.stop()
+        except Exception as e:
+            print(e)
+            exit(1)
+
+
+def get_manifest_shard_location(download_output_dir: str, shard_name: str) -> str:
+    """
+    Args:
+        download_output_dir: directory the job manifest.json is written to
+        shard_name: name unique to the worker writing the shard
+
+    Returns:
+        file location for a partial job manifest that is merged in to manifest.json
+    """
+    return os.path.join(download_output_dir, f'manifest.{shard_name}.json')
+
+
+def partition_spiders(spiders: list, num_partitions: int, duration=None) -> list:
+    """
+    Args:
+        spiders: list of spiders, e.g. registry entries
+        num_partitions: number of groups to split the spiders in to
+        duration: optional function returning the predicted run time of a spider, packs longest first if given
+
+    Returns:
+        list of non-empty spider lists, assigned round robin when no duration is given
+    """
+    if duration:
+        partitions = pack_longest_first(spiders, num_partitions, duration)
+    else:
+        partitions = [spiders[i::num_partitions] for i in range(num_partitions)]
+    return [p for p in partitions if p]
+
+
+def run_crawl_worker(worker_name: str, spider_entries: list, crawl_kwargs: dict, max_concurrent_spiders: int,
+                     state_dir: str = None, fused_item_pipeline: bool = False) -> dict:
+    """
+    Entrypoint for a crawl worker process. Runs the spiders in a fresh reactor, writing the crawler output and
+    job manifest to shards named after the worker.
+
+    Args:
+        worker_name: name unique to this worker, used for shard file names
+        spider_entries: list of spider registry entries to run, only their modules are imported
+        crawl_kwargs: dict of args to pass CrawlerRunner
+        max_concurrent_spiders: max number of spiders crawling at the same time in this worker
+        state_dir: optional run state directory shared with the other workers
+        fused_item_pipeline: run the fused item pipeline stage instead of the staged pipelines
+
+    Returns:
+        stats collected by the spiders keyed by spider name
+    """
+    crawler_output_location = get_feed_shard_location(crawl_kwargs['output'], worker_name)
+    worker_crawl_kwargs = {
+        **crawl_kwargs,
+        'output': crawler_output_location,
+        'job_manifest_location': get_manifest_shard_location(crawl_kwargs['download_output_dir'], worker_name),
+    }
+
+    spiders = resolve_spiders(spider_entries)
+    if not spiders:
+        print(f'[{worker_name}] No spiders resolved, nothing to run')
+        return {}
+
+    print(f'[{worker_name}] Running spiders:', ', '.join(spider.name for spider in spiders))
+
+    runner = CrawlerRunner(get_crawl_settings(crawler_output_location, fused_item_pipeline))
+    run_state = CrawlRunState(state_dir) if state_dir else None
+
+    if max_concurrent_spiders > 1:
+        queue_spiders_concurrently(runner, spiders, worker_crawl_kwargs, max_concurrent_spiders, run_state)
+    else:
+        queue_spiders_sequentially(runner, spiders, worker_crawl_kwargs, run_state)
+    reactor.run()
+
+    return copy.deepcopy(spiders[0].stats)
+
+
+def run_crawl_workers(spider_entries: list, crawl_kwargs: dict, workers: int, selenium_workers: int,
+                      max_concurrent_spiders: int, runtime_history: RuntimeHistory = None,
+                      state_dir: str = None, fused_item_pipeline: bool = False) -> dict:
+    """
+    Splits the spiders across worker processes and merges their crawler output and manifest shards once all are done
+
+    Args:
+        spider_entries: list of spider registry entries to run, imported only in the workers that run them
+        crawl_kwargs: dict of args to pass CrawlerRunner
+        workers: number of worker processes for spiders
+        selenium_workers: number of worker processes dedicated to selenium spiders, 0 to mix them with the rest
+        max_concurrent_spiders: max number of spiders crawling at the same time in each worker
+        runtime_history: used to pack spiders across workers longest first, round robin if not given
+        state_dir: optional run state directory, passed on to every worker
+        fused_item_pipeline: passed on to every worker
+
+    Returns:
+        stats collected by all spiders keyed by spider name
+    """
+    if selenium_workers:
+        selenium_spiders = [entry for entry in spider_entries if entry['selenium']]
+        http_spiders = [entry for entry in spider_entries if not entry['selenium']]
+    else:
+        selenium_spiders = []
+        http_spiders = spider_entries
+
+    duration = None
+    if runtime_history:
+        def duration(entry):
+            return runtime_history.predict_elapsed(entry['name'])
+
+    worker_args = []
+    for i, partition in enumerate(partition_spiders(http_spiders, workers, duration)):
+        worker_args.append((f'worker{i}', partition, crawl_kwargs, max_concurrent_spiders, state_dir,
+                            fused_item_pipeline))
+    for i, partition in enumerate(partition_spiders(selenium_spiders, selenium_workers or 1, duration)):
+        worker_args.append((f'selenium_worker{i}', partition, crawl_kwargs, max_concurrent_spiders, state_dir,
+                            fused_item_pipeline))
+
+    print(f'Running spiders in {len(worker_args)} worker processes')
+
+    all_stats = {}
+    # spawn so each worker gets a clean reactor, one task per child since a reactor can't be restarted
+    ctx = multiprocessing.get_context('spawn')
+    try:
+        with ctx.Pool(processes=len(worker_args), maxtasksperchild=1) as pool:
+            for worker_stats in pool.starmap(run_crawl_worker, worker_args):
+                all_stats.update(worker_stats)
+    finally:
+        worker_names = [args[0] for args in worker_args]
+        merge_feed_shards(
+            [get_feed_shard_location(crawl_kwargs['output'], name) for name in worker_names],
+            crawl_kwargs['output']
+        )
+        merge_feed_shards(
+            [get_manifest_shard_location(crawl_kwargs['download_output_dir'], name) for name in worker_names],
+            os.path.join(crawl_kwargs['download_output_dir'], 'manifest.json')
+        )
+
+    return all_stats
+
+
 def resolve_spider(spider_path):
     """
     Args:
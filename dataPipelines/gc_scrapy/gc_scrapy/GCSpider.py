@@ -7,6 +7,7 @@ from os.path import splitext
 from time import perf_counter
 import urllib
 from dataPipelines.gc_scrapy.gc_scrapy.runspider_settings import general_settings
+from dataPipelines.gc_scrapy.gc_scrapy.listing_cache import listing_key, normalize_listing_body
 import copy
 
 url_re = re.compile("((http|https)://)(www.)?" +
@@ -28,6 +29,7 @@ UNKNOWN_FILE_EXTENSION_PLACEHOLDER = "UNKNOWN"
 STATS_BASE = {
     "Required CAC": 0,
     "In Previous Hashes": 0,
+    "Skipped Detail Requests": 0,
 }
 
 
@@ -54,6 +56,7 @@ class GCSpider(scrapy.Spider):
         from_default_stats = {
             "elapsed_time_seconds": "Elapsed Time (sec)",
             "item_scraped_count": "Item Scraped Count",
+            "downloader/response_bytes": "Bytes Downloaded",
         }
 
         for k, v in spider.crawler.stats._stats.items():
@@ -69,13 +72,40 @@ class GCSpider(scrapy.Spider):
     time_lifespan: bool = False
     # runspider_settings.py
     custom_settings: dict = general_settings
-    # for downloader_middlewares.py#BanEvasionMiddleware
+    # for downloader_middlewares.py#BanEvasionMiddleware, delays are kept per domain, see middleware_utils/politeness.py
     rotate_user_agent: bool = True
-    randomly_delay_request: typing.Union[bool, range, typing.List[int]] = False
+    randomly_delay_request: typing.Union[bool, int, float, range, typing.List[int], dict] = False
+    # policy name or domain -> delay, requests pick a named policy with meta={"delay_policy": name}
+    request_delay_policies: typing.Dict[str, typing.Union[bool, int, float, range, typing.List[int], dict]] = {}
+    # lowercase markers of the block pages a site serves with a 200, AdaptiveThrottleMiddleware backs off on responses
+    # that have one, e.g. middleware_utils/adaptive_throttle.py#BLOCK_PAGE_SIGNATURES
+    ban_page_markers: typing.Sequence[str] = ()
 
     source_page_url = None
     dont_filter_previous_hashes = False
+    # cumulative manifest of previous runs, one of it, previous_hash_index_location or previous_manifest_shard_dir
+    # is needed unless dont_filter_previous_hashes is set
+    previous_manifest_location = None
+    # directory written by `build-hash-index`, filters with it instead of reading previous_manifest_location
+    previous_hash_index_location = None
+    # directory of per crawler manifest shards, filters with this spider's shard instead of previous_manifest_location
+    previous_manifest_shard_dir = None
+    # content-addressed store of downloads on the download dir's filesystem, see content_store.py
+    content_store_location = None
+    # cache of each download url's validators kept between runs, see validator_cache.py
+    validator_cache_location = None
+    # cache of listing pages and the items they led to kept between runs, see listing_cache.py
+    listing_cache_location = None
+    # this run's and last run's listing pages, set by spider_middlewares.py#ListingCacheMiddleware
+    listing_pages = None
+    # version hashes of the previous manifest, set by pipelines.py#FileDownloadPipeline
+    previous_hashes = None
+    # set by cli worker processes so each writes its own manifest shard, defaults to <download_output_dir>/manifest.json
+    job_manifest_location = None
     download_request_headers = {}
+    # optional callable returning a decoder (decode(chunk) -> bytes, flush() -> bytes) applied to file downloads
+    # as they stream to disk, see download_streams.py#Base64JsonFieldDecoder
+    download_stream_decoder = None
 
     stats: dict = {}
 
@@ -97,8 +127,52 @@ class GCSpider(scrapy.Spider):
         except Exception as e:
             print(e)
 
+    def listing_fingerprint(self, response) -> str:
+        """Text of a listing page compared with last run's, override to leave out parts that change on their own"""
+        return normalize_listing_body(response.text)
+
+    def listing_unchanged(self, response) -> bool:
+        """
+            call first thing when parsing a listing page, if True yield previous_listing_output(response) instead
+            of parsing it. False when there's no listing_cache_location
+        """
+        if self.listing_pages is None:
+            return False
+        return self.listing_pages.unchanged(response, lambda: self.listing_fingerprint(response))
+
+    def previous_listing_output(self, response):
+        """
+            items an unchanged listing page led to last run, and requests for the listing pages it linked to
+        """
+        return self.listing_pages.previous_output(response.url, self)
+
+    @staticmethod
+    def listing_key(*row_values) -> str:
+        """
+            key of a listing row for follow_detail_page, from the values on the row that change when the
+            document it links to does, e.g. its number, title and date
+        """
+        return listing_key(*row_values)
+
+    def follow_detail_page(self, request, listing_key: str) -> typing.List:
+        """
+            yield from it instead of yielding the request for a listing row's detail page. Returns the items
+            the detail page led to last run instead of the request if the row had the same listing_key and
+            they're all in the previous manifest
+        """
+        items = self.listing_pages.reusable_detail_items(listing_key, self.previous_hashes) \
+            if self.listing_pages is not None else None
+        if items is None:
+            request.meta["listing_key"] = listing_key
+            return [request]
+
+        self.increment_skipped_detail_requests()
+        return items
+
     @staticmethod
     def download_response_handler(response):
+        """Bytes to save for a file download, overriding it turns off streaming downloads to disk
+        unless download_stream_decoder is set too"""
         return response.body
 
     @staticmethod
@@ -7,6 +7,8 @@ MODULE_PATH: str = os.path.dirname(os.path.abspath(__file__))
 INPUT_SPEC_PATH: str = os.path.join(MODULE_PATH, 'input_spec.json')
 # output jsonschema spec path
 OUTPUT_SPEC_PATH: str = os.path.join(MODULE_PATH, 'output_spec.json')
+# generated spider registry path, see dataPipelines/gc_scrapy/spider_registry.py
+SPIDER_REGISTRY_PATH: str = os.path.join(MODULE_PATH, 'spider_registry.json')
 #directory where CA certificates are stored
 CERTIFICATE_DIR: str = os.path.join(MODULE_PATH, "certificates")
 
@@ -0,0 +1,304 @@
+"""
+Streaming extraction of archives, nested in each other in any mix of the registered formats
+
+Archives are read member by member through file objects and only the members wanted are written, once, straight to
+their final paths. ARCHIVE_FORMATS holds a reader for each format, picked by content sniffing for the download and by
+extension for its members, sniffing those without one. Zip, tar, gz, bz2 and xz are registered, a tar.gz is a tar
+nested in a gz. Nested archives of a format that needs to seek, zip, are read out of their parent in to memory, or in
+to a temp file past NESTED_ARCHIVE_MEMORY_BYTES. The rest are streamed from their parent.
+"""
+import bz2
+import gzip
+import io
+import lzma
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import IO, Callable, ContextManager, Dict, Iterable, List, NamedTuple, Optional, Tuple, Type, Union
+
+# nested archives up to this size are read in to memory, bigger ones in to a temp file
+NESTED_ARCHIVE_MEMORY_BYTES = 64 * 1024 * 1024
+COPY_BUFFER_BYTES = 1024 * 1024
+# tar's magic is at 257
+SNIFF_BYTES = 512
+UNZIP_THREADS = 4
+
+
+class ArchiveMember(NamedTuple):
+    # file name, without the directories it's in
+    name: str
+    # uncompressed size, None if the format doesn't know it up front
+    size: Optional[int]
+    open: Callable[[], IO[bytes]]
+
+
+class ArchiveFormat:
+    """Reads one archive format, register_archive_format adds it to ARCHIVE_FORMATS"""
+
+    name = ""
+    # extensions of archives in this format
+    suffixes: Tuple[str, ...] = ()
+    # members can be opened in any order and at the same time from several threads, otherwise each member can be
+    # opened once and has to be read before the next
+    random_access = False
+    # needs a seekable file object
+    seekable = False
+
+    def sniff(self, head: bytes) -> bool:
+        """Whether head, the first SNIFF_BYTES of a file, looks like this format"""
+        raise NotImplementedError
+
+    def members(self, fileobj: IO[bytes], name: str) -> ContextManager[Iterable[ArchiveMember]]:
+        """Members of the archive read from fileobj, name is the archive's file name"""
+        raise NotImplementedError
+
+
+ARCHIVE_FORMATS: Dict[str, ArchiveFormat] = {}
+
+
+def register_archive_format(format_class: Type[ArchiveFormat]) -> Type[ArchiveFormat]:
+    ARCHIVE_FORMATS[format_class.name] = format_class()
+    return format_class
+
+
+@register_archive_format
+class ZipFormat(ArchiveFormat):
+    name = "zip"
+    suffixes = (".zip",)
+    random_access = True
+    seekable = True
+
+    def sniff(self, head):
+        # the second is an empty zip
+        return head[:4] in (b"PK\x03\x04", b"PK\x05\x06")
+
+    @contextmanager
+    def members(self, fileobj, name):
+        with zipfile.ZipFile(fileobj) as zip_ref:
+            infos = sorted((info for info in zip_ref.infolist() if not info.is_dir()), key=lambda i: i.filename)
+            yield [ArchiveMember(PurePosixPath(i.filename).name, i.file_size, partial(zip_ref.open, i)) for i in infos]
+
+
+@register_archive_format
+class TarFormat(ArchiveFormat):
+    name = "tar"
+    suffixes = (".tar",)
+
+    def sniff(self, head):
+        return head[257:262] == b"ustar"
+
+    @contextmanager
+    def members(self, fileobj, name):
+        # links and devices are left out
+        with tarfile.open(fileobj=fileobj, mode="r|") as tar:
+            yield (
+                ArchiveMember(PurePosixPath(info.name).name, info.size, partial(tar.extractfile, info))
+                for info in tar
+                if info.isfile()
+            )
+
+
+class CompressedFileFormat(ArchiveFormat):
+    """A single compressed file, whose one member is named after it without the extension, e.g. doc.pdf.gz"""
+
+    magic = b""
+    # extensions of a compressed tar, e.g. .tgz, the member is named <name>.tar
+    tar_suffixes: Tuple[str, ...] = ()
+
+    def sniff(self, head):
+        return head.startswith(self.magic)
+
+    def open_stream(self, fileobj: IO[bytes]) -> IO[bytes]:
+        raise NotImplementedError
+
+    def member_name(self, name: str) -> str:
+        path = PurePosixPath(name)
+        if path.suffix.lower() in self.tar_suffixes:
+            return f"{path.stem}.tar"
+        return path.stem
+
+    @contextmanager
+    def members(self, fileobj, name):
+        with self.open_stream(fileobj) as stream:
+            yield [ArchiveMember(self.member_name(name), None, lambda: stream)]
+
+
+@register_archive_format
+class GzipFormat(CompressedFileFormat):
+    name = "gz"
+    suffixes = (".gz", ".tgz")
+    magic = b"\x1f\x8b"
+    tar_suffixes = (".tgz",)
+
+    def open_stream(self, fileobj):
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+
+
+@register_archive_format
+class Bzip2Format(CompressedFileFormat):
+    name = "bz2"
+    suffixes = (".bz2", ".bz", ".tbz2", ".tbz")
+    magic = b"BZh"
+    tar_suffixes = (".tbz2", ".tbz")
+
+    def open_stream(self, fileobj):
+        return bz2.BZ2File(fileobj)
+
+
+@register_archive_format
+class XzFormat(CompressedFileFormat):
+    name = "xz"
+    suffixes = (".xz", ".txz")
+    magic = b"\xfd7zXZ\x00"
+    tar_suffixes = (".txz",)
+
+    def open_stream(self, fileobj):
+        return lzma.LZMAFile(fileobj)
+
+
+def format_for_name(name: str) -> Optional[ArchiveFormat]:
+    """Archive format of a file by its extension, the last one, so a .tar.gz is a gz"""
+    suffix = PurePosixPath(name).suffix.lower()
+    return next((f for f in ARCHIVE_FORMATS.values() if suffix in f.suffixes), None)
+
+
+def format_for_compression_type(compression_type: Optional[str]) -> Optional[ArchiveFormat]:
+    """Archive format of a downloadable item's compression_type, e.g. "zip" or "tar.gz" """
+    return format_for_name(f"archive.{compression_type}") if compression_type else None
+
+
+def sniff_format(fileobj: IO[bytes]) -> Optional[ArchiveFormat]:
+    """Archive format of fileobj by its first bytes, without moving past them"""
+    if hasattr(fileobj, "peek"):
+        head = fileobj.peek(SNIFF_BYTES)[:SNIFF_BYTES]
+    else:
+        position = fileobj.tell()
+        head = fileobj.read(SNIFF_BYTES)
+        fileobj.seek(position)
+    return next((f for f in ARCHIVE_FORMATS.values() if f.sniff(head)), None)
+
+
+def read_nested_archive(fileobj: IO[bytes], size: Optional[int]) -> IO[bytes]:
+    """Reads a nested archive in to a seekable file object"""
+    with fileobj:
+        if size is not None and size <= NESTED_ARCHIVE_MEMORY_BYTES:
+            return io.BytesIO(fileobj.read())
+
+        nested = tempfile.TemporaryFile()
+        shutil.copyfileobj(fileobj, nested, COPY_BUFFER_BYTES)
+        nested.seek(0)
+        return nested
+
+
+def read_nested_member(member: ArchiveMember) -> IO[bytes]:
+    return read_nested_archive(member.open(), member.size)
+
+
+def is_read_ahead(archive_format: Optional[ArchiveFormat]) -> bool:
+    """Whether nested archives of this format are read out of a random access parent ahead of walking them"""
+    return archive_format is not None and archive_format.seekable
+
+
+def write_member(open_member: Callable[[], IO[bytes]], path: Path) -> None:
+    with open_member() as src, open(path, "wb") as dst:
+        shutil.copyfileobj(src, dst, COPY_BUFFER_BYTES)
+
+
+def extract_archive(
+    archive_file: Union[Path, str],
+    doc_type: str,
+    destination: Callable[[str], Path],
+    threads: int = UNZIP_THREADS,
+    compression_type: Optional[str] = None,
+) -> List[Path]:
+    """Extracts the members of archive_file, and of the archives nested in it, whose extension is doc_type
+
+    :param archive_file: path to the archive
+    :param doc_type: extension of the members to extract, e.g. "pdf"
+    :param destination: called with each member's file name, in archive order, returns the path to write it to
+    :param threads: members of random access archives, e.g. zips, are decompressed across a pool of this many threads
+    :param compression_type: archive format to use if the content doesn't give it away, e.g. "zip" or "tar.gz"
+    :return: paths written, in archive order
+    """
+    extracted = []
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="unzip") as pool:
+
+        def walk(archive_format: ArchiveFormat, fileobj: IO[bytes], name: str) -> None:
+            with archive_format.members(fileobj, name) as members:
+                copies = []
+                nested_reads = deque()
+
+                if archive_format.random_access:
+                    # nested archives that have to be read out first are read ahead on the pool, at most threads at a
+                    # time, and walked in archive order
+                    members = list(members)
+                    nested_members = iter([m for m in members if is_read_ahead(format_for_name(m.name))])
+
+                    def read_ahead():
+                        member = next(nested_members, None)
+                        if member is not None:
+                            nested_reads.append(pool.submit(read_nested_member, member))
+
+                    for _ in range(threads):
+                        read_ahead()
+
+                for member in members:
+                    suffix = PurePosixPath(member.name).suffix.lower()
+                    if archive_format.random_access:
+                        open_member = member.open
+                    else:
+                        # streamed members can only be opened once
+                        opened = member.open()
+                        open_member = lambda: opened
+
+                    if suffix[1:] == doc_type:
+                        path = destination(member.name)
+                        extracted.append(path)
+                        if archive_format.random_access:
+                            copies.append(pool.submit(write_member, open_member, path))
+                        else:
+                            write_member(open_member, path)
+                        continue
+
+                    nested_format = format_for_name(member.name)
+                    read_ahead_member = archive_format.random_access and is_read_ahead(nested_format)
+                    if nested_format is None and not suffix:
+                        if archive_format.random_access:
+                            with member.open() as f:
+                                nested_format = sniff_format(f)
+                        else:
+                            nested_format = sniff_format(opened)
+                    if nested_format is None:
+                        continue
+
+                    if read_ahead_member:
+                        nested = nested_reads.popleft().result()
+                        read_ahead()
+                    elif nested_format.seekable:
+                        nested = read_nested_archive(open_member(), member.size)
+                    else:
+                        with open_member() as f:
+                            walk(nested_format, f, member.name)
+                        continue
+                    with nested:
+                        walk(nested_format, nested, member.name)
+
+                # the archive has to stay open until its members are written
+                for copy in copies:
+                    copy.result()
+
+        with open(archive_file, "rb") as f:
+            archive_format = sniff_format(f) or format_for_compression_type(compression_type) or \
+                format_for_name(Path(archive_file).name)
+            if archive_format is None:
+                raise ValueError(f"Unsupported archive format: {archive_file}")
+            walk(archive_format, f, Path(archive_file).name)
+
+    return extracted
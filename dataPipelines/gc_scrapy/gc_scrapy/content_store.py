@@ -0,0 +1,83 @@
+##########################################################################################
+# Content-addressed store of downloaded files, <store dir>/<first 2 hex chars>/<sha256>.
+# Each stored file is a hardlink to the first download with that content, so a download
+# whose content is already in the store is replaced with a hardlink to it instead of being
+# kept as another copy. The store has to be on the download dir's filesystem and outside
+# the download dir, since the upload stage ships everything in that.
+##########################################################################################
+
+import os
+import threading
+from pathlib import Path
+from typing import Union
+
+# what FileDownloadPipeline does with a download whose content is already in the store
+DUPLICATES_HARDLINK = "hardlink"  # keep the file, as a hardlink to the stored content
+DUPLICATES_REFERENCE = "reference"  # remove the file, the manifest record references the content by hash
+DUPLICATE_MODES = (DUPLICATES_HARDLINK, DUPLICATES_REFERENCE)
+
+
+class ContentStore:
+    """Files by sha256 of their content
+    :param directory: store directory, created if it doesn't exist
+    """
+
+    def __init__(self, directory: Union[Path, str]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.added = 0
+        self.duplicates = 0
+        self.duplicate_bytes = 0
+
+    def path_for(self, sha256: str) -> Path:
+        return Path(self.directory, sha256[:2], sha256)
+
+    def __contains__(self, sha256: str) -> bool:
+        return self.path_for(sha256).is_file()
+
+    def add(self, path: Union[Path, str], sha256: str) -> bool:
+        """
+        Adds the file at path to the store, replacing it with a hardlink to the stored content if the store
+        already had it. Raises OSError if the file can't be linked, e.g. the store is on another filesystem
+
+        Returns:
+            True if the store already had the content in a different file
+        """
+        path = Path(path)
+        stored = self.path_for(sha256)
+        stored.parent.mkdir(exist_ok=True)
+        size = path.stat().st_size
+
+        try:
+            os.link(path, stored)
+            self._count(added=1)
+            return False
+        except FileExistsError:
+            pass
+
+        stored_stat = stored.stat()
+        if stored_stat.st_size != size:
+            # a partial or corrupt stored file, the new download takes its place
+            tmp = stored.with_name(f".{sha256}.{os.getpid()}.{threading.get_ident()}")
+            os.link(path, tmp)
+            os.replace(tmp, stored)
+            self._count(added=1)
+            return False
+
+        if os.path.samestat(path.stat(), stored_stat):
+            # the file is the stored content, e.g. items sharing a download and its path
+            return False
+
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.link")
+        os.link(stored, tmp)
+        os.replace(tmp, path)
+        self._count(duplicates=1, duplicate_bytes=size)
+        return True
+
+    def _count(self, added: int = 0, duplicates: int = 0, duplicate_bytes: int = 0) -> None:
+        # files are added from the file writer threads
+        with self.lock:
+            self.added += added
+            self.duplicates += duplicates
+            self.duplicate_bytes += duplicate_bytes
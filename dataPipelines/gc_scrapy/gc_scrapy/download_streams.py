@@ -0,0 +1,169 @@
+##########################################################################################
+# Streaming file downloads for FileDownloadPipeline. Response chunks are written to a temp
+# file in the download dir as they arrive (scrapy's bytes_received signal) and the temp file
+# is renamed to the document's path once the item is completed, so the result kept in the
+# MediaPipeline cache is only a path, a size and the sha256 of the content.
+##########################################################################################
+
+import base64
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Union
+
+
+class DownloadedFile:
+    """Cached result of a finished download, in place of the response and its body
+    :param path: where the downloaded body is, a temp file until move_to is called
+    :param size: bytes written
+    :param status: response status
+    :param meta: the request meta FileDownloadPipeline needs in item_completed
+    :param sha256: hex sha256 of the content written
+    :param unchanged: the content is what the last download of the url had, see validator_cache.py. There is no
+        file, size and sha256 are the cached ones
+    """
+    __slots__ = ("path", "size", "status", "meta", "sha256", "unchanged", "moved")
+    # items sharing a cached download can be completed on different file writer threads
+    move_lock = threading.Lock()
+
+    def __init__(self, path: Optional[Path], size: int, status: int, meta: dict, sha256: Optional[str] = None,
+                 unchanged: bool = False):
+        self.path = path
+        self.size = size
+        self.status = status
+        self.meta = meta
+        self.sha256 = sha256
+        self.unchanged = unchanged
+        self.moved = False
+
+    def move_to(self, destination: Union[Path, str]) -> None:
+        """Renames the temp file to destination, copies it if an earlier item already moved it elsewhere"""
+        with self.move_lock:
+            if self.moved:
+                if Path(destination) != self.path:
+                    shutil.copyfile(self.path, destination)
+                return
+            os.replace(self.path, destination)
+            self.path = Path(destination)
+            self.moved = True
+
+
+class Base64JsonFieldDecoder:
+    """Streaming decoder for a json response whose file is base64 in one string field, e.g. {"content": "JVBERi0..."}
+    :param field: name of the json field with the base64 content
+    """
+
+    def __init__(self, field: str = "content"):
+        self.field_re = re.compile(rb'"' + re.escape(field.encode("utf-8")) + rb'"\s*:\s*"')
+        self.buffer = b""
+        self.pending = b""
+        self.in_value = False
+        self.done = False
+
+    def decode(self, chunk: bytes) -> bytes:
+        if self.done:
+            return b""
+
+        if not self.in_value:
+            self.buffer += chunk
+            match = self.field_re.search(self.buffer)
+            if not match:
+                # keep enough to match a field name split across chunks
+                self.buffer = self.buffer[-256:]
+                return b""
+            chunk = self.buffer[match.end():]
+            self.buffer = b""
+            self.in_value = True
+
+        end = chunk.find(b'"')
+        if end != -1:
+            chunk = chunk[:end]
+            self.done = True
+
+        # json may escape / as \/, base64 has no backslashes or whitespace
+        self.pending += chunk.translate(None, b"\\\r\n ")
+        usable = len(self.pending) // 4 * 4
+        decoded = base64.b64decode(self.pending[:usable])
+        self.pending = self.pending[usable:]
+        return decoded
+
+    def flush(self) -> bytes:
+        if not self.in_value:
+            raise ValueError("base64 field not found in download")
+        padded = self.pending + b"=" * (-len(self.pending) % 4)
+        self.pending = b""
+        return base64.b64decode(padded)
+
+
+class StreamedDownload:
+    """Temp file a download's chunks are written to as they arrive.
+    Kept in request meta so redirected and retried requests (which get a copy of the meta) find it, a chunk from
+    a different request than the last one starts the file over
+    :param directory: where to make the temp file, the download dir so the final rename is atomic
+    :param decoder_factory: optional callable returning a decoder with decode(chunk) and flush() methods
+    """
+
+    def __init__(self, directory: Union[Path, str], decoder_factory: Optional[Callable] = None):
+        self.directory = directory
+        self.decoder_factory = decoder_factory
+        self.decoder = None
+        self.request = None
+        self.file = None
+        self.path = None
+        self.received = 0
+        self.size = 0
+        self.hash = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        """hex sha256 of what was written, after decoding"""
+        return self.hash.hexdigest()
+
+    def write(self, request, chunk: bytes) -> None:
+        if request is not self.request:
+            self.restart(request)
+        self.received += len(chunk)
+        self._write(self.decoder.decode(chunk) if self.decoder else chunk)
+
+    def _write(self, data: bytes) -> None:
+        if data:
+            self.file.write(data)
+            self.hash.update(data)
+            self.size += len(data)
+
+    def restart(self, request) -> None:
+        if self.file is None:
+            fd, path = tempfile.mkstemp(prefix=".download-", suffix=".part", dir=self.directory)
+            self.file = os.fdopen(fd, "wb")
+            self.path = Path(path)
+        else:
+            self.file.seek(0)
+            self.file.truncate()
+        self.request = request
+        self.decoder = self.decoder_factory() if self.decoder_factory else None
+        self.received = 0
+        self.size = 0
+        self.hash = hashlib.sha256()
+
+    def has_all_of(self, response) -> bool:
+        """True if every byte of the response body came through bytes_received"""
+        return self.request is response.request and self.received == len(response.body)
+
+    def finish(self) -> Tuple[Path, int]:
+        """Closes the temp file and returns its path and size"""
+        if self.file is None:
+            self.restart(None)
+        if self.decoder:
+            self._write(self.decoder.flush())
+        self.file.close()
+        return self.path, self.size
+
+    def discard(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.path.unlink(missing_ok=True)
+            self.file = None
@@ -1,13 +1,31 @@
 from random import choice
-from time import sleep
+from time import monotonic, sleep, time
 
 from scrapy import signals
 from scrapy.exceptions import NotConfigured
-from scrapy.http import HtmlResponse
+from scrapy.http import HtmlResponse, TextResponse
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.misc import load_object
+from twisted.internet import task
+from twisted.internet.error import ConnectionLost, ConnectionRefusedError, TCPTimedOutError, TimeoutError
+from twisted.web.client import ResponseFailed, ResponseNeverReceived
 from selenium.webdriver.support.ui import WebDriverWait
 from importlib import import_module
 
 from dataPipelines.gc_scrapy.gc_scrapy.middleware_utils.selenium_request import SeleniumRequest
+from dataPipelines.gc_scrapy.gc_scrapy.middleware_utils.politeness import make_delay_policy
+from dataPipelines.gc_scrapy.gc_scrapy.middleware_utils.adaptive_throttle import (
+    BAN_STATUSES,
+    DEFAULT_THROTTLE_STATE_LOCATION,
+    DomainThrottle,
+    ThrottleState,
+    looks_like_ban_page,
+    parse_retry_after,
+)
+from dataPipelines.gc_scrapy.gc_scrapy.middleware_utils.host_rate_limiter import (
+    DEFAULT_HOST_RATE_LIMIT_BACKEND,
+    get_host_limit,
+)
 from selenium.common.exceptions import TimeoutException
 
 
@@ -207,11 +225,30 @@ class SeleniumMiddleware:
 
 
 class BanEvasionMiddleware:
+    """Sets the User-Agent and spaces out requests by the spider's delay policies.
+    A delayed request waits after the downloader took it in, so like a request queued for DOWNLOAD_DELAY it counts
+    against the crawler's CONCURRENT_REQUESTS while it waits. Requests queued up behind a long named policy can fill
+    them and hold up the spider's other pages and domains, raise CONCURRENT_REQUESTS in the spider's custom_settings
+    """
 
     def __init__(self):
         self.stable_agent = choice(user_agent_list)
+        # (policy name, domain) -> DelayPolicy, so each domain is spaced out separately
+        self.delay_policies = {}
 
-    delays = range(0, 3)
+    def get_delay_policy(self, request, spider):
+        """
+            policy named by request.meta["delay_policy"] or the request's domain in spider.request_delay_policies,
+            spider.randomly_delay_request if neither is declared
+        """
+        domain = urlparse_cached(request).hostname or ""
+        policy_name = request.meta.get("delay_policy", domain)
+        key = (policy_name, domain)
+        if key not in self.delay_policies:
+            spec = getattr(spider, "request_delay_policies", {}).get(
+                policy_name, spider.randomly_delay_request)
+            self.delay_policies[key] = make_delay_policy(spec)
+        return self.delay_policies[key]
 
     def process_request(self, request, spider):
         if spider.rotate_user_agent:
@@ -220,14 +257,162 @@ class BanEvasionMiddleware:
         else:
             request.headers["User-Agent"] = self.stable_agent
 
-        dr = spider.randomly_delay_request
-        if dr and not request.meta.get("skip_delay"):
-            delay_opts = dr if isinstance(dr, (range, list)) else self.delays
-            delay = choice(delay_opts)
-            # print('delay of', delay)
-            # makes sleep more interruptable
-            for _ in range(delay):
-                try:
-                    sleep(1)
-                except KeyboardInterrupt:
-                    exit(0)
+        if request.meta.get("skip_delay"):
+            return None
+
+        policy = self.get_delay_policy(request, spider)
+        if policy is None:
+            return None
+
+        delay = policy.next_delay(monotonic())
+        if delay > 0:
+            # the request waits in the downloader while the reactor keeps serving everything else
+            from twisted.internet import reactor
+            return task.deferLater(reactor, delay, lambda: None)
+
+
+class AdaptiveThrottleMiddleware:
+    """Tunes the delay and concurrency of each downloader slot (domain) at run time.
+    Backs off on ban statuses, connection resets and the block pages of spiders' ban_page_markers, ramps back up
+    while the domain is healthy, never below DOWNLOAD_DELAY. The learned limits are saved on close and seed the next
+    run, ADAPTIVE_THROTTLE_STATE_LOCATION should be on storage kept between runs
+    """
+
+    # errors sites give when they start dropping our connections
+    CONNECTION_ERRORS = (
+        ConnectionLost,
+        ConnectionRefusedError,
+        TCPTimedOutError,
+        TimeoutError,
+        ResponseFailed,
+        ResponseNeverReceived,
+    )
+
+    def __init__(self, crawler, state: ThrottleState):
+        self.crawler = crawler
+        self.state = state
+        settings = crawler.settings
+
+        # the configured delay is a floor, only the learned delay above it goes up and down
+        self.min_delay = max(settings.getfloat("ADAPTIVE_THROTTLE_MIN_DELAY"), settings.getfloat("DOWNLOAD_DELAY"))
+        self.max_delay = settings.getfloat("ADAPTIVE_THROTTLE_MAX_DELAY", 60.0)
+        self.max_concurrency = settings.getint(
+            "ADAPTIVE_THROTTLE_MAX_CONCURRENCY", settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"))
+        self.ramp_up_after = settings.getint("ADAPTIVE_THROTTLE_RAMP_UP_AFTER", 20)
+        self.slow_latency = settings.getfloat("ADAPTIVE_THROTTLE_SLOW_LATENCY", 2.0)
+
+        self.throttles = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("ADAPTIVE_THROTTLE_ENABLED"):
+            raise NotConfigured("ADAPTIVE_THROTTLE_ENABLED is not set")
+
+        state = ThrottleState(crawler.settings.get("ADAPTIVE_THROTTLE_STATE_LOCATION", DEFAULT_THROTTLE_STATE_LOCATION))
+        middleware = cls(crawler, state)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(middleware.request_reached_downloader, signal=signals.request_reached_downloader)
+        return middleware
+
+    @staticmethod
+    def get_slot_key(request):
+        return request.meta.get("download_slot") or urlparse_cached(request).hostname or ""
+
+    def get_throttle(self, key, slot=None):
+        if key not in self.throttles:
+            learned = self.state.get(key) or {}
+            # spiders can set their own delay as download_delay too
+            spider = getattr(self.crawler, "spider", None)
+            min_delay = max(self.min_delay, float(getattr(spider, "download_delay", 0) or 0))
+            self.throttles[key] = DomainThrottle(
+                delay=learned.get("delay", slot.delay if slot else min_delay),
+                concurrency=learned.get("concurrency", slot.concurrency if slot else self.max_concurrency),
+                min_delay=min_delay,
+                max_delay=self.max_delay,
+                max_concurrency=self.max_concurrency,
+                ramp_up_after=self.ramp_up_after,
+            )
+        return self.throttles[key]
+
+    def apply(self, key, throttle):
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot:
+            slot.delay = throttle.delay
+            slot.concurrency = throttle.concurrency
+
+    def backoff(self, key, reason, min_wait=0.0):
+        throttle = self.get_throttle(key)
+        throttle.backoff(min_wait)
+        self.apply(key, throttle)
+        self.crawler.stats.inc_value("adaptive_throttle/backoff_count")
+        self.crawler.stats.inc_value(f"adaptive_throttle/backoff_reason/{reason}")
+        print(f"Backing off {key} ({reason}): delay {throttle.delay:.2f}s, concurrency {throttle.concurrency}")
+
+    def request_reached_downloader(self, request, spider):
+        # sent once the downloader made the request's slot and before the slot sends it, so a learned limit applies
+        # from the first request
+        key = self.get_slot_key(request)
+        self.apply(key, self.get_throttle(key, self.crawler.engine.downloader.slots.get(key)))
+
+    def process_response(self, request, response, spider):
+        key = self.get_slot_key(request)
+        ban_page_markers = getattr(spider, "ban_page_markers", None)
+        if response.status in BAN_STATUSES:
+            self.backoff(key, str(response.status), parse_retry_after(response.headers.get("Retry-After")))
+        elif ban_page_markers and isinstance(response, TextResponse) and \
+                looks_like_ban_page(response.body, ban_page_markers):
+            self.backoff(key, "ban_page")
+        else:
+            throttle = self.get_throttle(key)
+            throttle.record_healthy(request.meta.get("download_latency", 0.0), self.slow_latency)
+            self.apply(key, throttle)
+
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if isinstance(exception, self.CONNECTION_ERRORS):
+            self.backoff(self.get_slot_key(request), type(exception).__name__)
+
+    def spider_closed(self, spider):
+        if not self.throttles:
+            return
+        try:
+            self.state.save(self.throttles)
+        except OSError as e:
+            print("Could not save throttle state", self.state.location, e)
+
+
+class HostRateLimitMiddleware:
+    """Holds the requests to each domain in HOST_RATE_LIMITS (requests per second) to one budget shared by every
+    spider and worker process on the node. The budget is kept per downloader slot domain in HOST_RATE_LIMIT_BACKEND,
+    lock files in HOST_RATE_LIMIT_DIR by default
+    """
+
+    def __init__(self, crawler, backend, limits):
+        self.crawler = crawler
+        self.backend = backend
+        self.limits = limits
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("HOST_RATE_LIMIT_ENABLED"):
+            raise NotConfigured("HOST_RATE_LIMIT_ENABLED is not set")
+
+        limits = crawler.settings.getdict("HOST_RATE_LIMITS")
+        if not limits:
+            raise NotConfigured("HOST_RATE_LIMITS is empty")
+
+        backend_cls = load_object(crawler.settings.get("HOST_RATE_LIMIT_BACKEND", DEFAULT_HOST_RATE_LIMIT_BACKEND))
+        return cls(crawler, backend_cls.from_settings(crawler.settings), limits)
+
+    def process_request(self, request, spider):
+        domain, rate = get_host_limit(AdaptiveThrottleMiddleware.get_slot_key(request), self.limits)
+        if not rate:
+            return None
+
+        delay = self.backend.reserve(domain, 1 / rate, time())
+        if delay > 0:
+            self.crawler.stats.inc_value("host_rate_limit/delayed_count")
+            self.crawler.stats.inc_value("host_rate_limit/delay_seconds", delay)
+            from twisted.internet import reactor
+            return task.deferLater(reactor, delay, lambda: None)
@@ -0,0 +1,235 @@
+##########################################################################################
+# Compact on-disk index of previous version hashes. Each crawler's hashes are kept as sorted
+# 32-byte raw sha256 digests in <index dir>/<crawler>.hashes, memory-mapped and binary
+# searched on lookup, with an optional Bloom filter in <crawler>.bloom to answer most misses
+# without touching the digests. Built from the cumulative manifest by the crawl job with
+# `python -m dataPipelines.gc_scrapy build-hash-index`.
+##########################################################################################
+
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+DIGEST_SIZE = 32
+HASHES_SUFFIX = ".hashes"
+BLOOM_SUFFIX = ".bloom"
+INDEX_FILE_NAME = "index.json"
+# shard of the hashes of manifest lines without a crawler_used, checked for every crawler
+UNATTRIBUTED_SHARD = "_unattributed"
+
+# ~1% false positives
+DEFAULT_BLOOM_BITS_PER_HASH = 10
+DEFAULT_BLOOM_PROBES = 7  # at most DIGEST_SIZE // 4
+BLOOM_HEADER = struct.Struct("<QB")
+# probe positions are read from the digest as little endian 32 bit ints
+BLOOM_PROBE_VALUES = struct.Struct(f"<{DIGEST_SIZE // 4}I")
+
+
+def to_digest(version_hash: str) -> bytes:
+    """Raw digest of a hex sha256 version hash, anything else is sha256'd so it still fits the index"""
+    if len(version_hash) == DIGEST_SIZE * 2:
+        try:
+            return bytes.fromhex(version_hash)
+        except ValueError:
+            pass
+    return hashlib.sha256(version_hash.encode("utf-8")).digest()
+
+
+def _map(path: Path) -> Optional[mmap.mmap]:
+    """Read only map of the file, None for an empty file since those can't be mapped"""
+    with path.open(mode="rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SortedDigests:
+    """Sorted, deduplicated digests of a .hashes file, searched in place in the mapped file"""
+
+    def __init__(self, path: Union[Path, str]):
+        self.path = Path(path)
+        self.map = _map(self.path)
+        self.count = len(self.map) // DIGEST_SIZE if self.map else 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> bytes:
+        # lets bisect search the mapped file as if it was a list of digests
+        start = i * DIGEST_SIZE
+        return self.map[start:start + DIGEST_SIZE]
+
+    def __contains__(self, digest: bytes) -> bool:
+        i = bisect.bisect_left(self, digest)
+        return i < self.count and self[i] == digest
+
+    @staticmethod
+    def write(path: Union[Path, str], sorted_digests: List[bytes]) -> None:
+        """Writes digests that are already sorted and deduplicated"""
+        _replace(Path(path), b"".join(sorted_digests))
+
+
+class BloomFilter:
+    """Bloom filter over digests, probe positions are slices of the digest since sha256 bytes are already uniform"""
+
+    def __init__(self, bits, num_bits: int, probes: int):
+        self.bits = bits
+        self.num_bits = num_bits
+        self.probes = probes
+
+    def _positions(self, digest: bytes):
+        num_bits = self.num_bits
+        return [value % num_bits for value in BLOOM_PROBE_VALUES.unpack(digest)[:self.probes]]
+
+    def __contains__(self, digest: bytes) -> bool:
+        bits = self.bits
+        for p in self._positions(digest):
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def add(self, digest: bytes) -> None:
+        for p in self._positions(digest):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    @classmethod
+    def build(cls, digests: List[bytes], bits_per_hash: int = DEFAULT_BLOOM_BITS_PER_HASH,
+              probes: int = DEFAULT_BLOOM_PROBES) -> "BloomFilter":
+        num_bits = max(8, len(digests) * bits_per_hash)
+        bloom = cls(bytearray((num_bits + 7) // 8), num_bits, probes)
+        for digest in digests:
+            bloom.add(digest)
+        return bloom
+
+    def write(self, path: Union[Path, str]) -> None:
+        _replace(Path(path), BLOOM_HEADER.pack(self.num_bits, self.probes) + bytes(self.bits))
+
+    @classmethod
+    def open(cls, path: Union[Path, str]) -> "BloomFilter":
+        mapped = _map(Path(path))
+        num_bits, probes = BLOOM_HEADER.unpack_from(mapped)
+        return cls(memoryview(mapped)[BLOOM_HEADER.size:], num_bits, probes)
+
+
+def _replace(path: Path, data: bytes) -> None:
+    tmp_path = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+    with tmp_path.open(mode="wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class IndexedPreviousHashes:
+    """Hashes one crawler filters, looked up in its shard and the unattributed shard of a HashIndex"""
+
+    def __init__(self, shards: List[SortedDigests], blooms: List[Optional[BloomFilter]]):
+        self.shards = shards
+        self.blooms = blooms
+
+    def __contains__(self, version_hash: str) -> bool:
+        digest = to_digest(version_hash)
+        for shard, bloom in zip(self.shards, self.blooms):
+            if bloom is not None and digest not in bloom:
+                continue
+            if digest in shard:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+
+class HashIndex:
+    """Reads the shards of an index directory as crawlers ask for them
+    :param directory: directory build_hash_index wrote to
+    :param use_bloom: check the Bloom filters written with the shards before searching them
+    """
+
+    def __init__(self, directory: Union[Path, str], use_bloom: bool = True):
+        self.directory = Path(directory)
+        self.use_bloom = use_bloom
+        self.shards: Dict[str, Optional[SortedDigests]] = {}
+        self.blooms: Dict[str, Optional[BloomFilter]] = {}
+
+    def _open_shard(self, shard_name: str) -> Optional[SortedDigests]:
+        if shard_name not in self.shards:
+            path = Path(self.directory, f"{shard_name}{HASHES_SUFFIX}")
+            self.shards[shard_name] = SortedDigests(path) if path.is_file() else None
+
+            bloom_path = Path(self.directory, f"{shard_name}{BLOOM_SUFFIX}")
+            self.blooms[shard_name] = BloomFilter.open(bloom_path) \
+                if self.use_bloom and self.shards[shard_name] and bloom_path.is_file() else None
+
+        return self.shards[shard_name]
+
+    def hashes_for(self, crawler_name: str) -> IndexedPreviousHashes:
+        shard_names = [name for name in (crawler_name, UNATTRIBUTED_SHARD) if self._open_shard(name)]
+        return IndexedPreviousHashes(
+            [self.shards[name] for name in shard_names],
+            [self.blooms[name] for name in shard_names],
+        )
+
+
+def build_hash_index(manifest_location: Union[Path, str], directory: Union[Path, str], bloom: bool = False,
+                     bloom_bits_per_hash: int = DEFAULT_BLOOM_BITS_PER_HASH) -> Dict[str, int]:
+    """
+    Writes a shard per crawler_used of the manifest to directory, replacing the shards already there
+
+    Returns:
+        number of hashes written per shard
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    digests_by_shard: Dict[str, List[bytes]] = {}
+    with Path(manifest_location).open(mode="r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            jdoc = json.loads(line)
+            shard_name = jdoc.get("crawler_used") or UNATTRIBUTED_SHARD
+            shard = digests_by_shard.get(shard_name)
+            if shard is None:
+                shard = digests_by_shard[shard_name] = []
+            shard.append(to_digest(jdoc["version_hash"]))
+
+    for stale in directory.glob(f"*{HASHES_SUFFIX}"):
+        if stale.stem not in digests_by_shard:
+            stale.unlink()
+            Path(directory, f"{stale.stem}{BLOOM_SUFFIX}").unlink(missing_ok=True)
+
+    counts = {}
+    for shard_name, digests in digests_by_shard.items():
+        digests = sorted(set(digests))
+        SortedDigests.write(Path(directory, f"{shard_name}{HASHES_SUFFIX}"), digests)
+        counts[shard_name] = len(digests)
+        bloom_path = Path(directory, f"{shard_name}{BLOOM_SUFFIX}")
+        if bloom:
+            BloomFilter.build(digests, bloom_bits_per_hash).write(bloom_path)
+        else:
+            bloom_path.unlink(missing_ok=True)
+
+    with Path(directory, INDEX_FILE_NAME).open(mode="w") as f:
+        json.dump({
+            "built": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            "manifest": str(Path(manifest_location).resolve()),
+            "shards": counts,
+        }, f, indent=2, sort_keys=True)
+
+    return counts
+
+
+# indexes opened in this process by directory, so spiders share the mapped shards
+_open_indexes: Dict[str, HashIndex] = {}
+
+
+def get_hash_index(directory: Union[Path, str], use_bloom: bool = True) -> HashIndex:
+    key = str(Path(directory).resolve())
+    if key not in _open_indexes or _open_indexes[key].use_bloom != use_bloom:
+        _open_indexes[key] = HashIndex(key, use_bloom)
+    return _open_indexes[key]
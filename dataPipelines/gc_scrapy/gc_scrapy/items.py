@@ -3,6 +3,12 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
 
+from collections.abc import MutableMapping
+from copy import deepcopy
+from dataclasses import make_dataclass
+from pprint import pformat
+from typing import Any
+
 import scrapy
 
 
@@ -32,3 +38,62 @@ class DocItem(scrapy.Item):
     office_primary_resp = scrapy.Field()
 
 
+class CompactItem(MutableMapping):
+    """
+    Base of slotted dataclass items used like a scrapy.Item, item["field"] and item.get("field").
+    Fields that were never set aren't keys, as with scrapy.Item, so ItemAdapter and exporters leave them out
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key in self.__dataclass_fields__:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__dataclass_fields__:
+            raise KeyError(f"{self.__class__.__name__} does not support field: {key}")
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key not in self.__dataclass_fields__ or not hasattr(self, key):
+            raise KeyError(key)
+        delattr(self, key)
+
+    def __iter__(self):
+        return (key for key in self.__dataclass_fields__ if hasattr(self, key))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return pformat(dict(self))
+
+    def copy(self):
+        """Shallow copy, the copies share nested values so replace those instead of changing them"""
+        return self.__class__(self)
+
+    def deepcopy(self):
+        return deepcopy(self)
+
+
+# DocItem's fields in slots instead of a dict per item, spiders keep yielding DocItem and
+# spider_middlewares.py#CompactItemMiddleware converts them before they queue for the pipelines
+CompactDocItem = make_dataclass(
+    "CompactDocItem",
+    [(name, Any) for name in DocItem.fields],
+    bases=(CompactItem,),
+    init=False,
+    repr=False,
+    eq=False,
+    slots=True,
+)
+CompactDocItem.__module__ = __name__
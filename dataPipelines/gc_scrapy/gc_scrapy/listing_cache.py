@@ -0,0 +1,270 @@
+##########################################################################################
+# Listing pages of previous runs, by spider and url, in a SQLite database kept across runs.
+# A spider calls listing_unchanged(response) first thing in a listing page's callback. The
+# page is unchanged when the server answers 304 to the If-None-Match/If-Modified-Since its
+# request was sent with, or its normalized body hashes the same as last run. The spider then
+# yields previous_listing_output(response) instead of parsing the page: the items the page
+# led to last run, through its detail pages too, and requests for the listing pages it linked
+# to, e.g. its next page. ListingCacheMiddleware keeps track of what each page led to.
+#
+# Rows of a changed page can still be skipped one by one. The spider computes a listing_key
+# from a row's values and yields follow_detail_page(request, listing_key). When last run's
+# row had the same key and the items its detail page led to are all in the previous
+# manifest, those items are yielded instead of the request.
+##########################################################################################
+
+import hashlib
+import json
+import re
+import sqlite3
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import scrapy
+
+from dataPipelines.gc_scrapy.gc_scrapy.items import DocItem
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listing_pages (
+    crawler TEXT NOT NULL,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body_sha256 TEXT NOT NULL,
+    items TEXT NOT NULL,
+    listing_requests TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (crawler, url)
+);
+CREATE TABLE IF NOT EXISTS detail_items (
+    crawler TEXT NOT NULL,
+    listing_key TEXT NOT NULL,
+    items TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (crawler, listing_key)
+);
+"""
+
+# parts of a page that change on every request without its listings changing
+VOLATILE_MARKUP_RE = re.compile(
+    r"<script\b.*?</script\s*>|<style\b.*?</style\s*>|<!--.*?-->|<input\b[^>]*\btype=[\"']?hidden\b[^>]*>",
+    flags=re.IGNORECASE | re.DOTALL,
+)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_listing_body(text: str) -> str:
+    """Page text without scripts, styles, comments and hidden inputs (e.g. ASP.NET view state), whitespace collapsed"""
+    return WHITESPACE_RE.sub(" ", VOLATILE_MARKUP_RE.sub("", text)).strip()
+
+
+def listing_key(*row_values) -> str:
+    """Key of a listing row from the values on it that change when the document it links to does"""
+    return hashlib.sha256(json.dumps(row_values, default=str).encode("utf-8")).hexdigest()
+
+
+class ListingPage(NamedTuple):
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body_sha256: str
+    # the items the page led to, as dicts
+    items: List[dict]
+    # (url, callback name) of the listing pages it linked to
+    listing_requests: List[Tuple[str, str]]
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ListingCache:
+    """Each spider's listing pages, and the items of its listing rows' detail pages, as of its last run
+    :param location: path of the database, created if it doesn't exist. Spiders in other processes can share it
+    """
+
+    def __init__(self, location: Union[Path, str]):
+        self.location = Path(location)
+        self.location.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.location), timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "ListingCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def pages(self, crawler: str) -> Dict[str, ListingPage]:
+        cursor = self.connection.execute(
+            "SELECT url, etag, last_modified, body_sha256, items, listing_requests FROM listing_pages "
+            "WHERE crawler = ?",
+            (crawler,),
+        )
+        return {
+            url: ListingPage(url, etag, last_modified, body_sha256, json.loads(items),
+                             [tuple(r) for r in json.loads(listing_requests)])
+            for url, etag, last_modified, body_sha256, items, listing_requests in cursor
+        }
+
+    def save_pages(self, crawler: str, pages: Iterable[ListingPage], removed_urls: Iterable[str] = ()) -> None:
+        """Replaces the pages' previous versions, and forgets removed_urls"""
+        updated_at = datetime.now().isoformat(timespec="seconds")
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO listing_pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (crawler, page.url, page.etag, page.last_modified, page.body_sha256,
+                     json.dumps(page.items, default=str), json.dumps(page.listing_requests), updated_at)
+                    for page in pages
+                ],
+            )
+            self.connection.executemany(
+                "DELETE FROM listing_pages WHERE crawler = ? AND url = ?", [(crawler, url) for url in removed_urls]
+            )
+
+    def detail_items(self, crawler: str, key: str) -> Optional[List[dict]]:
+        """Items the detail page of the listing row with this key led to last time, looked up one row at a time
+        as there can be one for each document the spider has"""
+        row = self.connection.execute(
+            "SELECT items FROM detail_items WHERE crawler = ? AND listing_key = ?", (crawler, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_detail_items(self, crawler: str, detail_items: Dict[str, List[dict]]) -> None:
+        updated_at = datetime.now().isoformat(timespec="seconds")
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO detail_items VALUES (?, ?, ?, ?)",
+                [(crawler, key, json.dumps(items, default=str), updated_at) for key, items in detail_items.items()],
+            )
+
+
+class ListingPages:
+    """A spider's listing pages in this run, and in its last run
+    :param previous: last run's pages by url
+    :param stats: the crawl's stats collector
+    :param previous_detail_items: looks up the items a listing row's detail page led to last run by its key
+    """
+
+    def __init__(self, previous: Dict[str, ListingPage], stats,
+                 previous_detail_items: Callable[[str], Optional[List[dict]]] = lambda key: None):
+        self.previous = previous
+        self.stats = stats
+        self.previous_detail_items = previous_detail_items
+        # this run's pages by url, their items and listing_requests are filled in as the crawl goes
+        self.current: Dict[str, ListingPage] = {}
+        # requests each page led to whose callbacks haven't finished yet
+        self.pending = Counter()
+        # (url, callback name) of each request a page led to, the listing pages among them are kept. The name is
+        # None for requests that can't be made again from a url and callback name
+        self.requested = defaultdict(list)
+        # items and unparsed requests of the detail page of each listing row, by listing_key
+        self.detail_items = defaultdict(list)
+        self.detail_pending = Counter()
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        previous = self.previous.get(url)
+        return previous.conditional_headers() if previous else {}
+
+    def unchanged(self, response, fingerprint: Callable[[], str]) -> bool:
+        """Records the page for this run and returns whether it is the same as last run
+        :param fingerprint: returns the text of the page to compare, only called if the response has a body
+        """
+        previous = self.previous.get(response.url)
+        etag = response.headers.get("ETag", b"").decode("latin-1") or None
+        last_modified = response.headers.get("Last-Modified", b"").decode("latin-1") or None
+
+        if response.status == 304 and previous:
+            self.stats.inc_value("listing_cache/not_modified")
+            body_sha256 = previous.body_sha256
+            etag = etag or previous.etag
+            last_modified = last_modified or previous.last_modified
+        else:
+            body_sha256 = hashlib.sha256(fingerprint().encode("utf-8")).hexdigest()
+
+        self.current[response.url] = ListingPage(response.url, etag, last_modified, body_sha256, [], [])
+        self.stats.inc_value("listing_cache/pages")
+        unchanged = previous is not None and previous.body_sha256 == body_sha256
+        if unchanged:
+            self.stats.inc_value("listing_cache/unchanged_pages")
+        return unchanged
+
+    def previous_output(self, url: str, spider) -> Iterator[Union[DocItem, scrapy.Request]]:
+        """The items a page led to last run and requests for the listing pages it linked to"""
+        previous = self.previous.get(url)
+        if previous is None:
+            return
+        for item in previous.items:
+            self.stats.inc_value("listing_cache/reused_items")
+            yield DocItem(item)
+        for request_url, callback in previous.listing_requests:
+            yield scrapy.Request(request_url, callback=getattr(spider, callback))
+
+    def reusable_detail_items(self, key: str, previous_hashes) -> Optional[List[DocItem]]:
+        """Last run's items for a listing row with this key, None unless there were some and all of them are in
+        previous_hashes, the version hashes of the previous manifest"""
+        items = self.previous_detail_items(key)
+        if not items or previous_hashes is None or any(i.get("version_hash") not in previous_hashes for i in items):
+            return None
+        self.stats.inc_value("listing_cache/skipped_detail_requests")
+        self.stats.inc_value("listing_cache/reused_items", len(items))
+        return [DocItem(item) for item in items]
+
+    def listing_url(self, response) -> Optional[str]:
+        """The listing page a response came from, itself if it is one"""
+        if response.url in self.current:
+            return response.url
+        return response.meta.get("listing_url")
+
+    def add_request(self, listing_url: str, request: scrapy.Request, spider) -> None:
+        self.pending[listing_url] += 1
+        callback = request.callback or spider.parse
+        name = getattr(callback, "__name__", None)
+        if getattr(spider, name or "", None) != callback or request.cb_kwargs:
+            name = None
+        self.requested[listing_url].append((request.url, name))
+
+    def add_item(self, listing_url: str, item) -> None:
+        self.current[listing_url].items.append(dict(item))
+
+    def request_finished(self, listing_url: str) -> None:
+        self.pending[listing_url] -= 1
+
+    def add_detail_request(self, key: str) -> None:
+        self.detail_pending[key] += 1
+
+    def add_detail_item(self, key: str, item) -> None:
+        self.detail_items[key].append(dict(item))
+
+    def detail_request_finished(self, key: str) -> None:
+        self.detail_pending[key] -= 1
+
+    def finished_detail_items(self) -> Dict[str, List[dict]]:
+        """This run's items of each listing row whose detail page requests were all parsed"""
+        return {key: items for key, items in self.detail_items.items() if self.detail_pending[key] <= 0}
+
+    def finished_pages(self) -> Tuple[List[ListingPage], List[str]]:
+        """This run's pages that can be reused next run, and the urls of those that can't"""
+        pages, removed_urls = [], []
+        for url, page in self.current.items():
+            listing_requests = [r for r in self.requested[url] if r[0] in self.current]
+            # pages whose requests weren't all parsed, e.g. a detail page failed, are missing items. Only listing
+            # pages requested with just a url and a spider method can be requested again in their place
+            if self.pending[url] > 0 or any(name is None for _, name in listing_requests):
+                removed_urls.append(url)
+                continue
+            page.listing_requests.extend(listing_requests)
+            pages.append(page)
+        self.stats.set_value("listing_cache/incomplete_pages", len(removed_urls))
+        return pages, removed_urls
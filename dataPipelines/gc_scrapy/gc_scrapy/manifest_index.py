@@ -0,0 +1,105 @@
+##########################################################################################
+# Version hashes of the previous (cumulative) manifest, read once per process and split by
+# crawler_used. Every spider of a run shares the same index and looks its hashes up in its
+# own partition, instead of each FileDownloadPipeline re-reading the whole manifest.
+##########################################################################################
+
+import json
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, Iterable, Set, Tuple, Union
+
+# hashes of manifest lines written before crawler_used was recorded, they apply to every crawler
+UNATTRIBUTED = ""
+
+
+class PreviousHashes:
+    """Hashes one crawler filters, its own partition plus the unattributed hashes of old manifest lines"""
+
+    __slots__ = ("crawler_hashes", "unattributed_hashes")
+
+    def __init__(self, crawler_hashes: Set[str], unattributed_hashes: Set[str]):
+        self.crawler_hashes = crawler_hashes
+        self.unattributed_hashes = unattributed_hashes
+
+    def __contains__(self, version_hash: str) -> bool:
+        return version_hash in self.crawler_hashes or version_hash in self.unattributed_hashes
+
+    def __len__(self) -> int:
+        return len(self.crawler_hashes) + len(self.unattributed_hashes)
+
+
+class ManifestIndex:
+    """version_hash sets by crawler_used of a json lines manifest"""
+
+    def __init__(self, partitions: Dict[str, Set[str]], line_count: int = 0, load_seconds: float = 0.0):
+        self.partitions = partitions
+        self.line_count = line_count
+        self.load_seconds = load_seconds
+        self._memory_bytes = None
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "ManifestIndex":
+        start = perf_counter()
+        partitions: Dict[str, Set[str]] = {}
+        line_count = 0
+        for line in lines:
+            line_count += 1
+            if not line.strip():
+                continue
+            jdoc = json.loads(line)
+            crawler_used = jdoc.get("crawler_used") or UNATTRIBUTED
+            partition = partitions.get(crawler_used)
+            if partition is None:
+                partition = partitions[crawler_used] = set()
+            partition.add(jdoc["version_hash"])
+
+        return cls(partitions, line_count, perf_counter() - start)
+
+    @classmethod
+    def from_file(cls, location: Union[Path, str]) -> "ManifestIndex":
+        with Path(location).open(mode="r") as f:
+            return cls.from_lines(f)
+
+    def hashes_for(self, crawler_name: str) -> PreviousHashes:
+        return PreviousHashes(self.partitions.get(crawler_name, set()), self.partitions.get(UNATTRIBUTED, set()))
+
+    def hash_count(self) -> int:
+        return sum(len(partition) for partition in self.partitions.values())
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the sets and the hash strings in them, measured once"""
+        if self._memory_bytes is None:
+            self._memory_bytes = sum(
+                sys.getsizeof(partition) + sum(sys.getsizeof(h) for h in partition)
+                for partition in self.partitions.values()
+            )
+        return self._memory_bytes
+
+
+# indexes loaded in this process by manifest path, with the (mtime, size) they were loaded at
+_loaded_indexes: Dict[str, Tuple[Tuple[int, int], ManifestIndex]] = {}
+
+
+def get_manifest_index(location: Union[Path, str]) -> ManifestIndex:
+    """
+    The index of the manifest at location, read the first time a spider in this process asks for it
+    and again only if the file changed since
+    """
+    location = Path(location).resolve()
+    stat = location.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    loaded = _loaded_indexes.get(str(location))
+    if loaded and loaded[0] == version:
+        return loaded[1]
+
+    print("Reading in previous manifest", location)
+    index = ManifestIndex.from_file(location)
+    print(
+        f"Previous manifest loaded, {index.line_count} lines and {index.hash_count()} hashes for "
+        f"{len(index.partitions)} crawlers in {index.load_seconds:.2f}s, ~{index.memory_bytes() / 2 ** 20:.1f} MiB"
+    )
+    _loaded_indexes[str(location)] = (version, index)
+    return index
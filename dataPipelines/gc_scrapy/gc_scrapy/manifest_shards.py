@@ -0,0 +1,91 @@
+##########################################################################################
+# Manifest kept as one json lines shard per crawler_used, <shard dir>/<crawler>.json, with
+# index.json listing the shards. Spiders read only their own shard (plus the shard of old
+# lines without a crawler_used) and jobs fetch and upload only the shards of the spiders
+# they run.
+##########################################################################################
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Union
+from urllib.parse import quote
+
+from .hash_index import UNATTRIBUTED_SHARD
+from .manifest_index import UNATTRIBUTED, PreviousHashes, get_manifest_index
+
+SHARD_INDEX_FILE_NAME = "index.json"
+
+
+def shard_file_name(crawler_used: str) -> str:
+    return f"{quote(crawler_used or UNATTRIBUTED_SHARD, safe='')}.json"
+
+
+def read_shard_index(shard_dir: Union[Path, str]) -> Dict[str, dict]:
+    """Shard entries by crawler_used, {"file": name, "records": count, "updated": timestamp}"""
+    location = Path(shard_dir, SHARD_INDEX_FILE_NAME)
+    if not location.is_file():
+        return {}
+    try:
+        with location.open(mode="r") as f:
+            return json.load(f)
+    except (OSError, json.decoder.JSONDecodeError) as e:
+        print(f"Could not read manifest shard index at {location}", e)
+        return {}
+
+
+def shard_manifests(manifest_locations: Iterable[Union[Path, str]], shard_dir: Union[Path, str]) -> Dict[str, int]:
+    """
+    Appends the lines of json lines manifests to the shards of their crawler_used and updates the shard index
+
+    Returns:
+        number of lines appended per crawler_used
+    """
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    appended: Dict[str, int] = {}
+    shard_files = {}
+    try:
+        for manifest_location in manifest_locations:
+            with Path(manifest_location).open(mode="r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    crawler_used = json.loads(line).get("crawler_used") or UNATTRIBUTED_SHARD
+                    shard_file = shard_files.get(crawler_used)
+                    if shard_file is None:
+                        shard_file = shard_files[crawler_used] = Path(shard_dir, shard_file_name(crawler_used)).open(
+                            mode="a")
+                    shard_file.write(line if line.endswith("\n") else f"{line}\n")
+                    appended[crawler_used] = appended.get(crawler_used, 0) + 1
+    finally:
+        for shard_file in shard_files.values():
+            shard_file.close()
+
+    index = read_shard_index(shard_dir)
+    timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    for crawler_used, count in appended.items():
+        entry = index.setdefault(crawler_used, {"file": shard_file_name(crawler_used), "records": 0})
+        entry["records"] += count
+        entry["updated"] = timestamp
+
+    tmp_location = Path(shard_dir, f"{SHARD_INDEX_FILE_NAME}.{os.getpid()}.tmp")
+    with tmp_location.open(mode="w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_location, Path(shard_dir, SHARD_INDEX_FILE_NAME))
+
+    return appended
+
+
+def load_shard_hashes(shard_dir: Union[Path, str], crawler_name: str) -> PreviousHashes:
+    """Hashes the crawler filters, read from its shard and the unattributed shard only"""
+    def shard_partition(shard_name: str, partition_name: str):
+        location = Path(shard_dir, shard_file_name(shard_name))
+        if not location.is_file():
+            print(f"No previous manifest shard at {location}")
+            return set()
+        return get_manifest_index(location).partitions.get(partition_name, set())
+
+    return PreviousHashes(shard_partition(crawler_name, crawler_name), shard_partition(UNATTRIBUTED_SHARD, UNATTRIBUTED))
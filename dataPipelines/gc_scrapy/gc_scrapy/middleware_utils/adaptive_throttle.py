@@ -0,0 +1,114 @@
+import json
+import os
+import typing
+from datetime import datetime
+from pathlib import Path
+
+# where the learned per domain limits are kept if ADAPTIVE_THROTTLE_STATE_LOCATION isn't set
+DEFAULT_THROTTLE_STATE_LOCATION: str = os.environ.get(
+    "GC_SCRAPY_THROTTLE_STATE_LOCATION",
+    str(Path.home() / ".gc_scrapy" / "throttle_state.json")
+)
+
+# statuses sites answer with when they think we are crawling too fast
+BAN_STATUSES = {403, 429, 503}
+# lowercase signatures of the block pages some bot walls serve with a 200. Spiders opt in to checking responses for
+# them, or their own, with GCSpider.ban_page_markers. Ordinary pages embed captcha widgets, so a bare "captcha" isn't one
+BLOCK_PAGE_SIGNATURES = (
+    "request unsuccessful. incapsula incident id",
+    "<title>attention required! | cloudflare</title>",
+    "the requested url was rejected. please consult with your administrator.",
+    "errors.edgesuite.net",
+)
+# delay a domain backs off to at least, even when starting from a near zero delay
+MIN_BACKOFF_DELAY = 1.0
+
+
+class DomainThrottle:
+    """Download delay and concurrency of one domain.
+    Bans halve the concurrency and double the delay, every ramp_up_after healthy responses in a row
+    give back one concurrent request and a quarter of the delay
+    """
+
+    def __init__(self, delay: float, concurrency: int, min_delay: float, max_delay: float,
+                 max_concurrency: int, ramp_up_after: int):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_concurrency = max_concurrency
+        self.ramp_up_after = ramp_up_after
+
+        self.delay = min(max(delay, min_delay), max_delay)
+        self.concurrency = min(max(int(concurrency), 1), max_concurrency)
+        self.healthy_streak = 0
+
+    def backoff(self, min_wait: float = 0.0) -> None:
+        """Called on a ban signal, min_wait is e.g. the Retry-After the site asked for"""
+        self.delay = min(self.max_delay, max(self.delay * 2, MIN_BACKOFF_DELAY, min_wait))
+        self.concurrency = max(1, self.concurrency // 2)
+        self.healthy_streak = 0
+
+    def record_healthy(self, latency: float, slow_latency: float) -> None:
+        """Called on a normal response, slow responses hold the limits and stretch the delay to keep up"""
+        if latency > slow_latency:
+            self.delay = min(self.max_delay, max(self.delay, latency / self.concurrency))
+            self.healthy_streak = 0
+            return
+
+        self.healthy_streak += 1
+        if self.healthy_streak >= self.ramp_up_after:
+            self.healthy_streak = 0
+            self.delay = max(self.min_delay, self.delay * 0.75)
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+    def to_dict(self) -> dict:
+        return {"delay": round(self.delay, 3), "concurrency": self.concurrency}
+
+
+def looks_like_ban_page(body: bytes, markers: typing.Iterable[str], max_bytes: int = 65536) -> bool:
+    """True if the start of the body has any of the markers, case insensitive"""
+    head = body[:max_bytes].lower()
+    return any(marker.encode("utf-8") in head for marker in markers)
+
+
+def parse_retry_after(value: typing.Optional[bytes]) -> float:
+    """Seconds from a Retry-After header, 0 if it's missing or an http date"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ThrottleState:
+    """Learned limits per domain, read at the start of a run to seed the throttles
+    :param location: path of the json file the limits are kept in, created on save if it doesn't exist
+    """
+
+    def __init__(self, location: typing.Union[str, Path] = DEFAULT_THROTTLE_STATE_LOCATION):
+        self.location = Path(location)
+        self.domains: typing.Dict[str, dict] = self.read()
+
+    def read(self) -> typing.Dict[str, dict]:
+        if not self.location.is_file():
+            return {}
+        try:
+            with self.location.open(mode="r") as f:
+                return json.load(f)
+        except (OSError, json.decoder.JSONDecodeError) as e:
+            print(f"Could not read throttle state at {self.location}, starting fresh", e)
+            return {}
+
+    def get(self, domain: str) -> typing.Optional[dict]:
+        return self.domains.get(domain)
+
+    def save(self, throttles: typing.Dict[str, DomainThrottle]) -> None:
+        """Writes the limits of the given domains, keeping what other runs saved for the rest"""
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        self.domains = self.read()
+        for domain, throttle in throttles.items():
+            self.domains[domain] = {**throttle.to_dict(), "updated": timestamp}
+
+        self.location.parent.mkdir(parents=True, exist_ok=True)
+        tmp_location = self.location.with_suffix(f"{self.location.suffix}.{os.getpid()}.tmp")
+        with tmp_location.open(mode="w") as f:
+            json.dump(self.domains, f, indent=2, sort_keys=True)
+        os.replace(tmp_location, self.location)
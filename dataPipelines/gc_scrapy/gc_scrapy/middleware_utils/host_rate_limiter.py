@@ -0,0 +1,84 @@
+import fcntl
+import os
+import tempfile
+import typing
+from pathlib import Path
+
+# lock files shared by every crawler process on the node if HOST_RATE_LIMIT_DIR isn't set
+DEFAULT_HOST_RATE_LIMIT_DIR: str = os.environ.get(
+    "GC_SCRAPY_HOST_RATE_LIMIT_DIR",
+    os.path.join(tempfile.gettempdir(), "gc_scrapy_host_rate_limits")
+)
+DEFAULT_HOST_RATE_LIMIT_BACKEND = \
+    "dataPipelines.gc_scrapy.gc_scrapy.middleware_utils.host_rate_limiter.FileRateLimitBackend"
+
+
+def get_host_limit(host: str, limits: typing.Dict[str, float]) -> typing.Tuple[typing.Optional[str], float]:
+    """
+    (configured domain, requests per second) for the host or its closest parent domain in limits,
+    (None, 0) if the host has no limit. www.mynavyhr.navy.mil is limited by a mynavyhr.navy.mil entry
+    """
+    labels = host.lower().split(".")
+    for i in range(len(labels) - 1):
+        domain = ".".join(labels[i:])
+        if domain in limits:
+            return domain, float(limits[domain])
+    return None, 0.0
+
+
+class RateLimitBackend:
+    """Keeps the next free send time of each domain, reserve has to be atomic for everything sharing the backend"""
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls()
+
+    def reserve(self, domain: str, interval: float, now: float) -> float:
+        """Reserves the domain's next send time and returns the seconds to wait for it
+        :param domain: domain the budget is kept for
+        :param interval: seconds between requests to the domain
+        :param now: current time.time()
+        """
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Shared by the crawlers of one process only"""
+
+    next_send_times: typing.Dict[str, float] = {}
+
+    def reserve(self, domain: str, interval: float, now: float) -> float:
+        send_time = max(now, self.next_send_times.get(domain, 0.0))
+        self.next_send_times[domain] = send_time + interval
+        return send_time - now
+
+
+class FileRateLimitBackend(RateLimitBackend):
+    """Shared by every process on the node using the same directory, one flock'ed file per domain"""
+
+    def __init__(self, directory: typing.Union[str, Path] = DEFAULT_HOST_RATE_LIMIT_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get("HOST_RATE_LIMIT_DIR", DEFAULT_HOST_RATE_LIMIT_DIR))
+
+    def reserve(self, domain: str, interval: float, now: float) -> float:
+        fd = os.open(Path(self.directory, domain), os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                next_send_time = float(os.read(fd, 64) or 0)
+            except ValueError:
+                next_send_time = 0.0
+
+            send_time = max(now, next_send_time)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, repr(send_time + interval).encode("ascii"))
+        finally:
+            # closing the file releases the lock
+            os.close(fd)
+
+        return send_time - now
@@ -0,0 +1,86 @@
+import random
+import typing
+
+# delays picked from when randomly_delay_request is True
+DEFAULT_RANDOM_DELAYS = range(0, 3)
+
+DelaySpec = typing.Union[bool, int, float, range, typing.List[int], dict, None]
+
+
+class DelayPolicy:
+    """Spaces out the requests sharing this policy.
+    next_delay reserves the next send time so requests waiting at the same time queue up instead of bunching
+    """
+
+    def __init__(self):
+        self.next_send_time = None
+
+    def gap(self) -> float:
+        """Seconds between a request and the next one"""
+        raise NotImplementedError
+
+    def next_delay(self, now: float) -> float:
+        """Seconds the request arriving at now has to wait before it is sent"""
+        send_time = now if self.next_send_time is None else max(now, self.next_send_time)
+        self.next_send_time = send_time + self.gap()
+        return send_time - now
+
+
+class FixedDelay(DelayPolicy):
+    def __init__(self, seconds: float):
+        super().__init__()
+        self.seconds = seconds
+
+    def gap(self) -> float:
+        return self.seconds
+
+
+class RandomDelay(DelayPolicy):
+    def __init__(self, choices: typing.Sequence[float] = DEFAULT_RANDOM_DELAYS):
+        super().__init__()
+        self.choices = choices
+
+    def gap(self) -> float:
+        return random.choice(self.choices)
+
+
+class TokenBucketDelay(DelayPolicy):
+    """Allows bursts of up to burst requests, refilled at rate requests per second"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = None
+
+    def next_delay(self, now: float) -> float:
+        if self.updated is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # negative tokens are requests already waiting for a refill
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+def make_delay_policy(spec: DelaySpec) -> typing.Optional[DelayPolicy]:
+    """
+    Builds a new policy from a spider's declared delay
+        True -> random delay of 0, 1 or 2 seconds
+        int or float -> fixed delay in seconds
+        range or list -> random delay picked from it
+        {"rate": requests per second, "burst": requests} -> token bucket
+        False, None or 0 -> no delay
+    """
+    if spec is True:
+        return RandomDelay()
+    if not spec:
+        return None
+    if isinstance(spec, (int, float)):
+        return FixedDelay(spec)
+    if isinstance(spec, (range, list, tuple)):
+        return RandomDelay(spec)
+    if isinstance(spec, dict):
+        return TokenBucketDelay(spec["rate"], spec.get("burst", 1))
+
+    raise ValueError(f"Unrecognized delay policy {spec!r}")
@@ -8,8 +8,8 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ##########################################################################################
 
-import copy
-from typing import Union
+from time import perf_counter
+from typing import Optional, Union
 from itemadapter import ItemAdapter
 from datetime import datetime
 import os
@@ -18,11 +18,22 @@ import json
 from jsonschema.exceptions import ValidationError
 
 import scrapy
+from scrapy import signals
 from scrapy.pipelines.media import MediaPipeline
 from scrapy.exceptions import DropItem
+from twisted.python.threadpool import ThreadPool
 
 from dataPipelines.gc_scrapy.gc_scrapy.utils import unzip_docs_as_needed
 from .validators import DefaultOutputSchemaValidator, SchemaValidator
+from .archives import format_for_compression_type
+from .content_store import DUPLICATE_MODES, DUPLICATES_HARDLINK, DUPLICATES_REFERENCE, ContentStore
+from .download_streams import DownloadedFile, StreamedDownload
+from .hash_index import IndexedPreviousHashes, get_hash_index
+from .manifest_index import PreviousHashes, get_manifest_index
+from .manifest_shards import load_shard_hashes
+from .record_writers import BufferedJsonLinesWriter, FlushPolicy
+from .validator_cache import CachedDownload, ValidatorCache
+from .GCSpider import GCSpider
 from . import OUTPUT_FOLDER_NAME
 from .utils import dict_to_sha256_hex_digest, get_fqdn_from_web_url
 
@@ -34,6 +45,9 @@ SUPPORTED_FILE_EXTENSIONS = [
     "zip",
 ] # File types the item pipeline supports
 
+# request meta item_completed needs, kept with the downloaded file in place of the response
+DOWNLOAD_META_KEYS = ("output_file_name", "doc_type", "compression_type")
+
 
 class FileDownloadPipeline(MediaPipeline):
     def __init__(self, download_func=None, settings=None):
@@ -41,7 +55,7 @@ class FileDownloadPipeline(MediaPipeline):
         settings.setdefault("MEDIA_ALLOW_REDIRECTS", True)
         super().__init__(download_func, settings)
 
-    previous_hashes = set()
+    previous_hashes: Union[PreviousHashes, IndexedPreviousHashes]
     output_dir: Path
     previous_manifest_path: Path
     job_manifest_path: Path
@@ -52,14 +66,113 @@ class FileDownloadPipeline(MediaPipeline):
         print("++ Initiating downloader for", spider.name)
 
         self.output_dir = Path(spider.download_output_dir).resolve()
-        self.job_manifest_path = Path(self.output_dir, "manifest.json").resolve()
+        if spider.job_manifest_location:
+            self.job_manifest_path = Path(spider.job_manifest_location).resolve()
+        else:
+            self.job_manifest_path = Path(self.output_dir, "manifest.json").resolve()
+
+        self.previous_manifest_path = Path(spider.previous_manifest_location).resolve() \
+            if spider.previous_manifest_location else None
+
+        self.dont_filter_previous_hashes = spider.dont_filter_previous_hashes
+        self.previous_hashes = PreviousHashes(set(), set())
+        self.manifest_index = None
+        if not self.dont_filter_previous_hashes and spider.previous_hash_index_location:
+            # memory-mapped index build-hash-index made from the cumulative manifest, see hash_index.py
+            self.previous_hashes = get_hash_index(
+                spider.previous_hash_index_location,
+                use_bloom=spider.crawler.settings.getbool("PREVIOUS_HASH_INDEX_BLOOM", True),
+            ).hashes_for(spider.name)
+            print(f"Previous hash index loaded, will filter {len(self.previous_hashes)} hashes for {spider.name}")
+            spider.crawler.stats.set_value("previous_manifest/hashes", len(self.previous_hashes))
+        elif not self.dont_filter_previous_hashes and spider.previous_manifest_shard_dir:
+            # only this spider's shard of the manifest, see manifest_shards.py
+            self.previous_hashes = load_shard_hashes(spider.previous_manifest_shard_dir, spider.name)
+            print(f"Previous manifest shard loaded, will filter {len(self.previous_hashes)} hashes for {spider.name}")
+            spider.crawler.stats.set_value("previous_manifest/hashes", len(self.previous_hashes))
+        elif not self.dont_filter_previous_hashes:
+            self.load_hashes_from_cumulative_manifest(self.previous_manifest_path, spider.name)
+            spider.crawler.stats.set_value("previous_manifest/hashes", len(self.previous_hashes))
+            if self.manifest_index:
+                # the index is shared by every spider in the process, these are for the whole manifest
+                spider.crawler.stats.set_value("previous_manifest/load_seconds", round(self.manifest_index.load_seconds, 3))
+                spider.crawler.stats.set_value("previous_manifest/memory_bytes", self.manifest_index.memory_bytes())
+
+        # for GCSpider.follow_detail_page, which only reuses items that are in the previous manifest
+        spider.previous_hashes = self.previous_hashes
+
+        # spiders that decode the whole body in download_response_handler can only stream with a download_stream_decoder
+        self.download_stream_decoder = getattr(spider, "download_stream_decoder", None)
+        self.stream_downloads = self.download_stream_decoder is not None or \
+            getattr(type(spider), "download_response_handler", None) is GCSpider.download_response_handler
+        self.open_streams = set()
+        spider.crawler.signals.connect(self.bytes_received, signal=signals.bytes_received)
+
+        # file moves, unzipping and metadata/manifest writes run here instead of on the reactor thread
+        self.file_writer_pool = ThreadPool(
+            minthreads=0,
+            maxthreads=spider.crawler.settings.getint("FILE_WRITER_THREADS", 4),
+            name=f"{spider.name}-file-writer",
+        )
+        self.file_writer_pool.start()
+        self.file_writer_queue_depth = 0
+        self.unzip_threads = spider.crawler.settings.getint("UNZIP_THREADS", 4)
+
+        # manifest and dead queue lines are appended from the file writer threads, the writers lock themselves
+        flush_policy = FlushPolicy.from_settings(spider.crawler.settings)
+        self.manifest_writer = BufferedJsonLinesWriter(self.job_manifest_path, flush_policy)
+        self.dead_queue_writer = BufferedJsonLinesWriter(Path(self.output_dir, "dead_queue.json"), flush_policy)
+
+        # downloads whose content was seen before become hardlinks to it, see content_store.py
+        self.content_store = None
+        if getattr(spider, "content_store_location", None):
+            self.content_store = ContentStore(spider.content_store_location)
+            self.content_store_duplicates = spider.crawler.settings.get("CONTENT_STORE_DUPLICATES", DUPLICATES_HARDLINK)
+            if self.content_store_duplicates not in DUPLICATE_MODES:
+                print(f"Unknown CONTENT_STORE_DUPLICATES {self.content_store_duplicates}, keeping duplicates as hardlinks")
+                self.content_store_duplicates = DUPLICATES_HARDLINK
+
+        # downloads whose url still has the content it had last time are written as metadata only, see validator_cache.py
+        self.validator_cache = None
+        if getattr(spider, "validator_cache_location", None):
+            self.validator_cache = ValidatorCache(spider.validator_cache_location)
 
-        self.previous_manifest_path = Path(spider.previous_manifest_location).resolve()
+    def close_spider(self, spider):
+        self.file_writer_pool.stop()
 
-        if not spider.dont_filter_previous_hashes:
-            self.load_hashes_from_cumulative_manifest(self.previous_manifest_path, spider.name)
+        if self.content_store is not None:
+            stats = spider.crawler.stats
+            stats.set_value("content_store/added", self.content_store.added)
+            stats.set_value("content_store/duplicates", self.content_store.duplicates)
+            stats.set_value("content_store/duplicate_bytes", self.content_store.duplicate_bytes)
+
+        for writer in (self.manifest_writer, self.dead_queue_writer):
+            try:
+                writer.close()
+            except Exception as e:
+                print("Failed to write", writer.path, e)
+
+        if self.validator_cache is not None:
+            self.validator_cache.close()
+
+        # temp files of downloads that never completed
+        for stream in self.open_streams:
+            stream.discard()
+        self.open_streams.clear()
+
+    def bytes_received(self, data, request, spider):
+        """Writes each chunk of a file download to its temp file as it arrives"""
+        stream = request.meta.get("download_stream")
+        if stream is not None:
+            stream.write(request, data)
+
+    def new_stream(self, decoder_factory=None) -> StreamedDownload:
+        stream = StreamedDownload(self.output_dir, decoder_factory)
+        self.open_streams.add(stream)
+        return stream
 
     def load_hashes_from_cumulative_manifest(self, previous_manifest_path, spider_name):
+        """Filters the spider's partition of the previous manifest, the manifest is read once for all spiders in the process"""
         file_location = Path(previous_manifest_path).resolve() if previous_manifest_path else None
 
         if not file_location or not os.path.isfile(file_location):
@@ -69,43 +182,37 @@ class FileDownloadPipeline(MediaPipeline):
             else:
                 exit(1)
 
-        print("Reading in previous manifest")
-        count = 0
-        with file_location.open(mode="r") as f:
-            for line in f.readlines():
-                count += 1
-                if count % 1000 == 0:
-                    print(f"{count} lines read in")
-                if not line.strip():
-                    continue
-
-                jdoc = json.loads(line)
-                crawler_used = jdoc.get("crawler_used")
-                # covers old manifest items with no crawler info
-                if not crawler_used:
-                    self.previous_hashes.add(jdoc["version_hash"])
-                # skips adding hashes for other spiders for combined manifest files with that info
-                elif crawler_used == spider_name:
-                    self.previous_hashes.add(jdoc["version_hash"])
-
-        num_hashes = len(self.previous_hashes)
-        print(f"Previous manifest loaded, will filter {num_hashes} hashes")
+        self.manifest_index = get_manifest_index(file_location)
+        self.previous_hashes = self.manifest_index.hashes_for(spider_name)
+        print(f"Previous manifest loaded, will filter {len(self.previous_hashes)} hashes for {spider_name}")
 
     @staticmethod
     def create_items_from_nested_zip(zipped_item_paths, item):
         for sub_path in zipped_item_paths:
-            new_item = copy.deepcopy(item)
+            # shallow copy, nested values are shared with item so version_hash_raw_data is replaced, not changed
+            new_item = item.copy()
             new_item["doc_name"] = sub_path.stem
             if item['crawler_used'] == "far_subpart_regs":
                 new_item["doc_title"] = sub_path.stem
             else:
                 new_item["doc_title"] = sub_path.stem.split("-", 1)[1].strip()
-            new_item["version_hash_raw_data"]["doc_name"] = new_item["doc_name"]
+            new_item["version_hash_raw_data"] = {**item["version_hash_raw_data"], "doc_name": new_item["doc_name"]}
             new_item["version_hash_raw_data"]["sub_file_version_hash"] = dict_to_sha256_hex_digest(
                 new_item["version_hash_raw_data"]
             )
             yield new_item
 
+    @staticmethod
+    def download_file_name(output_file_name: str) -> str:
+        """Path of a download that isn't an archive, relative to output_dir"""
+        # If it is a jbook crawler (and needs a different file output style)
+        if 'rdte;' in output_file_name or 'procurement;' in output_file_name:
+            # self.output_dir is set when the crawler is crawled and is the high level directory information
+            # Should point to bronze/jbook/pdfs instead of bronze/gamechanger/pdf
+            # jbook_output_file_path is type/year/filename
+            return output_file_name.replace(';', '/')
+        return output_file_name
+
     @staticmethod
     def get_first_supported_downloadable_item(downloadable_items: list) -> Union[dict, None]:
         """Get first supported downloadable item corresponding to doc, has correct type and is not cac blocked"""
@@ -146,10 +253,27 @@ class FileDownloadPipeline(MediaPipeline):
                 "doc_type": file_item["doc_type"],
                 "compression_type": file_item["compression_type"],
             }
+            if self.stream_downloads:
+                meta["download_stream"] = self.new_stream(self.download_stream_decoder)
+
+            headers = info.spider.download_request_headers
+            # archives are unpacked in to several documents, those are always downloaded again
+            if self.validator_cache is not None and not file_item["compression_type"]:
+                cached = self.validator_cache.get(url)
+                # the file can only be left out if it was shipped under the name this item writes, a changed
+                # doc_name, e.g. from a reworded title, needs the file written again under the new one
+                if cached and cached.file_name != self.download_file_name(output_file_name):
+                    info.spider.crawler.stats.inc_value("validator_cache/renamed")
+                    cached = None
+                if cached:
+                    meta["cached_download"] = cached
+                    if cached.conditional_headers():
+                        headers = {**(headers or {}), **cached.conditional_headers()}
+                        info.spider.crawler.stats.inc_value("validator_cache/conditional_requests")
 
             try:
-                if info.spider.download_request_headers:
-                    yield scrapy.Request(url, headers=info.spider.download_request_headers, meta=meta)
+                if headers:
+                    yield scrapy.Request(url, headers=headers, meta=meta)
                 else:
                     yield scrapy.Request(url, meta=meta)
             except Exception as probably_url_error:
@@ -159,15 +283,61 @@ class FileDownloadPipeline(MediaPipeline):
             return item
 
     def media_downloaded(self, response, request, info):
-        """Called for each completed response from get_media_requests, returned to item_completed"""
+        """Called for each completed response from get_media_requests, returned to item_completed.
+        The body is written to a temp file here so the cached result holds a DownloadedFile instead of the response"""
+        meta = {k: response.meta.get(k) for k in DOWNLOAD_META_KEYS}
+        stream = response.meta.get("download_stream")
+        cached = response.meta.get("cached_download")
+
+        if response.status == 304 and cached:
+            if stream is not None:
+                stream.discard()
+                self.open_streams.discard(stream)
+            info.spider.crawler.stats.inc_value("validator_cache/not_modified")
+            return (True, DownloadedFile(None, cached.content_length, response.status, meta, cached.content_sha256,
+                                         unchanged=True), None)
+
         # I dont know why this isnt being handled automatically here
         # Just filtering by response code
-        if 200 <= response.status < 300:
-            return (True, response, None)
-        elif not len(response.body):
-            return (False, response, "Response has empty body")
-        else:
-            return (False, response, None)
+        if not 200 <= response.status < 300:
+            if stream is not None:
+                stream.discard()
+                self.open_streams.discard(stream)
+            reason = None if len(response.body) else "Response has empty body"
+            return (False, DownloadedFile(None, 0, response.status, meta), reason)
+
+        try:
+            if stream is None:
+                stream = self.new_stream()
+                stream.write(response.request, info.spider.download_response_handler(response))
+            elif not stream.has_all_of(response):
+                # handlers without bytes_received (e.g. file://) or a restarted download, write the whole body
+                stream.restart(response.request)
+                stream.write(response.request, response.body)
+            path, size = stream.finish()
+        except Exception as e:
+            stream.discard()
+            return (False, DownloadedFile(None, 0, response.status, meta), f"Could not decode download: {e}")
+        finally:
+            self.open_streams.discard(stream)
+
+        if cached and cached.same_content(size, stream.sha256):
+            # the server didn't answer the conditional request, but the content is the same
+            stream.discard()
+            info.spider.crawler.stats.inc_value("validator_cache/unchanged_content")
+            return (True, DownloadedFile(None, size, response.status, meta, stream.sha256, unchanged=True), None)
+
+        if self.validator_cache is not None and not meta["compression_type"]:
+            # cached once the file is written, see write_item_files
+            meta["cached_download"] = CachedDownload(
+                url=request.url,
+                etag=response.headers.get("ETag", b"").decode("latin-1") or None,
+                last_modified=response.headers.get("Last-Modified", b"").decode("latin-1") or None,
+                content_length=size,
+                content_sha256=stream.sha256,
+                file_name=self.download_file_name(meta["output_file_name"]),
+            )
+        return (True, DownloadedFile(path, size, response.status, meta, stream.sha256), None)
 
     def media_failed(self, failure, request, info):
         # I have never seen this called
@@ -177,7 +347,6 @@ class FileDownloadPipeline(MediaPipeline):
         return (False, failure, "Pipeline Media Request Failed")
 
     def add_to_dead_queue(self, item, reason):
-        path = Path(self.output_dir, "dead_queue.json").resolve() if self.output_dir else None
         if isinstance(reason, int):
             reason_text = f"HTTP Response Code {reason}"
         elif isinstance(reason, str):
@@ -185,52 +354,93 @@ class FileDownloadPipeline(MediaPipeline):
         else:
             reason_text = "Unknown failure"
 
-        with open(path, "a+") as f:
-            dead_dict = {"document": dict(item), "failure_reason": reason_text}
-            try:
-                f.write(json.dumps(dead_dict))
-                f.write("\n")
-
-            except Exception as e:
-                print("Failed to write to dead_queue file", path, e)
-
-    def add_to_manifest(self, item):
-        path = self.job_manifest_path
-        with open(self.job_manifest_path, "a") as f:
-            try:
-                f.write(
-                    json.dumps(
-                        {
-                            "version_hash": item["version_hash"],
-                            "doc_name": item["doc_name"],
-                            "crawler_used": item["crawler_used"],
-                            "access_timestamp": item["access_timestamp"],
-                        }
-                    )
-                )
-                f.write("\n")
-
-            except Exception as e:
-                print("Failed to write to manifest file", path, e)
+        dead_dict = {"document": dict(item), "failure_reason": reason_text}
+        try:
+            self.dead_queue_writer.write(dead_dict)
+        except Exception as e:
+            print("Failed to write to dead_queue file", self.dead_queue_writer.path, e)
+
+    def add_to_manifest(self, item, content: Optional[dict] = None):
+        """:param content: content_sha256 and content_size of the item's download, content_reference if its file
+        wasn't kept because the content store already had it"""
+        record = {
+            "version_hash": item["version_hash"],
+            "doc_name": item["doc_name"],
+            "crawler_used": item["crawler_used"],
+            "access_timestamp": item["access_timestamp"],
+        }
+        if content:
+            record.update(content)
+        try:
+            self.manifest_writer.write(record)
+        except Exception as e:
+            print("Failed to write to manifest file", self.job_manifest_path, e)
 
     def item_completed(self, results, item, info):
-        """The function is called for each item after all media requests have been processed"""
-        
+        """The function is called for each item after all media requests have been processed.
+        Returns a Deferred of write_item_files run on the file writer pool so downloads keep going meanwhile"""
+        from twisted.internet import reactor, threads
+
         if not info.downloaded:
             return item # return item for crawler output if download was skipped
 
+        stats = info.spider.crawler.stats
+        self.file_writer_queue_depth += 1
+        stats.max_value("file_writer/max_queue_depth", self.file_writer_queue_depth)
+        timings = {"queued": perf_counter()}
+
+        def write_item_files():
+            timings["started"] = perf_counter()
+            try:
+                return self.write_item_files(results, item)
+            finally:
+                timings["finished"] = perf_counter()
+
+        def record_stats(result):
+            # stats are only touched from the reactor thread
+            self.file_writer_queue_depth -= 1
+            started = timings.get("started", timings["queued"])
+            stats.inc_value("file_writer/item_count")
+            stats.inc_value("file_writer/queue_wait_seconds", started - timings["queued"])
+            stats.inc_value("file_writer/work_seconds", timings.get("finished", started) - started)
+            return result
+
+        d = threads.deferToThreadPool(reactor, self.file_writer_pool, write_item_files)
+        d.addBoth(record_stats)
+        return d
+
+    def store_content(self, path: Path, download: DownloadedFile) -> bool:
+        """Adds a moved download to the content store, returns True if its file was removed for a reference"""
+        try:
+            duplicate = self.content_store.add(path, download.sha256)
+        except OSError as e:
+            print("Failed to add", path, "to the content store", self.content_store.directory, e)
+            return False
+
+        if not duplicate or self.content_store_duplicates != DUPLICATES_REFERENCE:
+            return False
+        with DownloadedFile.move_lock:
+            path.unlink()
+            if download.path == path:
+                # items sharing the cached download copy it from the store instead
+                download.path = self.content_store.path_for(download.sha256)
+        return True
+
+    def write_item_files(self, results, item):
+        """Moves the item's downloads in to place, unzips them and writes their metadata and manifest entries"""
         ### first in results is supposed to be 'ok' status but it always returns true b/c 404 doesnt cause failure for some reason :(
         ### so added to the media_downloaded function as a sub-tuple in return
         file_downloads = []
         unzipped_items = []
-        for (_, (okay, response, reason)) in results: # Loop over results of requests made during crawling
+        content = {}
+        for (_, (okay, download, reason)) in results: # Loop over results of requests made during crawling
             if not okay:
-                self.add_to_dead_queue(item, reason if reason else int(response.status))
+                self.add_to_dead_queue(item, reason if reason else int(download.status))
             else:
                 # Get values from metadata:
-                output_file_name = response.meta["output_file_name"] # Assigned to metadata above in get_media_requests function
-                doc_type = response.meta["doc_type"]
-                compression_type = response.meta["compression_type"]
+                output_file_name = download.meta["output_file_name"] # Assigned to metadata above in get_media_requests function
+                doc_type = download.meta["doc_type"]
+                compression_type = download.meta["compression_type"]
                 # Build a path to each file associated with an item:
                 if compression_type:
                     file_download_path = Path(self.output_dir, output_file_name).with_suffix(f".{compression_type}") # Path for downloaded zipped file
@@ -238,29 +448,32 @@ class FileDownloadPipeline(MediaPipeline):
                     # Path for unzipped files
                     metadata_download_path = f"{file_unzipped_path}.metadata" # Path for the accompanying metadata file
                 else:
-                    # If it is a jbook crawler (and needs a different file output style)
-                    if 'rdte;' in output_file_name or 'procurement;' in output_file_name:
-                        jbook_output_file_path = output_file_name.replace(';', '/')
-                        # self.output_dir is set when the crawler is crawled and is the high level directory information
-                        # Should point to bronze/jbook/pdfs instead of bronze/gamechanger/pdf
-                        # jbook_output_file_path is type/year/filename
-                        file_download_path = Path(self.output_dir, jbook_output_file_path)
-                    else:
-                        file_download_path = Path(self.output_dir, output_file_name)  # Path for downloaded file
+                    file_download_path = Path(self.output_dir, self.download_file_name(output_file_name))  # Path for downloaded file
                     metadata_download_path = f"{file_download_path}.metadata"  # Path for the accompanying metadata file
 
-                with open(file_download_path, "wb") as f: # Download each file to it's download path
-                    try:
-                        to_write = info.spider.download_response_handler(response)
-                        f.write(to_write)
-                        f.close()
-                    except Exception as e:
-                        print("Failed to write file to", file_download_path, "Error:", e)
-                        return item
+                if download.unchanged:
+                    # same content as the file an earlier run shipped, only the metadata is new
+                    with open(metadata_download_path, "w") as f:
+                        try:
+                            f.write(json.dumps(dict(item)))
+                        except Exception as e:
+                            print("Failed to write metadata", file_download_path, e)
+                    content = {"content_sha256": download.sha256, "content_size": download.size, "content_reference": True}
+                    file_downloads.append(file_download_path)
+                    continue
+
+                try: # Move each downloaded file to it's download path
+                    download.move_to(file_download_path)
+                except Exception as e:
+                    print("Failed to write file to", file_download_path, "Error:", e)
+                    return item
+
+                if download.sha256:
+                    content = {"content_sha256": download.sha256, "content_size": download.size}
 
                 if compression_type:
-                    if compression_type.lower() == "zip":
-                        unzipped_files = unzip_docs_as_needed(file_download_path, file_unzipped_path, doc_type) # Unzip downloaded zip documents
+                    if format_for_compression_type(compression_type.lower()) is not None:
+                        unzipped_files = unzip_docs_as_needed(file_download_path, file_unzipped_path, doc_type, self.unzip_threads, compression_type.lower()) # Unpack downloaded archives
 
                         if unzipped_files: # If files have been unzipped...
                             for unzipped_item in self.create_items_from_nested_zip(unzipped_files, item): # Create new DocItem for each unzipped file
@@ -282,16 +495,26 @@ class FileDownloadPipeline(MediaPipeline):
 
                                 unzipped_items.append(unzipped_item)
                 else: # If original download is not a compressed file...
+                    if self.content_store is not None and download.sha256:
+                        if self.store_content(file_download_path, download):
+                            content["content_reference"] = True
+
                     with open(metadata_download_path, "w") as f: # Write the metadata for each file
                         try:
                             f.write(json.dumps(dict(item)))
                         except Exception as e:
                             print("Failed to write metadata", file_download_path, e)
 
+                    if download.meta.get("cached_download"):
+                        try:
+                            self.validator_cache.put(download.meta["cached_download"])
+                        except Exception as e:
+                            print("Failed to cache validators of", file_download_path, e)
+
                 file_downloads.append(file_download_path)
 
         if file_downloads: # If file was downloaded, add to manifest
-            self.add_to_manifest(item)
+            self.add_to_manifest(item, content)
 
         if len(unzipped_items) > 1: # If there were unzipped files, return each as item in list 'unzipped_items'
             return unzipped_items
@@ -318,7 +541,12 @@ class DeduplicaterPipeline:
 
 class AdditionalFieldsPipeline:
     def process_item(self, item, spider):
+        self.add_fields(item, spider)
+        return item
 
+    @staticmethod
+    def add_fields(item, spider) -> None:
+        """Fills in the item's fields from the spider, in place"""
         if getattr(spider, "display_org", None): # If DocItem.display_org= None, propogate value with value of spider class variable display_org
             item["display_org"] = spider.display_org
 
@@ -369,8 +597,6 @@ class AdditionalFieldsPipeline:
            # ensure is_revoked is part of hash
            # item["version_hash_raw_data"]["is_revoked"] = item["is_revoked"]
 
-        return item
-
 
 class ValidateJsonPipeline:
     """Validates json as Scrapy passes each item to be validated to self.process_item
@@ -384,13 +610,15 @@ class ValidateJsonPipeline:
         self.validator = validator
 
     def process_item(self, item, spider):
-        item_dict = ItemAdapter(item).asdict()
-        name = item_dict.get("doc_name", str(item_dict))
+        self.validate(ItemAdapter(item).asdict())
+        return item
 
+    def validate(self, item_dict: dict) -> None:
+        """Raises DropItem if the item's fields don't match the schema"""
         try:
             self.validator.validate_dict(item_dict)
-            return item
         except ValidationError as ve:
+            name = item_dict.get("doc_name", str(item_dict))
             raise DropItem(f"Dropped Item: {name} failed validation: {ve}")
 
 
@@ -403,6 +631,7 @@ class JsonWriterPipeline(object):
         self.file = open(json_name, "w")
         # Your scraped items will be saved in the file 'scraped_items.json'.
         # You can change the filename to whatever you want.
+        self.validator = DefaultOutputSchemaValidator()
 
     def close_spider(self, spider):
         self.file.close()
@@ -410,8 +639,7 @@ class JsonWriterPipeline(object):
     def process_item(self, item, spider):
         doc = item["document"]
 
-        validator = DefaultOutputSchemaValidator()
-        validator.validate(doc)
+        self.validator.validate(doc)
         self.file.write(doc + "\n")
         return doc
 
@@ -421,6 +649,38 @@ class FileNameFixerPipeline:
         if not item["doc_name"]:
             raise DropItem("No doc_name")
 
+        item["doc_name"] = self.fix_doc_name(item["doc_name"])
+        return item
+
+    @staticmethod
+    def fix_doc_name(doc_name: str) -> str:
         # limit length for OS filename limitations, replace / for filename dir confusion
-        item["doc_name"] = item["doc_name"].replace("/", "_")[0:235]
+        return doc_name.replace("/", "_")[0:235]
+
+
+class FusedItemPipeline:
+    """
+    FileNameFixerPipeline, DeduplicaterPipeline, AdditionalFieldsPipeline and ValidateJsonPipeline as one stage,
+    items are dropped for the same reasons with the same messages. Enabled with crawl --fused-item-pipeline,
+    see runspider_settings.py#fused_item_pipelines
+    :param validator: output validator"""
+
+    def __init__(self, validator: SchemaValidator = DefaultOutputSchemaValidator()):
+        self.validate_json = ValidateJsonPipeline(validator)
+        self.ids_seen = set()
+
+    def process_item(self, item, spider):
+        doc_name = item.get("doc_name")
+        if not doc_name:
+            raise DropItem("No doc_name")
+
+        doc_name = FileNameFixerPipeline.fix_doc_name(doc_name)
+        item["doc_name"] = doc_name
+        if doc_name in self.ids_seen:
+            raise DropItem("Duplicate doc_name found")
+        self.ids_seen.add(doc_name)
+
+        AdditionalFieldsPipeline.add_fields(item, spider)
+        # validated as one shallow dict, the nested fields are plain lists and dicts already
+        self.validate_json.validate(item if isinstance(item, dict) else dict(item))
         return item
@@ -0,0 +1,104 @@
+##########################################################################################
+# Buffered json lines writers for the job manifest and dead queue. Records are buffered and
+# appended in one write per flush to a file opened once per spider, instead of opening the
+# file and writing each record as it comes.
+##########################################################################################
+
+import json
+import os
+import threading
+from pathlib import Path
+from time import monotonic
+from typing import Callable, List, Optional, Union
+
+DEFAULT_FLUSH_RECORDS = 500
+DEFAULT_FLUSH_SECONDS = 5.0
+
+
+class FlushPolicy:
+    """When a BufferedJsonLinesWriter writes out its buffer
+    :param max_records: flush once this many records are buffered, 1 writes every record as it comes
+    :param max_seconds: flush on the next write once the oldest buffered record is this old
+    :param fsync_on_close: fsync the file when closed, so the spider's records are on disk once it has closed
+    """
+
+    def __init__(self, max_records: int = DEFAULT_FLUSH_RECORDS, max_seconds: float = DEFAULT_FLUSH_SECONDS,
+                 fsync_on_close: bool = True):
+        self.max_records = max(1, int(max_records))
+        self.max_seconds = max_seconds
+        self.fsync_on_close = fsync_on_close
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            max_records=settings.getint("RECORD_WRITER_FLUSH_RECORDS", DEFAULT_FLUSH_RECORDS),
+            max_seconds=settings.getfloat("RECORD_WRITER_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS),
+            fsync_on_close=settings.getbool("RECORD_WRITER_FSYNC_ON_CLOSE", True),
+        )
+
+
+class BufferedJsonLinesWriter:
+    """Appends json records to path, one per line.
+    The file is opened on the first flush, so nothing is created for spiders that never write a record, and kept
+    open until close. Each flush is a single append of whole lines, so spiders in the same process sharing the
+    file don't interleave partial lines and a crash loses at most the buffered records, never half a line.
+    write, flush and close can be called from any thread
+    :param path: json lines file to append to
+    :param policy: when to flush, defaults to FlushPolicy()
+    :param clock: seconds counter the flush age is measured with
+    """
+
+    def __init__(self, path: Union[Path, str], policy: Optional[FlushPolicy] = None,
+                 clock: Callable[[], float] = monotonic):
+        self.path = Path(path)
+        self.policy = policy or FlushPolicy()
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.buffer: List[str] = []
+        self.buffered_since: Optional[float] = None
+        self.fd: Optional[int] = None
+        self.records_written = 0
+        self.flush_count = 0
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record) + "\n"
+        with self.lock:
+            if not self.buffer:
+                self.buffered_since = self.clock()
+            self.buffer.append(line)
+            if len(self.buffer) >= self.policy.max_records or \
+                    self.clock() - self.buffered_since >= self.policy.max_seconds:
+                self._flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self.buffer:
+            return
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+
+        data = "".join(self.buffer).encode("utf-8")
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+        self.records_written += len(self.buffer)
+        self.flush_count += 1
+        self.buffer = []
+        self.buffered_since = None
+
+    def close(self) -> None:
+        """Flushes what is left and closes the file, fsyncing it first if the policy asks to"""
+        with self.lock:
+            self._flush()
+            if self.fd is None:
+                return
+            try:
+                if self.policy.fsync_on_close:
+                    os.fsync(self.fd)
+            finally:
+                os.close(self.fd)
+                self.fd = None
@@ -9,8 +9,14 @@ general_settings = {
     "FEED_EXPORTERS": {
         "jsonlines": "dataPipelines.gc_scrapy.gc_scrapy.exporters.JsonLinesAsJsonItemExporter",
     },
+    "SPIDER_MIDDLEWARES": {
+        "dataPipelines.gc_scrapy.gc_scrapy.spider_middlewares.CompactItemMiddleware": 950,
+        "dataPipelines.gc_scrapy.gc_scrapy.spider_middlewares.ListingCacheMiddleware": 40,
+    },
     "DOWNLOADER_MIDDLEWARES": {
         "dataPipelines.gc_scrapy.gc_scrapy.downloader_middlewares.BanEvasionMiddleware": 100,
+        "dataPipelines.gc_scrapy.gc_scrapy.downloader_middlewares.AdaptiveThrottleMiddleware": 110,
+        "dataPipelines.gc_scrapy.gc_scrapy.downloader_middlewares.HostRateLimitMiddleware": 120,
     },
     # 'STATS_DUMP': False,
     "ROBOTSTXT_OBEY": False,
@@ -23,6 +29,42 @@ general_settings = {
     "RETRY_ENABLE": True,
     "RETRY_TIMES": 2,
     "CONCURRENT_REQUESTS": 10,
+    # Threads FileDownloadPipeline moves, unzips and writes downloaded files on
+    "FILE_WRITER_THREADS": 4,
+    # Threads each downloaded zip's members are extracted on, see archives.py
+    "UNZIP_THREADS": 4,
+    # Manifest and dead queue records are buffered and written out every this many records or seconds
+    "RECORD_WRITER_FLUSH_RECORDS": 500,
+    "RECORD_WRITER_FLUSH_SECONDS": 5.0,
+    "RECORD_WRITER_FSYNC_ON_CLOSE": True,
+    # Keep scraped DocItems as slotted CompactDocItems, see spider_middlewares.py#CompactItemMiddleware
+    "COMPACT_ITEMS_ENABLED": True,
+    # With a content store, downloads it already has are kept as hardlinks ("hardlink") or left out for a
+    # reference by content hash in the manifest ("reference"), see content_store.py
+    "CONTENT_STORE_DUPLICATES": "hardlink",
+    # Check the previous hash index Bloom filters, if it was built with them, before binary searching its shards
+    "PREVIOUS_HASH_INDEX_BLOOM": True,
+
+    # Per domain delay and concurrency learned from bans and latency, see downloader_middlewares.py#AdaptiveThrottleMiddleware
+    "ADAPTIVE_THROTTLE_ENABLED": True,
+    "ADAPTIVE_THROTTLE_MIN_DELAY": 0.0,
+    "ADAPTIVE_THROTTLE_MAX_DELAY": 60,
+    "ADAPTIVE_THROTTLE_RAMP_UP_AFTER": 20,
+    "ADAPTIVE_THROTTLE_SLOW_LATENCY": 2.0,
+
+    # Requests per second to domains several spiders crawl, shared by every spider and worker process on the node
+    "HOST_RATE_LIMIT_ENABLED": True,
+    "HOST_RATE_LIMITS": {
+        "mynavyhr.navy.mil": 2,
+        "govinfo.gov": 5,
+        "federalregister.gov": 5,
+        "marines.mil": 1,
+    },
+}
+# FileNameFixerPipeline to ValidateJsonPipeline in one stage, crawl --fused-item-pipeline uses these instead
+fused_item_pipelines = {
+    "dataPipelines.gc_scrapy.gc_scrapy.pipelines.FusedItemPipeline": 50,
+    "dataPipelines.gc_scrapy.gc_scrapy.pipelines.FileDownloadPipeline": 400,
 }
 selenium_settings = {
     "SELENIUM_DRIVER_NAME": "chrome",
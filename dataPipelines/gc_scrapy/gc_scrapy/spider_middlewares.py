@@ -0,0 +1,124 @@
+from functools import partial
+
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+
+from dataPipelines.gc_scrapy.gc_scrapy.items import CompactDocItem, DocItem
+from dataPipelines.gc_scrapy.gc_scrapy.listing_cache import ListingCache, ListingPages
+
+
+class CompactItemMiddleware:
+    """Converts the DocItems spiders yield to CompactDocItems, so the items waiting in the scraper and pipeline
+    queues keep their fields in slots instead of a dict each. Anything else the spider yields passes through
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("COMPACT_ITEMS_ENABLED"):
+            raise NotConfigured("COMPACT_ITEMS_ENABLED is not set")
+        return cls()
+
+    def process_spider_output(self, response, result, spider):
+        for output in result:
+            if isinstance(output, DocItem):
+                yield CompactDocItem(output)
+            else:
+                yield output
+
+
+class ListingCacheMiddleware:
+    """For spiders with a listing_cache_location, keeps track of the items and listing pages each listing page led
+    to, through the detail pages it links to, and saves the pages that were crawled completely for the next run.
+    Requests for pages in last run's cache are sent with If-None-Match/If-Modified-Since, see listing_cache.py.
+    The items each listing row's detail page led to are kept the same way, by the row's listing_key.
+    Sits after OffsiteMiddleware and DepthMiddleware so only the requests they let through are waited for
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.cache = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(crawler.stats)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(middleware.request_dropped, signal=signals.request_dropped)
+        return middleware
+
+    def spider_opened(self, spider):
+        location = getattr(spider, "listing_cache_location", None)
+        if not location:
+            return
+        self.cache = ListingCache(location)
+        spider.listing_pages = ListingPages(
+            self.cache.pages(spider.name), self.stats, partial(self.cache.detail_items, spider.name)
+        )
+
+    def spider_closed(self, spider):
+        if self.cache is None:
+            return
+        pages, removed_urls = spider.listing_pages.finished_pages()
+        self.cache.save_pages(spider.name, pages, removed_urls)
+        self.cache.save_detail_items(spider.name, spider.listing_pages.finished_detail_items())
+        self.cache.close()
+        self.cache = None
+
+    def request_dropped(self, request, spider):
+        # e.g. a duplicate of a request from another page, whose callback won't run for this one
+        listing_pages = getattr(spider, "listing_pages", None)
+        if listing_pages is None:
+            return
+        if request.meta.get("listing_url"):
+            listing_pages.request_finished(request.meta["listing_url"])
+        if request.meta.get("listing_key"):
+            listing_pages.detail_request_finished(request.meta["listing_key"])
+
+    def add_conditional_headers(self, request, listing_pages):
+        headers = listing_pages.conditional_headers(request.url)
+        if headers:
+            for name, value in headers.items():
+                request.headers.setdefault(name, value)
+            request.meta["handle_httpstatus_list"] = [*request.meta.get("handle_httpstatus_list", ()), 304]
+
+    def process_start_requests(self, start_requests, spider):
+        for request in start_requests:
+            listing_pages = getattr(spider, "listing_pages", None)
+            if listing_pages is not None:
+                self.add_conditional_headers(request, listing_pages)
+            yield request
+
+    def process_spider_output(self, response, result, spider):
+        listing_pages = getattr(spider, "listing_pages", None)
+        if listing_pages is None:
+            yield from result
+            return
+
+        from_listing_url = response.meta.get("listing_url")
+        # set by GCSpider.follow_detail_page on the request for a listing row's detail page
+        from_listing_key = response.meta.get("listing_key")
+        for output in result:
+            # the callback records the response as a listing page when it asks if it's unchanged, so this is
+            # checked once it has started
+            listing_url = listing_pages.listing_url(response)
+            if listing_url is not None:
+                if isinstance(output, Request):
+                    output.meta["listing_url"] = listing_url
+                    listing_pages.add_request(listing_url, output, spider)
+                    self.add_conditional_headers(output, listing_pages)
+                elif isinstance(output, (dict, DocItem, CompactDocItem)):
+                    listing_pages.add_item(listing_url, output)
+
+            if isinstance(output, Request):
+                if from_listing_key is not None:
+                    output.meta.setdefault("listing_key", from_listing_key)
+                if output.meta.get("listing_key"):
+                    listing_pages.add_detail_request(output.meta["listing_key"])
+            elif from_listing_key is not None and isinstance(output, (dict, DocItem, CompactDocItem)):
+                listing_pages.add_detail_item(from_listing_key, output)
+            yield output
+
+        if from_listing_url is not None:
+            listing_pages.request_finished(from_listing_url)
+        if from_listing_key is not None:
+            listing_pages.detail_request_finished(from_listing_key)
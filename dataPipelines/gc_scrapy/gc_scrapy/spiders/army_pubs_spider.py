@@ -58,8 +58,6 @@ class ArmySpider(GCSpider):
         This function grabs links from the raw html for the table on page, calling the parse_detail_page function for the 
         list of table links.
         '''
-        table_links = response.css('table td a::attr(href)').extract() # Extract all links in the html table
-
         # CAC Gate Eval
         registration_required = response.xpath('//div//text()').getall() # Evaluates if 'registration is required' is in the source page
         cac_login_required = False
@@ -68,7 +66,12 @@ class ArmySpider(GCSpider):
                 cac_login_required = True
                 break
 
-        yield from response.follow_all([self.pub_url+link for link in table_links], self.parse_detail_page, cb_kwargs={'cac_login_required': cac_login_required}) # Call parse_detail_page function for each link and pass cac_login_required as an argument
+        for row in response.css('table tr'): # Call parse_detail_page function for each link and pass cac_login_required as an argument
+            row_text = [self.ascii_clean(text) for text in row.css('td ::text').getall()] # Number, title, date etc. of the row's publication
+            for link in row.css('td a::attr(href)').getall():
+                request = response.follow(self.pub_url+link, self.parse_detail_page, cb_kwargs={'cac_login_required': cac_login_required})
+                # the detail page is skipped if the row is the same as last run, with --listing-cache-location
+                yield from self.follow_detail_page(request, self.listing_key(link, cac_login_required, row_text))
 
     def parse_detail_page(self, response, cac_login_required):
         '''
@@ -6,7 +6,6 @@ from urllib.parse import urljoin, urlparse
 from datetime import datetime
 from dataPipelines.gc_scrapy.gc_scrapy.utils import dict_to_sha256_hex_digest, get_pub_date
 
-import time
 doc_type_num_re = re.compile(r'(.*)\s(\d+.*)')
 
 
@@ -19,6 +18,8 @@ class JcsPubsSpider(GCSpider):
     cac_required_options = [
         'CAC', 'PKI certificate required', 'placeholder', 'FOUO']
     rotate_user_agent = True
+    # Slow crawler down to prevent blacklist, only the library pages are delayed
+    request_delay_policies = {"library_page": 20}
 
     @staticmethod
     def get_display_doc_type(doc_type):
@@ -40,8 +41,7 @@ class JcsPubsSpider(GCSpider):
         ]
 
         for link in doc_links:
-            time.sleep(20) # Slow crawler down to prevent blacklist
-            yield response.follow(url=link, callback=self.parse_doc_table_page)
+            yield response.follow(url=link, callback=self.parse_doc_table_page, meta={"delay_policy": "library_page"})
 
     def parse_doc_table_page(self, response):
         rows = response.css('table#JCSDocsTable tbody tr')
@@ -95,9 +95,9 @@ class JcsPubsSpider(GCSpider):
                 a for a in nav_table.css('a.CommandButton')
                 if a.css('::text').get() == 'Next'
             )
-            time.sleep(20) # Slow crawler down to prevent blacklist
             yield response.follow(url=next_page_link,
-                                  callback=self.parse_doc_table_page)
+                                  callback=self.parse_doc_table_page,
+                                  meta={"delay_policy": "library_page"})
         except:
             pass
 
@@ -4,7 +4,7 @@ import re
 from dataPipelines.gc_scrapy.gc_scrapy.items import DocItem
 from dataPipelines.gc_scrapy.gc_scrapy.GCSpider import GCSpider
 
-from urllib.parse import urljoin, urlparse
+from urllib.parse import parse_qs, urljoin, urlparse
 from datetime import datetime
 from dataPipelines.gc_scrapy.gc_scrapy.utils import dict_to_sha256_hex_digest, get_pub_date
 
@@ -260,6 +260,11 @@ class MarineCorpSpider(GCSpider):
             return "Document"
 
     def parse(self, response):
+        # reuses last run's items for pages that haven't changed, with --listing-cache-location
+        if self.listing_unchanged(response):
+            yield from self.previous_listing_output(response)
+            return
+
         source_page_url = response.url
         rows = response.css('div.alist-more-here div.litem')
 
@@ -361,9 +366,9 @@ class MarineCorpSpider(GCSpider):
                 print('ERROR', type(e), e)
                 continue
 
-        # increment page and send next request
-        self.current_page += 1
-        next_url = f"{self.base_url}{self.current_page}"
+        # increment page and send next request, from the page's url as pages reused from the cache aren't parsed
+        current_page = int(parse_qs(urlparse(response.url).query).get("Page", [self.current_page])[0])
+        next_url = f"{self.base_url}{current_page + 1}"
 
         yield scrapy.Request(next_url, callback=self.parse)
 
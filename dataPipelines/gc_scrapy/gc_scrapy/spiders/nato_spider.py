@@ -2,10 +2,10 @@
 import scrapy
 from dataPipelines.gc_scrapy.gc_scrapy.items import DocItem
 from dataPipelines.gc_scrapy.gc_scrapy.GCSpider import GCSpider
+from dataPipelines.gc_scrapy.gc_scrapy.download_streams import Base64JsonFieldDecoder
 
 import json
 import copy
-import base64
 
 
 class NatoSpider(GCSpider):
@@ -39,11 +39,8 @@ class NatoSpider(GCSpider):
         "x-requested-with": "XMLHttpRequest"
     }
 
-    @staticmethod
-    def download_response_handler(response):
-        data = json.loads(response.body)
-        content = data['content']
-        return base64.b64decode(content)
+    # downloads are json with the file base64 encoded in "content", decoded as the chunks arrive
+    download_stream_decoder = Base64JsonFieldDecoder
 
     def start_requests(self):
         yield scrapy.Request(url=self.start_urls[0], method='GET', headers=self.headers)
@@ -6,8 +6,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver import Chrome
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import NoSuchElementException
-import time
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
@@ -50,7 +49,11 @@ class NavyMedSpider(GCSeleniumSpider):
         for i, doc_type in enumerate(self.tabs_doc_type_dict.values()):
             # must re-grab button ref if page has changed (table paged etc)
             driver.get(self.start_urls[0])    # navigating to the homepage again to reset the page (because refresh doesn't work)
-            time.sleep(5)   # waiting to be sure that it loaded
+            try:
+                # waiting to be sure that it loaded
+                self.wait_until_css_located(driver, f"{self.tabs_ul_selector} li a")
+            except TimeoutException:
+                print("Timed out waiting for tabs to load")
             try:
                 button = self.get_tab_button_els(driver)[i]
             except Exception as e:
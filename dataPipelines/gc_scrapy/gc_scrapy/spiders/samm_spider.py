@@ -3,7 +3,6 @@ from dataPipelines.gc_scrapy.gc_scrapy.GCSpider import GCSpider
 from dataPipelines.gc_scrapy.gc_scrapy.utils import dict_to_sha256_hex_digest, get_pub_date
 import re
 from urllib.parse import urljoin, urlparse
-import time
 
 class SammSpider(GCSpider):
     name = "samm_policy"
@@ -11,6 +10,8 @@ class SammSpider(GCSpider):
     start_urls = ["https://samm.dsca.mil/listing/chapters", "https://samm.dsca.mil/policy-memoranda/PolicyMemoList-All"]
     rotate_user_agent = True
     randomly_delay_request = True
+    # policy memo pages are at least a second apart, the rest of the site keeps the random delay
+    request_delay_policies = {"memo_page": 1}
 
     @staticmethod
     def extract_doc_number(doc_name):
@@ -26,7 +27,6 @@ class SammSpider(GCSpider):
     def parse(self, response):
         base_url = "https://samm.dsca.mil"
         if response.url == "https://samm.dsca.mil/policy-memoranda/PolicyMemoList-All":
-            time.sleep(1)
             for row in response.xpath('//div[@class="view-content"]//table/tbody/tr'):
                 pm_status_text = row.xpath('td[6]/text()').get()
                 pm_status = pm_status_text.strip() if pm_status_text is not None else ""
@@ -43,7 +43,8 @@ class SammSpider(GCSpider):
                     yield response.follow(
                         url=absolute_url,
                         callback=self.parse_document_page_memos,
-                        cb_kwargs={'doc_title': doc_title, 'doc_name': doc_name, 'publication_date': pub_date, 'status': status}
+                        cb_kwargs={'doc_title': doc_title, 'doc_name': doc_name, 'publication_date': pub_date, 'status': status},
+                        meta={"delay_policy": "memo_page"}
                 )
         elif response.url == "https://samm.dsca.mil/listing/chapters":
             chapter_data = response.xpath(
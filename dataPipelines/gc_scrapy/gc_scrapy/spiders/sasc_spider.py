@@ -41,8 +41,12 @@ class SASCSpider(GCSpider):
             start = '</span>'
             end = '</div>'
             hearing_type = htype[htype.find(start)+len(start):htype.rfind(end)].strip()
-            
-            yield scrapy.Request(url=url, callback=self.parse_hearing_detail_page, meta={"hearing_type": hearing_type})
+            row_text = [' '.join(text.split()) for text in row.css('::text').getall() if text.strip()]
+
+            request = scrapy.Request(url=url, callback=self.parse_hearing_detail_page, meta={"hearing_type": hearing_type})
+            # the hearing and its transcripts and testimony are reused if the row is the same as last run,
+            # with --listing-cache-location
+            yield from self.follow_detail_page(request, self.listing_key(url, hearing_type, row_text))
 
     def follow_pdf_redirect(self, response):
         pdf_redirect = response.css('p a::attr(href)').get()
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 
-from time import sleep
 import re
 from dataPipelines.gc_scrapy.gc_scrapy.GCSpider import GCSpider
 from dataPipelines.gc_scrapy.gc_scrapy.items import DocItem
@@ -28,6 +27,11 @@ class SecNavSpider(GCSpider):
 
     rotate_user_agent = False
     randomly_delay_request = False
+    # listing pages are 5 seconds apart, everything else on the site (document downloads) 0.75 seconds
+    request_delay_policies = {
+        "listing_page": 5,
+        "www.secnav.navy.mil": 0.75,
+    }
 
     had_error = False
     q = []
@@ -56,11 +60,6 @@ class SecNavSpider(GCSpider):
                 f"ready to process: len of q: {len(self.q)}, done: {self.done}")
             while self.q:
                 doc = self.q.pop(0)
-                try:
-                    sleep(0.75)
-                except KeyboardInterrupt:
-                    exit(0)
-
                 yield(doc)
 
         else:
@@ -69,8 +68,8 @@ class SecNavSpider(GCSpider):
 
     def start_requests(self):
         for url, type_suffix in self.urls_type_map:
-            sleep(5)
             meta = {
+                "delay_policy": "listing_page",
                 "referrer_policy": "same-origin",
                 "base_url": url,
                 "type_suffix": type_suffix
@@ -126,11 +125,11 @@ class SecNavSpider(GCSpider):
             if next_href:
                 next_url = f"{response.meta['base_url']}{next_href}"
                 meta = {
+                    "delay_policy": "listing_page",
                     "referrer_policy": "same-origin",
                     "base_url": base_url,
                     "type_suffix": type_suffix
                 }
-                sleep(5)
                 yield scrapy.Request(url=next_url, callback=self.parse, meta=meta)
             else:
                 self.done.append(base_url)
@@ -5,10 +5,8 @@ gc_crawler.utils
 Various gc_crawler util functions/classes used in other modules
 """
 from pathlib import Path
-from typing import Union, List, Any, Dict, Generator, Iterable
+from typing import Union, List, Any, Dict, Generator, Iterable, Container
 import zipfile
-import copy
-import tempfile
 import shutil
 from hashlib import sha256
 from functools import reduce
@@ -19,6 +17,8 @@ import typing as t
 import datetime
 import pandas
 
+from dataPipelines.gc_scrapy.gc_scrapy.archives import UNZIP_THREADS, extract_archive, format_for_name
+
 def str_to_sha256_hex_digest(_str: str) -> str:
     """Converts string to sha256 hex digest"""
     if not _str and not isinstance(_str, str):
@@ -86,15 +86,17 @@ def get_fqdn_from_web_url(url_string: str) -> str:
     return urlparse(url_string).netloc
 
 
-def get_available_path(desired_path: Union[str, Path]) -> Path:
+def get_available_path(desired_path: Union[str, Path], taken: Container[Path] = ()) -> Path:
     """Given desired path, returns one that uses desired path as prefix but won't overwrite existing files
     :param desired_path: proposed file/dir path
+    :param taken: resolved paths to treat as existing files, e.g. ones handed out but not written yet
     :returns: available file/dir path
     """
     original_path = Path(desired_path)
     base_dir = Path(original_path).parent
     base_ext = original_path.suffix
-    base_name = original_path.name[: (-len(base_ext) if original_path.is_file() else None)]
+    is_file = original_path.is_file() or original_path.resolve() in taken
+    base_name = original_path.name[: (-len(base_ext) if is_file else None)]
 
     if not base_dir.is_dir():
         raise ValueError(f"Base dir for path does not exist: {base_dir.absolute()}")
@@ -111,7 +113,7 @@ def get_available_path(desired_path: Union[str, Path]) -> Path:
 
     _sanity_check_limit = 100_000  # to avoid infinite loops if there are issues with file cleanup
     while True:
-        if path_candidate.exists():
+        if path_candidate.exists() or path_candidate.resolve() in taken:
             new_suffix = next(suffixes)
             new_filename = f"{base_name}_{new_suffix}{base_ext}"
             path_candidate = Path(base_dir, new_filename)
@@ -227,40 +229,43 @@ def extract_title_42_subfile_names(filename: str, parent_filename: str) -> str:
     return output_filename
 
 
-def unzip_docs_as_needed(input_dir: Union[Path, str], output_dir: Union[Path, str], doc_type: str) -> List[Path]:
+def unzip_docs_as_needed(
+    input_dir: Union[Path, str],
+    output_dir: Union[Path, str],
+    doc_type: str,
+    threads: int = UNZIP_THREADS,
+    compression_type: t.Optional[str] = None,
+) -> List[Path]:
     """Handles zipped/packaged download artifacts by expanding them into their individual components
 
-    :param input_dir: Path of the zip file
+    :param input_dir: Path of the archive, any format in archives.py#ARCHIVE_FORMATS
     :param output_dir: Directory where files, unzipped or not, should be placed
     :param doc_type: Document file type, e.g. "pdf", "html", "txt"
+    :param threads: Number of threads a zip's members are extracted on
+    :param compression_type: Archive format if the content doesn't give it away, e.g. "zip", "tar.gz"
     :return: iterable of Downloaded documents, len > 1 for bundles
     """
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir)
+    taken = set()
+
+    def destination(filename: str) -> Path:
+        if filename.startswith("usc42"):
+            desired_path = output_dir.parent / extract_title_42_subfile_names(filename, input_dir.name)
+        else:
+            desired_path = Path(output_dir, filename) if output_dir.is_dir() else output_dir
+        # names are handed out before the files are written, so earlier ones aren't on disk yet
+        available_path = get_available_path(desired_path, taken)
+        taken.add(available_path)
+        return available_path
 
-    # TODO: create set of recursive unzip methods for other archive types and a dispatcher
     try:
-        # unzip & move
-        temp_dir = tempfile.TemporaryDirectory()
-        unzipped_files = unzip_all(zip_file=input_dir, output_dir=temp_dir.name)
-        unzipped_files = [f for f in unzipped_files if f.suffix.lower()[1:] == doc_type]
-        if not unzipped_files:
+        final_ddocs = extract_archive(input_dir, doc_type, destination, threads, compression_type)
+        if not final_ddocs:
             raise RuntimeError(f"Tried to unzip {input_dir}, but could not find any expected files inside")
-        final_ddocs = []
-
-        # TODO: Add capibility to unzip multiple zips and add corresponding metadata for each
-        # do just the first iteration to unzip only the first file
-        unzipped_files.sort()  # TODO: this doesnt work ->> messy solution. sorting to make sure we grab the first in us_code
-        for pdf_file in unzipped_files:
-            if pdf_file.name.startswith("usc42"):
-                output_filename = extract_title_42_subfile_names(pdf_file.name, input_dir.name)
-                output_dir = output_dir.parent / output_filename
-            new_ddoc = copy.deepcopy(output_dir)
-            safe_move_file(file_path=pdf_file, output_path=output_dir)
-            final_ddocs.append(new_ddoc)
     finally:
-        temp_dir.cleanup()
-
-        # remove zip. check in case a bad input was put in
-        if input_dir.is_file() and input_dir.suffix.lower() == ".zip":
+        # remove archive. check in case a bad input was put in
+        if input_dir.is_file() and format_for_name(input_dir.name) is not None:
             os.remove(input_dir)
 
     return final_ddocs
@@ -0,0 +1,95 @@
+##########################################################################################
+# HTTP validators of past document downloads, by download URL, in a SQLite database kept
+# across runs, with the name the file was shipped under. FileDownloadPipeline sends the
+# ETag and Last-Modified it has for a URL as If-None-Match and If-Modified-Since, as long as
+# the item still writes the file under that name. When the server answers 304 Not Modified,
+# or sends content with the length and sha256 the cache has, only the document's metadata
+# and manifest record are written and the file, which an earlier run shipped, is left out.
+# An item whose name changed, e.g. with its title, downloads and writes the file again.
+##########################################################################################
+
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS validators (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_length INTEGER NOT NULL,
+    content_sha256 TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    file_name TEXT
+);
+"""
+COLUMNS = "url, etag, last_modified, content_length, content_sha256, file_name"
+
+
+class CachedDownload(NamedTuple):
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_length: int
+    content_sha256: str
+    # path of the shipped file relative to the download output dir
+    file_name: Optional[str] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def same_content(self, content_length: int, content_sha256: Optional[str]) -> bool:
+        return self.content_length == content_length and self.content_sha256 == content_sha256
+
+
+class ValidatorCache:
+    """Validators of the last download of each URL
+    :param location: path of the database, created if it doesn't exist. Spiders in other processes can share it
+    """
+
+    def __init__(self, location: Union[Path, str]):
+        self.location = Path(location)
+        self.location.parent.mkdir(parents=True, exist_ok=True)
+        # looked up on the reactor thread, updated from the file writer threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(self.location), timeout=30, check_same_thread=False)
+        # each download is committed on its own, WAL keeps that cheap and lets other processes read meanwhile
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        # caches made before file names were kept, their downloads are shipped again once to record the name
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(validators)")]
+        if "file_name" not in columns:
+            with self.connection:
+                self.connection.execute("ALTER TABLE validators ADD COLUMN file_name TEXT")
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def __enter__(self) -> "ValidatorCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(self, url: str) -> Optional[CachedDownload]:
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT {COLUMNS} FROM validators WHERE url = ?", (url,)
+            ).fetchone()
+        return CachedDownload(*row) if row else None
+
+    def put(self, download: CachedDownload) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO validators ({COLUMNS}, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*download, datetime.now().isoformat(timespec="seconds")),
+            )
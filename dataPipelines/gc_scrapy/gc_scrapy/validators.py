@@ -6,9 +6,190 @@ Utils for validating input/output data schema.
 """
 
 from . import INPUT_SPEC_PATH, OUTPUT_SPEC_PATH
-from jsonschema import Draft7Validator as JsonSchemaValidator
-from typing import Union
+from jsonschema import Draft7Validator as JsonSchemaValidator, ValidationError
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Union
 import json
+import re
+
+# keywords that don't affect whether an instance is valid
+ANNOTATION_KEYWORDS = frozenset((
+    "$schema", "$id", "$comment", "title", "description", "examples", "default", "definitions", "format",
+))
+
+# draft 7 types, bools aren't numbers and floats without a fractional part are integers
+TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda i: isinstance(i, str),
+    "object": lambda i: isinstance(i, dict),
+    "array": lambda i: isinstance(i, list),
+    "boolean": lambda i: isinstance(i, bool),
+    "null": lambda i: i is None,
+    "number": lambda i: isinstance(i, (int, float)) and not isinstance(i, bool),
+    "integer": lambda i: (isinstance(i, int) and not isinstance(i, bool)) or (isinstance(i, float) and i.is_integer()),
+}
+
+
+class UnsupportedSchema(Exception):
+    """The schema uses a keyword CompiledSchema doesn't compile"""
+
+
+def _json_equal(a, b) -> bool:
+    # enum members compare like json values, so True isn't 1
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    return a == b
+
+
+class CompiledSchema:
+    """
+    Draft 7 schema compiled once in to a check per keyword, for the keywords the output spec uses.
+    Instances failing a check are validated again by Draft7Validator so errors and their messages
+    are the same as validating with jsonschema directly
+    :param schema: draft 7 schema, raises UnsupportedSchema if it uses a keyword that isn't compiled
+    """
+
+    def __init__(self, schema: dict):
+        self.schema = schema
+        self._refs: Dict[str, Callable[[Any], bool]] = {}
+        self._check = self._compile(schema)
+        self._fallback = None
+
+    def is_valid(self, instance) -> bool:
+        return self._check(instance)
+
+    def validate(self, instance) -> None:
+        if self._check(instance):
+            return
+        if self._fallback is None:
+            self._fallback = JsonSchemaValidator(self.schema)
+        self._fallback.validate(instance)
+
+    def _resolve(self, ref: str) -> Callable[[Any], bool]:
+        if not ref.startswith("#"):
+            raise UnsupportedSchema(f"remote $ref {ref}")
+        if ref not in self._refs:
+            # compiled on first use so recursive refs don't recurse here
+            def check_ref(instance, ref=ref):
+                return self._refs[ref](instance)
+
+            target = self.schema
+            for part in ref[1:].split("/")[1:]:
+                target = target[part.replace("~1", "/").replace("~0", "~")]
+            self._refs[ref] = check_ref
+            self._refs[ref] = self._compile(target)
+        return self._refs[ref]
+
+    def _compile(self, schema) -> Callable[[Any], bool]:
+        if schema is True or schema == {}:
+            return lambda instance: True
+        if schema is False:
+            return lambda instance: False
+        if "$ref" in schema:
+            # draft 7 ignores the keywords next to a $ref
+            ref = schema["$ref"]
+            self._resolve(ref)
+            refs = self._refs
+            return lambda instance: refs[ref](instance)
+
+        checks: List[Callable[[Any], bool]] = []
+        for keyword, value in schema.items():
+            if keyword in ANNOTATION_KEYWORDS:
+                continue
+            compile_keyword = getattr(self, f"_compile_{keyword}", None)
+            if compile_keyword is None:
+                raise UnsupportedSchema(keyword)
+            checks.append(compile_keyword(value))
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def check(instance):
+            for keyword_check in checks:
+                if not keyword_check(instance):
+                    return False
+            return True
+
+        return check
+
+    @staticmethod
+    def _compile_type(value) -> Callable[[Any], bool]:
+        types = [value] if isinstance(value, str) else value
+        type_checks = [TYPE_CHECKS[t] for t in types]
+        if len(type_checks) == 1:
+            return type_checks[0]
+        return lambda instance: any(type_check(instance) for type_check in type_checks)
+
+    @staticmethod
+    def _compile_required(value) -> Callable[[Any], bool]:
+        required = tuple(value)
+        return lambda instance: not isinstance(instance, dict) or all(k in instance for k in required)
+
+    def _compile_properties(self, value) -> Callable[[Any], bool]:
+        properties = [(name, self._compile(subschema)) for name, subschema in value.items()]
+
+        def check(instance):
+            if not isinstance(instance, dict):
+                return True
+            for name, property_check in properties:
+                if name in instance and not property_check(instance[name]):
+                    return False
+            return True
+
+        return check
+
+    def _compile_items(self, value) -> Callable[[Any], bool]:
+        if not isinstance(value, (dict, bool)):
+            raise UnsupportedSchema("items as a list of schemas")
+        item_check = self._compile(value)
+        return lambda instance: not isinstance(instance, list) or all(item_check(i) for i in instance)
+
+    @staticmethod
+    def _compile_minItems(value) -> Callable[[Any], bool]:
+        return lambda instance: not isinstance(instance, list) or len(instance) >= value
+
+    @staticmethod
+    def _compile_maxItems(value) -> Callable[[Any], bool]:
+        return lambda instance: not isinstance(instance, list) or len(instance) <= value
+
+    @staticmethod
+    def _compile_minLength(value) -> Callable[[Any], bool]:
+        return lambda instance: not isinstance(instance, str) or len(instance) >= value
+
+    @staticmethod
+    def _compile_maxLength(value) -> Callable[[Any], bool]:
+        return lambda instance: not isinstance(instance, str) or len(instance) <= value
+
+    @staticmethod
+    def _compile_pattern(value) -> Callable[[Any], bool]:
+        # jsonschema searches rather than matches patterns
+        search = re.compile(value).search
+        return lambda instance: not isinstance(instance, str) or search(instance) is not None
+
+    @staticmethod
+    def _compile_enum(value) -> Callable[[Any], bool]:
+        members = list(value)
+        return lambda instance: any(_json_equal(instance, member) for member in members)
+
+
+@lru_cache(maxsize=None)
+def load_schema(spec_path: str) -> dict:
+    """The schema at spec_path, read once per process"""
+    with open(spec_path) as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def compiled_validator(spec_path: str) -> Union[CompiledSchema, JsonSchemaValidator]:
+    """
+    Validator of the schema at spec_path compiled once per process and shared by every SchemaValidator
+    using it, Draft7Validator if the schema uses keywords CompiledSchema doesn't support
+    """
+    schema = load_schema(spec_path)
+    try:
+        return CompiledSchema(schema)
+    except UnsupportedSchema as e:
+        print(f"Validating with jsonschema, {spec_path} uses a keyword that isn't compiled:", e)
+        return JsonSchemaValidator(schema=schema)
 
 
 class SchemaValidator:
@@ -16,14 +197,17 @@ class SchemaValidator:
     :param validator:
     """
 
-    validator: JsonSchemaValidator
+    validator: Union[JsonSchemaValidator, CompiledSchema]
 
-    def __init__(self, validator: JsonSchemaValidator):
+    def __init__(self, validator: Union[JsonSchemaValidator, CompiledSchema]):
         self.validator = validator
 
     def validate_dict(self, _dict: dict) -> None:
         self.validator.validate(_dict)
 
+    def is_valid_dict(self, _dict: dict) -> bool:
+        return self.validator.is_valid(_dict)
+
     def validate_json(self, _json: str) -> None:
         self.validate_dict(json.loads(_json))
 
@@ -48,13 +232,11 @@ class DefaultInputSchemaValidator(SchemaValidator):
     """Validator that only matches according to input_spec.json"""
 
     def __init__(self):
-        schema_dict = json.load(open(INPUT_SPEC_PATH))
-        self.validator = JsonSchemaValidator(schema=schema_dict)
+        self.validator = compiled_validator(INPUT_SPEC_PATH)
 
 
 class DefaultOutputSchemaValidator(SchemaValidator):
     """Validator that only matches according to output_spec.json"""
 
     def __init__(self):
-        schema_dict = json.load(open(OUTPUT_SPEC_PATH))
-        self.validator = JsonSchemaValidator(schema=schema_dict)
+        self.validator = compiled_validator(OUTPUT_SPEC_PATH)
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+gc_scrapy.manifest_store
+-----------------
+SQLite store of the cumulative manifest, keyed by (crawler_used, doc_name, version_hash) with an
+access_timestamp index. Jobs import each run's manifest.json in to it, compact it to the latest versions of
+each document and export it as the json lines cumulative manifest existing consumers read
+"""
+import gzip
+import json
+import sqlite3
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Union
+
+# manifest fields with their own columns, anything else a line has is kept in extra
+MANIFEST_FIELDS = ("version_hash", "doc_name", "crawler_used", "access_timestamp")
+# rows inserted per executemany while importing
+IMPORT_BATCH_SIZE = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest (
+    crawler_used TEXT NOT NULL,
+    doc_name TEXT NOT NULL,
+    version_hash TEXT NOT NULL,
+    access_timestamp TEXT NOT NULL,
+    extra TEXT,
+    PRIMARY KEY (crawler_used, doc_name, version_hash)
+);
+CREATE INDEX IF NOT EXISTS manifest_access_timestamp ON manifest (access_timestamp);
+"""
+
+
+def open_text(location: Union[str, Path], mode: str = "r") -> IO[str]:
+    """Opens a manifest file, gzipped if its name ends in .gz"""
+    if str(location).endswith(".gz"):
+        return gzip.open(location, mode=f"{mode}t", encoding="utf-8")
+    return open(location, mode=mode, encoding="utf-8")
+
+
+class ManifestStore:
+    """Manifest records in a SQLite database, the first record of a version is kept if it is added again
+    :param location: path of the database, created if it doesn't exist
+    """
+
+    def __init__(self, location: Union[str, Path]):
+        self.location = Path(location)
+        self.location.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.location))
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "ManifestStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @staticmethod
+    def _to_row(record: dict) -> tuple:
+        extra = {k: v for k, v in record.items() if k not in MANIFEST_FIELDS}
+        return (
+            # lines from before crawler_used was recorded
+            record.get("crawler_used") or "",
+            record.get("doc_name") or "",
+            record["version_hash"],
+            record.get("access_timestamp") or "",
+            json.dumps(extra) if extra else None,
+        )
+
+    @staticmethod
+    def _to_record(row: tuple) -> dict:
+        crawler_used, doc_name, version_hash, access_timestamp, extra = row
+        record = {"version_hash": version_hash, "doc_name": doc_name}
+        if crawler_used:
+            record["crawler_used"] = crawler_used
+        record["access_timestamp"] = access_timestamp
+        if extra:
+            record.update(json.loads(extra))
+        return record
+
+    def add_records(self, records: Iterable[dict]) -> int:
+        """Returns the number of records that weren't in the store yet"""
+        before = self.count()
+        batch = []
+        with self.connection:
+            for record in records:
+                batch.append(self._to_row(record))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    self.connection.executemany("INSERT OR IGNORE INTO manifest VALUES (?, ?, ?, ?, ?)", batch)
+                    batch = []
+            self.connection.executemany("INSERT OR IGNORE INTO manifest VALUES (?, ?, ?, ?, ?)", batch)
+        return self.count() - before
+
+    def import_jsonl(self, location: Union[str, Path]) -> int:
+        """Adds the records of a json lines manifest (gzipped if named .gz), returns the number of new records"""
+        def read_records(f):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+        with open_text(location) as f:
+            return self.add_records(read_records(f))
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM manifest").fetchone()[0]
+
+    def iter_records(self, crawler_used: Optional[str] = None, since: Optional[str] = None) -> Iterator[dict]:
+        """Records in access_timestamp order, optionally only one crawler's or those accessed at or after since"""
+        conditions, params = [], []
+        if crawler_used is not None:
+            conditions.append("crawler_used = ?")
+            params.append(crawler_used)
+        if since is not None:
+            conditions.append("access_timestamp >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cursor = self.connection.execute(
+            "SELECT crawler_used, doc_name, version_hash, access_timestamp, extra FROM manifest "
+            f"{where} ORDER BY access_timestamp, crawler_used, doc_name",
+            params
+        )
+        for row in cursor:
+            yield self._to_record(row)
+
+    def export_jsonl(self, location: Union[str, Path], crawler_used: Optional[str] = None,
+                     since: Optional[str] = None) -> int:
+        """Writes the records as a json lines manifest, gzipped if location ends in .gz, returns the record count"""
+        count = 0
+        location = Path(location)
+        # same suffix so the temp file is gzipped too
+        tmp_location = location.with_name(f".tmp-{location.name}")
+        with open_text(tmp_location, "w") as f:
+            for record in self.iter_records(crawler_used, since):
+                f.write(json.dumps(record))
+                f.write("\n")
+                count += 1
+
+        tmp_location.replace(location)
+        return count
+
+    def compact(self, keep_versions: int) -> int:
+        """
+        Keeps the keep_versions most recently accessed versions of each document, returns the number removed.
+        An older version that is removed downloads again if a site goes back to serving it
+        """
+        if keep_versions < 1:
+            raise ValueError("keep_versions has to be at least 1")
+
+        with self.connection:
+            removed = self.connection.execute(
+                """
+                DELETE FROM manifest WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY crawler_used, doc_name ORDER BY access_timestamp DESC
+                        ) AS version_rank
+                        FROM manifest
+                    ) WHERE version_rank > ?
+                )
+                """,
+                (keep_versions,)
+            ).rowcount
+        self.connection.execute("VACUUM")
+        return removed
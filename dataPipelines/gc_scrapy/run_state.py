@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+gc_scrapy.run_state
+-----------------
+Checkpoint state of a multi-spider crawl so an interrupted run can skip finished spiders and
+resume in-flight ones from their Scrapy JOBDIR
+"""
+import json
+import shutil
+from pathlib import Path
+from typing import List, Union
+
+# close reason scrapy gives spiders that ran out of requests
+FINISHED_CLOSE_REASON = "finished"
+
+
+class CrawlRunState:
+    """Completed spider markers and per spider JOBDIRs kept under state_dir.
+    Markers are one file per spider so worker processes can share the state dir
+    :param state_dir: directory to keep the run state in, created if needed
+    """
+
+    def __init__(self, state_dir: Union[str, Path]):
+        self.state_dir = Path(state_dir)
+        self.run_file = Path(self.state_dir, "run.json")
+        self.completed_dir = Path(self.state_dir, "completed")
+        self.jobs_dir = Path(self.state_dir, "jobs")
+
+        self.completed_dir.mkdir(parents=True, exist_ok=True)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        # the spiders of the run, set by start_run
+        self.spider_names: List[str] = []
+
+    def start_run(self, spider_names: List[str]) -> None:
+        """Resumes the saved run if it was for the same spiders, otherwise starts over"""
+        spider_names = sorted(spider_names)
+        self.spider_names = spider_names
+        saved_spider_names = None
+        if self.run_file.is_file():
+            try:
+                with self.run_file.open(mode="r") as f:
+                    saved_spider_names = json.load(f).get("spiders")
+            except (OSError, json.decoder.JSONDecodeError) as e:
+                print("Could not read saved run state", self.run_file, e)
+
+        if saved_spider_names == spider_names:
+            completed = [name for name in spider_names if self.is_completed(name)]
+            print(f"Resuming run from {self.state_dir}, {len(completed)} of {len(spider_names)} spiders completed")
+            return
+
+        if saved_spider_names is not None:
+            print(f"Saved run state in {self.state_dir} is for other spiders, starting over")
+        self.clear()
+        with self.run_file.open(mode="w") as f:
+            json.dump({"spiders": spider_names}, f)
+
+    def finish_run(self) -> bool:
+        """Called once every spider of the run was attempted. If they all completed the next run starts fresh,
+        otherwise the state is kept so the next run resumes the rest, returns whether the run finished"""
+        unfinished = [name for name in self.spider_names if not self.is_completed(name)]
+        if unfinished:
+            print(f"{len(unfinished)} spiders did not finish, keeping run state in {self.state_dir}:",
+                  ", ".join(unfinished))
+            return False
+        self.clear()
+        return True
+
+    def clear(self) -> None:
+        for path in (self.completed_dir, self.jobs_dir):
+            shutil.rmtree(path, ignore_errors=True)
+            path.mkdir(parents=True, exist_ok=True)
+        if self.run_file.is_file():
+            self.run_file.unlink()
+
+    def _marker(self, spider_name: str) -> Path:
+        return Path(self.completed_dir, spider_name)
+
+    def is_completed(self, spider_name: str) -> bool:
+        return self._marker(spider_name).exists()
+
+    def mark_completed(self, spider_name: str) -> None:
+        # its JOBDIR is still written to by other spider_closed handlers, it is removed with the rest of the run
+        self._marker(spider_name).touch()
+
+    def get_jobdir(self, spider_name: str) -> str:
+        """Scrapy JOBDIR for the spider, holds its pending request queue and dupefilter"""
+        return str(Path(self.jobs_dir, spider_name))
+
+    def spider_closed(self, spider, reason) -> None:
+        """spider_closed signal handler, only spiders that ran out of requests count as completed"""
+        if reason == FINISHED_CLOSE_REASON:
+            self.mark_completed(spider.name)
+        else:
+            print(f"{spider.name} closed with reason {reason}, it will resume from {self.get_jobdir(spider.name)}")
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+gc_scrapy.runtime_history
+-----------------
+Local store of how long each spider took on its previous runs, used to plan and pack spider runs
+"""
+import json
+import os
+import statistics
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+# where the store is kept if no location is given
+DEFAULT_RUNTIME_HISTORY_LOCATION: str = os.environ.get(
+    "GC_SCRAPY_RUNTIME_HISTORY_LOCATION",
+    str(Path.home() / ".gc_scrapy" / "runtime_history.json")
+)
+# number of runs kept per spider
+MAX_RUNS_KEPT = 10
+# predicted elapsed time for spiders when there is no history at all
+DEFAULT_ELAPSED_SECONDS = 600.0
+
+# readable keys set in the spider stats by GCSpider.close
+ELAPSED_TIME_STAT = "Elapsed Time (sec)"
+ITEM_COUNT_STAT = "Item Scraped Count"
+BYTES_DOWNLOADED_STAT = "Bytes Downloaded"
+
+
+class RuntimeHistory:
+    """Per spider history of elapsed time, item count and bytes downloaded
+    :param location: path of the json file the history is kept in, created on save if it doesn't exist
+    """
+
+    def __init__(self, location: Union[str, Path] = DEFAULT_RUNTIME_HISTORY_LOCATION):
+        self.location = Path(location)
+        self.runs: Dict[str, List[dict]] = {}
+
+        if self.location.is_file():
+            try:
+                with self.location.open(mode="r") as f:
+                    self.runs = json.load(f)
+            except (OSError, json.decoder.JSONDecodeError) as e:
+                print(f"Could not read runtime history at {self.location}, starting fresh", e)
+
+    def record_stats(self, all_stats: Dict[str, dict]) -> None:
+        """Adds a run for every spider in all_stats that has an elapsed time
+        :param all_stats: stats keyed by spider name, as collected in GCSpider.stats
+        """
+        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        for spider_name, stats in all_stats.items():
+            elapsed = stats.get(ELAPSED_TIME_STAT)
+            if elapsed is None:
+                continue
+
+            runs = self.runs.setdefault(spider_name, [])
+            runs.append({
+                "timestamp": timestamp,
+                "elapsed_seconds": float(elapsed),
+                "item_count": int(stats.get(ITEM_COUNT_STAT, 0)),
+                "bytes_downloaded": int(stats.get(BYTES_DOWNLOADED_STAT, 0)),
+            })
+            del runs[:-MAX_RUNS_KEPT]
+
+    def known_elapsed(self, spider_name: str) -> Optional[float]:
+        """Median elapsed seconds of the spider's recorded runs, None if it has none"""
+        runs = self.runs.get(spider_name)
+        if not runs:
+            return None
+        return statistics.median(run["elapsed_seconds"] for run in runs)
+
+    def predict_elapsed(self, spider_name: str) -> float:
+        """Predicted elapsed seconds for the spider's next run.
+        Spiders without history get the median of the known spiders so they aren't packed as if they were free
+        """
+        known = self.known_elapsed(spider_name)
+        if known is not None:
+            return known
+
+        all_known = [self.known_elapsed(name) for name in self.runs]
+        all_known = [e for e in all_known if e is not None]
+        return statistics.median(all_known) if all_known else DEFAULT_ELAPSED_SECONDS
+
+    def save(self) -> None:
+        self.location.parent.mkdir(parents=True, exist_ok=True)
+        tmp_location = self.location.with_suffix(self.location.suffix + ".tmp")
+        with tmp_location.open(mode="w") as f:
+            json.dump(self.runs, f, indent=2, sort_keys=True)
+        os.replace(tmp_location, self.location)
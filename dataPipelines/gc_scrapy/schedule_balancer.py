@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+gc_scrapy.schedule_balancer
+-----------------
+Rebalances the paasJobs/crawler_schedule day files from measured spider runtimes
+"""
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Union
+from urllib.parse import urlparse
+
+from dataPipelines import REPO_ROOT
+from dataPipelines.gc_scrapy.scheduling import pack_longest_first
+
+DEFAULT_SCHEDULE_DIR = REPO_ROOT / "paasJobs" / "crawler_schedule"
+DEFAULT_SPIDERS_DIR = REPO_ROOT / "dataPipelines" / "gc_scrapy" / "gc_scrapy" / "spiders"
+SCHEDULE_DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def spider_module_name(entry: str) -> str:
+    """Schedule entries are spider module names with or without .py"""
+    return entry.strip().replace(".py", "")
+
+
+def read_schedule_file(schedule_file: Union[Path, str]) -> List[str]:
+    """Non-empty entries of a schedule file, in order. Missing files have no entries"""
+    path = Path(schedule_file)
+    if not path.is_file():
+        return []
+    with path.open(mode="r") as f:
+        return [line.strip() for line in f.readlines() if line.strip()]
+
+
+def read_day_schedules(schedule_dir: Union[Path, str]) -> Dict[str, List[str]]:
+    """Entries of each day file in schedule_dir, keyed by day"""
+    return {day: read_schedule_file(Path(schedule_dir, f"{day}.txt")) for day in SCHEDULE_DAYS}
+
+
+def read_other_schedules(schedule_dir: Union[Path, str]) -> List[str]:
+    """Entries of every non-day schedule file in schedule_dir, e.g. oneoff.txt"""
+    entries = []
+    for path in sorted(Path(schedule_dir).glob("*.txt")):
+        if path.stem not in SCHEDULE_DAYS:
+            entries.extend(read_schedule_file(path))
+    return entries
+
+
+def list_spider_modules(spiders_dir: Union[Path, str] = DEFAULT_SPIDERS_DIR) -> List[str]:
+    """Spider module names in the spiders dir, same rule as github_action.check_spiders_scheduled.py"""
+    return sorted(
+        f.stem for f in Path(spiders_dir).iterdir()
+        if f.is_file() and f.suffix == ".py" and not f.name.startswith("_")
+    )
+
+
+def normalize_domain(domain_or_url: str) -> str:
+    """Lowercase host without www. so allowed_domains and start_urls of the same site compare equal"""
+    host = urlparse(domain_or_url).netloc if "://" in domain_or_url else domain_or_url
+    host = host.strip().strip("/").split("/")[0].lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def get_spider_domains(allowed_domains: Iterable[str], start_urls: Iterable[str]) -> List[str]:
+    """Normalized domains a spider hits from its allowed_domains and start_urls"""
+    domains = {normalize_domain(d) for d in list(allowed_domains or []) + list(start_urls or [])}
+    return sorted(d for d in domains if d)
+
+
+def balance_day_schedules(entries: List[str], duration: Callable[[str], float],
+                          domains: Callable[[str], Iterable[str]]) -> Dict[str, List[str]]:
+    """Packs the entries across the days longest first so the longest day is as short as possible.
+    Entries sharing a domain go on different days when there are enough days for it
+    :param entries: schedule entries to spread across the days
+    :param duration: returns the predicted run time of an entry in seconds
+    :param domains: returns the domains an entry's spider hits
+
+    :returns: entries for each day, keyed by day
+    """
+    bins = pack_longest_first(entries, len(SCHEDULE_DAYS), duration, domains)
+    return dict(zip(SCHEDULE_DAYS, bins))
+
+
+def write_day_schedules(schedules: Dict[str, List[str]], output_dir: Union[Path, str]) -> None:
+    """Writes each day's entries to <output_dir>/<day>.txt, one per line"""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    for day, entries in schedules.items():
+        with Path(output_dir, f"{day}.txt").open(mode="w") as f:
+            f.write("".join(f"{entry}\n" for entry in entries))
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+gc_scrapy.scheduling
+-----------------
+Helpers for ordering and packing spiders by their predicted run time
+"""
+import heapq
+from typing import Callable, Iterable, List, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+
+def order_longest_first(jobs: List[T], duration: Callable[[T], float]) -> List[T]:
+    """Sorts jobs by predicted duration, longest first. Ties keep their given order
+    :param jobs: jobs to order
+    :param duration: returns the predicted duration of a job in seconds
+
+    :returns: new list of the jobs, longest first
+    """
+    return sorted(jobs, key=duration, reverse=True)
+
+
+def pack_longest_first(jobs: List[T], num_bins: int, duration: Callable[[T], float],
+                       groups: Optional[Callable[[T], Iterable[str]]] = None) -> List[List[T]]:
+    """Longest processing time first packing. Each job, longest first, goes to the bin with the least predicted total
+    :param jobs: jobs to pack
+    :param num_bins: number of bins to pack the jobs in to
+    :param duration: returns the predicted duration of a job in seconds
+    :param groups: optional, returns the groups (e.g. domains) of a job.
+        A job skips bins that already hold a job from one of its groups unless every bin does
+
+    :returns: list of num_bins lists of jobs, each ordered longest first
+    """
+    if num_bins < 1:
+        raise ValueError(f"num_bins must be at least 1, got {num_bins}")
+
+    bins: List[List[T]] = [[] for _ in range(num_bins)]
+    loads = [0.0] * num_bins
+    bin_groups: List[Set[str]] = [set() for _ in range(num_bins)]
+    for job in order_longest_first(jobs, duration):
+        job_groups = set(groups(job)) if groups else set()
+        candidates = sorted(range(num_bins), key=loads.__getitem__)
+        i = next((b for b in candidates if not bin_groups[b] & job_groups), candidates[0])
+        bins[i].append(job)
+        loads[i] += duration(job)
+        bin_groups[i] |= job_groups
+
+    return bins
+
+
+def predict_wall_time(durations: List[float], slots: int = 1) -> float:
+    """Predicts the wall time of running durations in order, starting the next as soon as one of the slots frees up
+    :param durations: predicted job durations in seconds, in the order they are queued
+    :param slots: number of jobs that run at the same time
+
+    :returns: predicted wall time in seconds
+    """
+    if slots < 1:
+        raise ValueError(f"slots must be at least 1, got {slots}")
+
+    finish_times: List[float] = []
+    for d in durations:
+        start = heapq.heappop(finish_times) if len(finish_times) >= slots else 0.0
+        heapq.heappush(finish_times, start + d)
+
+    return max(finish_times, default=0.0)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+gc_scrapy.spider_registry
+-----------------
+Index of the spiders in gc_scrapy/spiders built by reading their source, so the CLI can plan and
+resolve spiders without importing every spider module (and selenium, bs4, pandas along with them)
+"""
+import ast
+import importlib
+import json
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from dataPipelines.gc_scrapy.gc_scrapy import SPIDER_REGISTRY_PATH
+
+SPIDERS_DIR = Path(__file__).parent / "gc_scrapy" / "spiders"
+SPIDERS_PACKAGE = "dataPipelines.gc_scrapy.gc_scrapy.spiders"
+
+# base classes that make a spider run through selenium
+SELENIUM_BASE_CLASSES = {"GCSeleniumSpider"}
+
+
+class _NotStatic(Exception):
+    """Raised when an expression can't be evaluated from the source alone"""
+
+
+def _static_eval(node: ast.AST, env: Dict[str, Any]) -> Any:
+    """Evaluates literals, names assigned earlier in env, + and f-strings. Anything else raises _NotStatic"""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id in env:
+            return env[node.id]
+        raise _NotStatic(node.id)
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        values = [_static_eval(elt, env) for elt in node.elts]
+        return values if not isinstance(node, ast.Set) else sorted(set(values), key=str)
+    if isinstance(node, ast.Dict):
+        result = {}
+        for key, value in zip(node.keys, node.values):
+            if key is None:
+                result.update(_static_eval(value, env))
+            else:
+                result[_static_eval(key, env)] = _static_eval(value, env)
+        return result
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        return _static_eval(node.left, env) + _static_eval(node.right, env)
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.FormattedValue):
+                parts.append(str(_static_eval(value.value, env)))
+            else:
+                parts.append(_static_eval(value, env))
+        return "".join(parts)
+    raise _NotStatic(ast.dump(node))
+
+
+def _assignments(body: List[ast.stmt]) -> List[tuple]:
+    """(name, value node) of the simple assignments in a module or class body, in order"""
+    assigned = []
+    for stmt in body:
+        if isinstance(stmt, ast.Assign):
+            for target in stmt.targets:
+                if isinstance(target, ast.Name):
+                    assigned.append((target.id, stmt.value))
+        elif isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name) and stmt.value is not None:
+            assigned.append((stmt.target.id, stmt.value))
+    return assigned
+
+
+def _base_names(class_def: ast.ClassDef) -> List[str]:
+    names = []
+    for base in class_def.bases:
+        if isinstance(base, ast.Name):
+            names.append(base.id)
+        elif isinstance(base, ast.Attribute):
+            names.append(base.attr)
+    return names
+
+
+def inspect_spider_source(source: str, module_name: str) -> Optional[dict]:
+    """Registry entry for the first class in the source that sets a string name, like iter_spider_classes would pick
+    :param source: spider module source code
+    :param module_name: spider module name, without package or .py
+
+    :returns: registry entry dict, None if there is no spider class in the source
+    """
+    tree = ast.parse(source)
+
+    module_env: Dict[str, Any] = {}
+    for name, value in _assignments(tree.body):
+        try:
+            module_env[name] = _static_eval(value, module_env)
+        except _NotStatic:
+            module_env.pop(name, None)
+
+    selenium_classes = set(SELENIUM_BASE_CLASSES)
+    for class_def in (stmt for stmt in tree.body if isinstance(stmt, ast.ClassDef)):
+        if selenium_classes & set(_base_names(class_def)):
+            selenium_classes.add(class_def.name)
+
+        class_env = dict(module_env)
+        static_attrs: Dict[str, Any] = {}
+        for name, value in _assignments(class_def.body):
+            try:
+                class_env[name] = static_attrs[name] = _static_eval(value, class_env)
+            except _NotStatic:
+                class_env.pop(name, None)
+                static_attrs[name] = _NotStatic
+
+        if not isinstance(static_attrs.get("name"), str):
+            continue
+
+        custom_settings = static_attrs.get("custom_settings")
+        return {
+            "module": f"{SPIDERS_PACKAGE}.{module_name}",
+            "class_name": class_def.name,
+            "name": static_attrs["name"],
+            "allowed_domains": list(static_attrs.get("allowed_domains") or []),
+            "start_urls": list(static_attrs.get("start_urls") or []),
+            "selenium": class_def.name in selenium_classes,
+            # None when the spider inherits its settings or they can't be read statically
+            "custom_settings": custom_settings if isinstance(custom_settings, dict) else None,
+            "source_hash": sha256(source.encode("utf-8")).hexdigest(),
+        }
+
+    return None
+
+
+def build_spider_registry(spiders_dir: Union[Path, str] = SPIDERS_DIR) -> Dict[str, dict]:
+    """Registry entries for every spider module in spiders_dir, keyed by module name"""
+    registry = {}
+    for path in sorted(Path(spiders_dir).glob("*.py")):
+        if path.name.startswith("_"):
+            continue
+        entry = inspect_spider_source(path.read_text(encoding="utf-8"), path.stem)
+        if entry:
+            registry[path.stem] = entry
+        else:
+            print(f"No spider class found in {path.name}, leaving it out of the registry")
+    return registry
+
+
+def write_spider_registry(registry: Dict[str, dict], registry_path: Union[Path, str] = SPIDER_REGISTRY_PATH) -> None:
+    with open(registry_path, "w") as f:
+        json.dump(registry, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+class SpiderRegistry:
+    """Spider registry entries keyed by module name.
+    Modules whose source changed since the registry file was generated are re-inspected on load
+    :param registry_path: generated registry json file
+    :param spiders_dir: directory of the spider modules
+    """
+
+    def __init__(self, registry_path: Union[Path, str] = SPIDER_REGISTRY_PATH,
+                 spiders_dir: Union[Path, str] = SPIDERS_DIR):
+        self.spiders_dir = Path(spiders_dir)
+        self.entries: Dict[str, dict] = {}
+
+        try:
+            with open(registry_path) as f:
+                self.entries = json.load(f)
+        except (OSError, json.decoder.JSONDecodeError) as e:
+            print(f"Could not read spider registry at {registry_path}, building it from source", e)
+
+        self.stale_modules = []
+        module_paths = {
+            p.stem: p for p in self.spiders_dir.glob("*.py") if not p.name.startswith("_")
+        }
+        for module_name in set(self.entries) - set(module_paths):
+            del self.entries[module_name]
+        for module_name, path in module_paths.items():
+            source = path.read_text(encoding="utf-8")
+            entry = self.entries.get(module_name)
+            if entry and entry["source_hash"] == sha256(source.encode("utf-8")).hexdigest():
+                continue
+            self.stale_modules.append(module_name)
+            entry = inspect_spider_source(source, module_name)
+            if entry:
+                self.entries[module_name] = entry
+            else:
+                self.entries.pop(module_name, None)
+
+        if self.stale_modules:
+            print(
+                "Spider registry is out of date for", ", ".join(sorted(self.stale_modules)),
+                "- run `python -m dataPipelines.gc_scrapy build-registry`"
+            )
+
+    def get(self, spider_module_name: str) -> Optional[dict]:
+        """Registry entry for a spiders file entry, with or without .py"""
+        return self.entries.get(spider_module_name.strip().replace(".py", ""))
+
+    def module_names(self) -> List[str]:
+        return sorted(self.entries)
+
+
+def import_spider(entry: dict):
+    """Imports only the entry's module and returns its spider class"""
+    spider_module = importlib.import_module(entry["module"])
+    return getattr(spider_module, entry["class_name"])
@@ -25,6 +25,20 @@ function setup_local_vars_and_dirs() {
   LOCAL_JOB_LOG_PATH="$LOCAL_DOWNLOAD_DIRECTORY_PATH/job.log"
   LOCAL_PREVIOUS_MANIFEST_LOCATION="${LOCAL_PREVIOUS_MANIFEST_LOCATION:-$SCRIPT_PARENT_DIR/previous-manifest.json}"
   LOCAL_NEW_MANIFEST_PATH="$LOCAL_DOWNLOAD_DIRECTORY_PATH/manifest.json"
+  LOCAL_PREVIOUS_HASH_INDEX_DIR="${LOCAL_PREVIOUS_HASH_INDEX_DIR:-$SCRIPT_PARENT_DIR/previous-hash-index}"
+  # set MANIFEST_SHARDS_S3_PATH to keep the manifest as per crawler shards instead of one cumulative manifest
+  LOCAL_PREVIOUS_MANIFEST_SHARD_DIR="${LOCAL_PREVIOUS_MANIFEST_SHARD_DIR:-$TMPDIR/previous-manifest-shards}"
+  # set CONTENT_STORE_DIR, on the download dir's filesystem but outside it, to keep repeated downloads as hardlinks
+  # set VALIDATOR_CACHE_LOCATION, on a volume kept between runs, to skip downloads whose content hasn't changed
+  # set LISTING_CACHE_LOCATION, on a volume kept between runs, to reuse the items of listing pages that haven't changed
+  # set CRAWLER_STATE_DIR, a volume kept between runs, to keep what crawls learn for the next run, e.g. throttle limits,
+  # the spider runtimes crawls are ordered by and the cumulative manifest store. Otherwise they're lost with the container
+  if [[ -n "${CRAWLER_STATE_DIR:-}" ]]; then
+    mkdir -p "$CRAWLER_STATE_DIR"
+    export GC_SCRAPY_THROTTLE_STATE_LOCATION="${GC_SCRAPY_THROTTLE_STATE_LOCATION:-$CRAWLER_STATE_DIR/throttle_state.json}"
+    RUNTIME_HISTORY_LOCATION="${RUNTIME_HISTORY_LOCATION:-$CRAWLER_STATE_DIR/runtime_history.json}"
+    MANIFEST_STORE_LOCATION="${MANIFEST_STORE_LOCATION:-$CRAWLER_STATE_DIR/manifest.sqlite}"
+  fi
 
   if [[ ! -d "$LOCAL_DOWNLOAD_DIRECTORY_PATH" ]]; then
     mkdir -p "$LOCAL_DOWNLOAD_DIRECTORY_PATH"
@@ -40,6 +54,58 @@ function setup_local_vars_and_dirs() {
 ## ## MAIN FUNCTIONS
 #####
 
+function build_previous_hash_index() {
+  # crawl falls back to reading the previous manifest if the index can't be built
+  if [[ -f "$LOCAL_PREVIOUS_MANIFEST_LOCATION" ]] \
+    && "$PYTHON_CMD" -m dataPipelines.gc_scrapy build-hash-index \
+      --previous-manifest-location="$LOCAL_PREVIOUS_MANIFEST_LOCATION" \
+      --index-dir="$LOCAL_PREVIOUS_HASH_INDEX_DIR"; then
+    PREVIOUS_HASH_INDEX_ARG="--previous-hash-index-dir=$LOCAL_PREVIOUS_HASH_INDEX_DIR"
+  else
+    echo "Could not build previous hash index, filtering with the previous manifest"
+    PREVIOUS_HASH_INDEX_ARG=""
+  fi
+}
+
+function manifest_shards_s3_path() {
+  local s3_path="${MANIFEST_SHARDS_S3_PATH#/}"
+  echo "s3://${BUCKET}/${s3_path%/}"
+}
+
+function grab_manifest_shards() {
+  # only the shard index and the shards of the spiders this run crawls
+  local shard_name
+  local shard_names_file="$LOCAL_PREVIOUS_MANIFEST_SHARD_DIR.names"
+  mkdir -p "$LOCAL_PREVIOUS_MANIFEST_SHARD_DIR"
+
+  "$PYTHON_CMD" -m dataPipelines.gc_scrapy manifest shard-names \
+    --output-location="$shard_names_file" \
+    ${LOCAL_SPIDER_LIST_FILE:+ "--spiders-file-location=$LOCAL_SPIDER_LIST_FILE"}
+
+  while read -r shard_name; do
+    aws s3 cp "$(manifest_shards_s3_path)/$shard_name" "$LOCAL_PREVIOUS_MANIFEST_SHARD_DIR/$shard_name" --only-show-errors \
+      || echo "No previous manifest shard $shard_name, it is created after the crawl"
+  done < "$shard_names_file"
+}
+
+function update_manifest_shards() {
+  if [[ ! -f "$LOCAL_NEW_MANIFEST_PATH" ]]; then
+    echo "No new manifest, manifest shards are unchanged"
+    return 0
+  fi
+
+  "$PYTHON_CMD" -m dataPipelines.gc_scrapy manifest shard \
+    --shard-dir="$LOCAL_PREVIOUS_MANIFEST_SHARD_DIR" "$LOCAL_NEW_MANIFEST_PATH"
+  # the shard dir only has this run's shards, the unattributed shard never gets new lines
+  aws s3 cp "$LOCAL_PREVIOUS_MANIFEST_SHARD_DIR" "$(manifest_shards_s3_path)" --recursive --only-show-errors \
+    --exclude "_unattributed.json" && rc=$? || rc=$?
+
+  if [[ "$rc" -ne 0 ]]; then
+    >&2 echo -e "\n[ERROR] FAILED TO UPLOAD MANIFEST SHARDS\n"
+    exit 12
+  fi
+}
+
 function run_crawler() {
   if [[ "${TEST_RUN:-no}" == "yes" ]]; then
     echo -e "\n RUNNING SCRAPY SPIDER: us_code_spider.py \n"
@@ -50,10 +116,25 @@ function run_crawler() {
 
   set +o pipefail
 
+  local previous_manifest_arg
+  if [[ -n "${MANIFEST_SHARDS_S3_PATH:-}" ]]; then
+    grab_manifest_shards
+    previous_manifest_arg="--previous-manifest-shard-dir=$LOCAL_PREVIOUS_MANIFEST_SHARD_DIR"
+    PREVIOUS_HASH_INDEX_ARG=""
+  else
+    build_previous_hash_index
+    previous_manifest_arg="--previous-manifest-location=$LOCAL_PREVIOUS_MANIFEST_LOCATION"
+  fi
+
   "$PYTHON_CMD" -m dataPipelines.gc_scrapy crawl \
   --download-output-dir=$LOCAL_DOWNLOAD_DIRECTORY_PATH \
   --crawler-output-location=$LOCAL_CRAWLER_OUTPUT_FILE_PATH \
-  --previous-manifest-location=$LOCAL_PREVIOUS_MANIFEST_LOCATION \
+  "$previous_manifest_arg" \
+  ${PREVIOUS_HASH_INDEX_ARG:+ "$PREVIOUS_HASH_INDEX_ARG"} \
+  ${CONTENT_STORE_DIR:+ "--content-store-dir=$CONTENT_STORE_DIR"} \
+  ${VALIDATOR_CACHE_LOCATION:+ "--validator-cache-location=$VALIDATOR_CACHE_LOCATION"} \
+  ${LISTING_CACHE_LOCATION:+ "--listing-cache-location=$LISTING_CACHE_LOCATION"} \
+  ${RUNTIME_HISTORY_LOCATION:+ "--runtime-history-location=$RUNTIME_HISTORY_LOCATION"} \
   --slack-hook-channel-id=$SLACK_HOOK_CHANNEL_ID \
   --slack-hook-url=$SLACK_HOOK_URL \
   ${LOCAL_SPIDER_LIST_FILE:+ "--spiders-file-location=$LOCAL_SPIDER_LIST_FILE"}
@@ -75,12 +156,44 @@ function run_upload() {
 }
 
 function create_cumulative_manifest() {
-  local cumulative_manifest="$LOCAL_DOWNLOAD_DIRECTORY_PATH/cumulative-manifest.json"
-  if [[ -f "$LOCAL_PREVIOUS_MANIFEST_LOCATION" ]]; then
-    cat "$LOCAL_PREVIOUS_MANIFEST_LOCATION" > "$cumulative_manifest"
-    echo >> "$cumulative_manifest"
+  local cumulative_manifest="$LOCAL_DOWNLOAD_DIRECTORY_PATH/cumulative-manifest.json.gz"
+  local manifest_store="${MANIFEST_STORE_LOCATION:-}"
+  local tmp_store_dir=""
+  local manifest_locations=()
+  if [[ -z "$manifest_store" ]]; then
+    tmp_store_dir="$(mktemp -d)"
+    manifest_store="$tmp_store_dir/manifest.sqlite"
   fi
-  cat "$LOCAL_NEW_MANIFEST_PATH" >> "$cumulative_manifest"
+  # a store kept from the last run already has the previous manifest, it's only read in to a new store
+  if [[ ! -f "$manifest_store" && -f "$LOCAL_PREVIOUS_MANIFEST_LOCATION" ]]; then
+    manifest_locations+=("$LOCAL_PREVIOUS_MANIFEST_LOCATION")
+  fi
+  if [[ -f "$LOCAL_NEW_MANIFEST_PATH" ]]; then
+    manifest_locations+=("$LOCAL_NEW_MANIFEST_PATH")
+  fi
+
+  # dedupe through the manifest store and drop all but the MANIFEST_KEEP_VERSIONS latest versions of each document
+  if { [[ "${#manifest_locations[@]}" -eq 0 ]] \
+      || "$PYTHON_CMD" -m dataPipelines.gc_scrapy manifest import --store-location="$manifest_store" \
+        "${manifest_locations[@]}"; } \
+    && "$PYTHON_CMD" -m dataPipelines.gc_scrapy manifest compact --store-location="$manifest_store" \
+      --keep-versions="$MANIFEST_KEEP_VERSIONS" \
+    && "$PYTHON_CMD" -m dataPipelines.gc_scrapy manifest export --store-location="$manifest_store" \
+      --output-location="$cumulative_manifest"; then
+    [[ -z "$tmp_store_dir" ]] || rm -rf "$tmp_store_dir"
+    return 0
+  fi
+
+  echo "Could not build the cumulative manifest with the manifest store, appending the new manifest instead"
+  # a store that failed part way is started over next run
+  rm -rf "$manifest_store" "$cumulative_manifest" ${tmp_store_dir:+ "$tmp_store_dir"}
+  {
+    if [[ -f "$LOCAL_PREVIOUS_MANIFEST_LOCATION" ]]; then
+      cat "$LOCAL_PREVIOUS_MANIFEST_LOCATION"
+      echo
+    fi
+    cat "$LOCAL_NEW_MANIFEST_PATH"
+  } | gzip > "$cumulative_manifest"
 }
 
 
@@ -132,5 +245,9 @@ run_upload
 #register_log_in_manifest
 #register_crawl_log_in_manifest
 
-# create combined manifest for future runs
-create_cumulative_manifest
\ No newline at end of file
+# create combined manifest, or update this run's manifest shards, for future runs
+if [[ -n "${MANIFEST_SHARDS_S3_PATH:-}" ]]; then
+  update_manifest_shards
+else
+  create_cumulative_manifest
+fi
\ No newline at end of file
@@ -54,12 +54,16 @@ HOST_JOB_DL_DIR="$HOST_JOB_TMP_DIR/$JOB_NAME/$JOB_TS_SIMPLE"
 CRAWLER_CONTAINER_DL_DIR="/var/tmp/output"
 # where files to be scanned are mounted inside scanner container
 SCANNER_SCAN_DIR="$CRAWLER_CONTAINER_DL_DIR"
+# state crawls learn from and reuse next run, e.g. throttle limits and spider runtimes, kept on the host as the container isn't
+HOST_CRAWLER_STATE_DIR="${HOST_CRAWLER_STATE_DIR:-$HOST_JOB_TMP_DIR/$JOB_NAME-state}"
+# where that state is from container's perspective
+CRAWLER_CONTAINER_STATE_DIR="/var/lib/gc_crawler_state"
 # general S3 bucket settings
 SCANNER_UPLOADER_BUCKET="advana-data-zone"
 
 ## MANIFEST VARS
-# path to the manifest to download in s3
-SCANNER_UPLOADER_S3PATH_MANIFEST="/bronze/gamechanger/data-pipelines/orchestration/crawlers/cumulative-manifest.json"
+# path to the manifest to download in s3, gzipped
+SCANNER_UPLOADER_S3PATH_MANIFEST="/bronze/gamechanger/data-pipelines/orchestration/crawlers/cumulative-manifest.json.gz"
 # full path for S3 manifest
 S3FULLPATH_MANIFEST="s3://${SCANNER_UPLOADER_BUCKET}/${SCANNER_UPLOADER_S3PATH_MANIFEST#/}"
 # previous manifest location - local
@@ -67,6 +71,10 @@ LOCAL_PREVIOUS_MANIFEST_LOCATION="$HOST_JOB_TMP_DIR/previous-manifest.json"
 # previous manifest location - in container
 CRAWLER_CONTAINER_MANIFEST_LOCATION="/tmp/previous-manifest.json"
 CRAWLER_CONTAINER_SPIDER_LIST_FILE="/tmp/spiders_to_run.txt"
+# set MANIFEST_SHARDS=yes to keep the manifest as per crawler shards, the crawl container fetches and uploads
+# only the shards of the spiders it runs instead of this job copying the whole cumulative manifest
+MANIFEST_SHARDS="${MANIFEST_SHARDS:-no}"
+SCANNER_UPLOADER_S3PATH_MANIFEST_SHARDS="/bronze/gamechanger/data-pipelines/orchestration/crawlers/manifest-shards"
 
 #####
 ## ## Main Procedures
@@ -84,10 +92,21 @@ function recreate_host_dl_dir() {
     mkdir -p "$HOST_JOB_DL_DIR"
 }
 
+function create_host_state_dir() {
+    # kept between runs, unlike the DL dir
+    mkdir -p "$HOST_CRAWLER_STATE_DIR"
+}
+
 function grab_manifest() {
   local rc
   >&2 echo -e "\n[INFO] GRABBING LATEST MANIFEST\n"
-  aws s3 cp "${S3FULLPATH_MANIFEST}" "${LOCAL_PREVIOUS_MANIFEST_LOCATION}" && rc=$? || rc=$?
+  aws s3 cp "${S3FULLPATH_MANIFEST}" "${LOCAL_PREVIOUS_MANIFEST_LOCATION}.gz" \
+    && gunzip --stdout "${LOCAL_PREVIOUS_MANIFEST_LOCATION}.gz" >| "${LOCAL_PREVIOUS_MANIFEST_LOCATION}" && rc=$? || rc=$?
+
+  if [[ "$rc" -ne 0 ]]; then
+    >&2 echo -e "\n[WARNING] NO GZIPPED MANIFEST, GRABBING THE PLAIN ONE IT REPLACES\n"
+    aws s3 cp "${S3FULLPATH_MANIFEST%.gz}" "${LOCAL_PREVIOUS_MANIFEST_LOCATION}" && rc=$? || rc=$?
+  fi
 
   if [[ "$rc" -ne 0 ]]; then
     >&2 echo -e "\n[ERROR] FAILED TO GRAB MANIFEST\n"
@@ -96,8 +115,8 @@ function grab_manifest() {
 }
 
 function update_manifest() {
-  local local_new_cumulative_manifest="${HOST_JOB_DL_DIR}/cumulative-manifest.json"
-  local s3_backup_cumulative_manifest="${S3FULLPATH_MANIFEST%.json}.${JOB_TS_SIMPLE}.json"
+  local local_new_cumulative_manifest="${HOST_JOB_DL_DIR}/cumulative-manifest.json.gz"
+  local s3_backup_cumulative_manifest="${S3FULLPATH_MANIFEST%.json.gz}.${JOB_TS_SIMPLE}.json.gz"
 
   >&2 echo -e "\n[INFO] UPDATING LATEST MANIFEST\n"
   # backup old manifest
@@ -112,14 +131,25 @@ function run_crawl_download_upload() {
   local container_name="$JOB_NAME"
   docker rm --force "$container_name" || true
 
+  local manifest_args
+  if [[ "$MANIFEST_SHARDS" == "yes" ]]; then
+    manifest_args=(-e "MANIFEST_SHARDS_S3_PATH=${SCANNER_UPLOADER_S3PATH_MANIFEST_SHARDS}")
+  else
+    manifest_args=(
+      -v "${LOCAL_PREVIOUS_MANIFEST_LOCATION}:${CRAWLER_CONTAINER_MANIFEST_LOCATION}:z"
+      -e "LOCAL_PREVIOUS_MANIFEST_LOCATION=${CRAWLER_CONTAINER_MANIFEST_LOCATION}"
+    )
+  fi
+
   echo "Running crawler container: $container_name"
   docker run \
     --name "$container_name" \
     -u "$(id -u):$(id -g)" \
-    -v "${LOCAL_PREVIOUS_MANIFEST_LOCATION}:${CRAWLER_CONTAINER_MANIFEST_LOCATION}:z" \
+    "${manifest_args[@]}" \
     -v "${HOST_JOB_DL_DIR}:${CRAWLER_CONTAINER_DL_DIR}:z" \
     -e "LOCAL_DOWNLOAD_DIRECTORY_PATH=${CRAWLER_CONTAINER_DL_DIR}" \
-    -e "LOCAL_PREVIOUS_MANIFEST_LOCATION=${CRAWLER_CONTAINER_MANIFEST_LOCATION}" \
+    -v "${HOST_CRAWLER_STATE_DIR}:${CRAWLER_CONTAINER_STATE_DIR}:z" \
+    -e "CRAWLER_STATE_DIR=${CRAWLER_CONTAINER_STATE_DIR}" \
     -e "AWS_DEFAULT_REGION=${SCANNER_UPLOADER_AWS_DEFAULT_REGION}" \
     -e "BUCKET=${SCANNER_UPLOADER_BUCKET}" \
     -e "S3_UPLOAD_BASE_PATH=${SCANNER_UPLOADER_S3PATH}" \
@@ -162,8 +192,13 @@ EOF
 
 # make sure we have a fresh dir to put files into
 recreate_host_dl_dir
+create_host_state_dir
 # grab the previous manifest from s3, download files, and scan files & upload to s3
-grab_manifest && run_crawl_download_upload && update_manifest
+if [[ "$MANIFEST_SHARDS" == "yes" ]]; then
+  run_crawl_download_upload
+else
+  grab_manifest && run_crawl_download_upload && update_manifest
+fi
 
 cat <<EOF
   FINISHED JOB - $JOB_NAME
@@ -0,0 +1,113 @@
+import json
+from types import SimpleNamespace
+
+from scrapy import Request, signals
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from dataPipelines.gc_scrapy.gc_scrapy.downloader_middlewares import AdaptiveThrottleMiddleware
+from dataPipelines.gc_scrapy.gc_scrapy.GCSpider import GCSpider
+
+from dataPipelines.gc_scrapy.gc_scrapy.middleware_utils.adaptive_throttle import (
+    BLOCK_PAGE_SIGNATURES,
+    DomainThrottle,
+    ThrottleState,
+    looks_like_ban_page,
+    parse_retry_after,
+)
+
+
+def make_throttle(**kwargs):
+    args = dict(delay=0.1, concurrency=8, min_delay=0.1, max_delay=60, max_concurrency=8, ramp_up_after=2)
+    args.update(kwargs)
+    return DomainThrottle(**args)
+
+
+def test_backoff_then_ramp_up():
+    throttle = make_throttle()
+
+    throttle.backoff()
+    assert (throttle.delay, throttle.concurrency) == (1.0, 4)
+    throttle.backoff(min_wait=5)
+    assert (throttle.delay, throttle.concurrency) == (5, 2)
+
+    for _ in range(4):
+        throttle.record_healthy(latency=0.2, slow_latency=2.0)
+    assert throttle.concurrency == 4
+    assert throttle.delay == 5 * 0.75 * 0.75
+
+
+def test_slow_responses_hold_limits():
+    throttle = make_throttle(concurrency=2)
+
+    for _ in range(4):
+        throttle.record_healthy(latency=3.0, slow_latency=2.0)
+
+    assert throttle.concurrency == 2
+    assert throttle.delay == 1.5
+
+
+def test_ban_page_and_retry_after():
+    incapsula = b"<html><iframe>Request unsuccessful. Incapsula incident ID: 123</iframe></html>"
+    assert looks_like_ban_page(incapsula, BLOCK_PAGE_SIGNATURES)
+    # a form with a captcha widget isn't a block page
+    assert not looks_like_ban_page(b'<html><div class="g-recaptcha"></div></html>', BLOCK_PAGE_SIGNATURES)
+    assert not looks_like_ban_page(b"<html>Instructions</html>", BLOCK_PAGE_SIGNATURES)
+    assert parse_retry_after(b"30") == 30
+    assert parse_retry_after(b"Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after(None) == 0
+
+
+def test_throttle_state_keeps_other_domains(tmp_path):
+    location = tmp_path / "throttle_state.json"
+    location.write_text(json.dumps({"other.mil": {"delay": 2, "concurrency": 1}}))
+
+    state = ThrottleState(location)
+    state.save({"www.jcs.mil": make_throttle(delay=4, concurrency=1)})
+
+    saved = ThrottleState(location)
+    assert saved.get("other.mil") == {"delay": 2, "concurrency": 1}
+    assert saved.get("www.jcs.mil")["delay"] == 4
+    assert saved.get("www.jcs.mil")["concurrency"] == 1
+
+
+class ThrottledSpider(GCSpider):
+    name = "throttled_spider"
+    download_delay = 1.5
+
+
+class Slot:
+    def __init__(self, delay, concurrency):
+        self.delay = delay
+        self.concurrency = concurrency
+
+
+def start_middleware(tmp_path, spider_class, **settings):
+    crawler = get_crawler(spider_class, {
+        "ADAPTIVE_THROTTLE_ENABLED": True,
+        "ADAPTIVE_THROTTLE_STATE_LOCATION": str(tmp_path / "throttle_state.json"),
+        **settings,
+    })
+    crawler.spider = spider_class()
+    crawler.engine = SimpleNamespace(downloader=SimpleNamespace(slots={"www.example.mil": Slot(0.0, 8)}))
+    return crawler, AdaptiveThrottleMiddleware.from_crawler(crawler)
+
+
+def test_middleware_keeps_download_delay_and_opt_in_ban_pages(tmp_path):
+    (tmp_path / "throttle_state.json").write_text(json.dumps({"www.example.mil": {"delay": 0.1, "concurrency": 2}}))
+    crawler, middleware = start_middleware(tmp_path, ThrottledSpider)
+    slots = crawler.engine.downloader.slots
+    request = Request("https://www.example.mil/pubs", meta={"download_slot": "www.example.mil"})
+
+    crawler.signals.send_catch_log(signals.request_reached_downloader, request=request, spider=crawler.spider)
+    assert (slots["www.example.mil"].delay, slots["www.example.mil"].concurrency) == (1.5, 2)
+
+    block_page = HtmlResponse(request.url, body=b"<title>Just a moment...</title>" + BLOCK_PAGE_SIGNATURES[0].encode(),
+                              request=request)
+    middleware.process_response(request, block_page, crawler.spider)
+    assert crawler.stats.get_value("adaptive_throttle/backoff_count") is None
+
+    crawler.spider.ban_page_markers = BLOCK_PAGE_SIGNATURES
+    middleware.process_response(request, block_page, crawler.spider)
+    assert crawler.stats.get_value("adaptive_throttle/backoff_reason/ban_page") == 1
+    assert slots["www.example.mil"].concurrency == 1
@@ -0,0 +1,129 @@
+import bz2
+import gzip
+import io
+import lzma
+import tarfile
+import zipfile
+
+import pytest
+
+from dataPipelines.gc_scrapy.gc_scrapy.archives import extract_archive, format_for_compression_type
+from dataPipelines.gc_scrapy.gc_scrapy.utils import unzip_docs_as_needed
+
+
+def zip_bytes(members):
+    f = io.BytesIO()
+    with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        for name, data in members.items():
+            zip_ref.writestr(name, data)
+    return f.getvalue()
+
+
+def tar_bytes(members):
+    f = io.BytesIO()
+    with tarfile.open(fileobj=f, mode="w") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return f.getvalue()
+
+
+def test_only_matching_members_of_nested_zips_are_written(tmp_path):
+    inner = zip_bytes({"b.pdf": b"b", "deeper.zip": zip_bytes({"c.PDF": b"c"}), "notes.txt": b"notes"})
+    archive = tmp_path / "bundle.zip"
+    archive.write_bytes(zip_bytes({"dir/a.pdf": b"a", "dir/inner.zip": inner, "readme.html": b"readme"}))
+    out = tmp_path / "out"
+    out.mkdir()
+
+    written = extract_archive(archive, "pdf", lambda name: out / name, threads=2)
+
+    assert written == [out / "a.pdf", out / "b.pdf", out / "c.PDF"]
+    assert sorted(p.name for p in out.iterdir()) == ["a.pdf", "b.pdf", "c.PDF"]
+    assert [p.read_bytes() for p in written] == [b"a", b"b", b"c"]
+
+
+def test_archives_of_mixed_formats_nest(tmp_path):
+    inner_zip = zip_bytes({"b.pdf": b"b", "c.pdf.xz": lzma.compress(b"c"), "d": bz2.compress(b"not a pdf")})
+    archive = tmp_path / "bundle.tar.gz"
+    archive.write_bytes(gzip.compress(tar_bytes({
+        "docs/a.pdf": b"a",
+        "docs/inner.zip": inner_zip,
+        "docs/more.tbz2": bz2.compress(tar_bytes({"e.pdf": b"e"})),
+        "no_extension": zip_bytes({"f.pdf": b"f"}),
+    })))
+    out = tmp_path / "out"
+    out.mkdir()
+
+    written = extract_archive(archive, "pdf", lambda name: out / name, compression_type="tar.gz")
+
+    assert [p.name for p in written] == ["a.pdf", "b.pdf", "c.pdf", "e.pdf", "f.pdf"]
+    assert [p.read_bytes() for p in written] == [b"a", b"b", b"c", b"e", b"f"]
+    assert sorted(p.name for p in out.iterdir()) == ["a.pdf", "b.pdf", "c.pdf", "e.pdf", "f.pdf"]
+
+
+def test_format_is_sniffed_before_compression_type(tmp_path):
+    archive = tmp_path / "EX 1.zip"
+    archive.write_bytes(gzip.compress(b"gzipped"))
+    out = tmp_path / "out"
+    out.mkdir()
+
+    assert extract_archive(archive, "pdf", lambda name: out / f"{name}.pdf", compression_type="zip") == []
+
+    unknown = tmp_path / "EX 2.bin"
+    unknown.write_bytes(b"not an archive")
+    with pytest.raises(ValueError):
+        extract_archive(unknown, "pdf", lambda name: out / name)
+
+    assert [format_for_compression_type(c).name for c in ["zip", "tar", "tar.gz", "tar.bz", "tar.xz", "gz"]] == [
+        "zip", "tar", "gz", "bz2", "xz", "gz"]
+    assert format_for_compression_type(None) is None
+
+
+def test_unzip_docs_as_needed_names_and_removes_the_zip(tmp_path):
+    archive = tmp_path / "US Code Title 42.zip"
+    archive.write_bytes(zip_bytes({
+        "usc42@ch1to5@Secs1to10.zip": zip_bytes({"usc42@ch1to5@Secs1to10.pdf": b"1"}),
+        "usc42@ch6to8@Secs11to20.zip": zip_bytes({"usc42@ch6to8@Secs11to20.pdf": b"2"}),
+    }))
+
+    written = unzip_docs_as_needed(archive, tmp_path / "US Code Title 42.pdf", "pdf")
+
+    assert [p.name for p in written] == [
+        "US Code Title 42 - Ch1 to Ch5 - Sec1 to Sec10.pdf",
+        "US Code Title 42 - Ch6 to Ch8 - Sec11 to Sec20.pdf",
+    ]
+    assert [p.read_bytes() for p in written] == [b"1", b"2"]
+    assert not archive.exists()
+
+
+def test_unzip_docs_as_needed_keeps_every_file_with_the_same_name(tmp_path):
+    archive = tmp_path / "EX 1.zip"
+    archive.write_bytes(zip_bytes({"a.pdf": b"a", "b.pdf": b"b"}))
+    (tmp_path / "EX 1.pdf").write_bytes(b"already there")
+
+    written = unzip_docs_as_needed(archive, tmp_path / "EX 1.pdf", "pdf")
+
+    assert [p.name for p in written] == ["EX 1_dup1.pdf", "EX 1_dup2.pdf"]
+    assert [p.read_bytes() for p in written] == [b"a", b"b"]
+    assert (tmp_path / "EX 1.pdf").read_bytes() == b"already there"
+
+
+def test_unzip_docs_as_needed_unpacks_other_formats(tmp_path):
+    archive = tmp_path / "EX 1.tar.xz"
+    archive.write_bytes(lzma.compress(tar_bytes({"a.pdf": b"a"})))
+
+    written = unzip_docs_as_needed(archive, tmp_path / "EX 1.pdf", "pdf", compression_type="tar.xz")
+
+    assert written == [tmp_path / "EX 1.pdf"]
+    assert written[0].read_bytes() == b"a"
+    assert not archive.exists()
+
+
+def test_unzip_docs_as_needed_without_matching_files(tmp_path):
+    archive = tmp_path / "EX 1.zip"
+    archive.write_bytes(zip_bytes({"a.txt": b"a"}))
+
+    with pytest.raises(RuntimeError):
+        unzip_docs_as_needed(archive, tmp_path / "EX 1.pdf", "pdf")
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from dataPipelines.gc_scrapy.cli import (
+    get_crawl_settings,
+    get_feed_shard_location,
+    merge_feed_shards,
+    partition_spiders,
+)
+from dataPipelines.gc_scrapy.gc_scrapy.runspider_settings import fused_item_pipelines, general_settings
+
+
+def test_partition_spiders_drops_empty_partitions():
+    partitions = partition_spiders(["a", "b", "c"], 5)
+
+    assert partitions == [["a"], ["b"], ["c"]]
+
+
+def test_partition_spiders_round_robin():
+    partitions = partition_spiders(["a", "b", "c", "d", "e"], 2)
+
+    assert partitions == [["a", "c", "e"], ["b", "d"]]
+
+
+def test_merge_feed_shards(tmp_path: Path):
+    output = tmp_path / "crawler_output.json"
+    output.write_text('{"existing": 1}\n')
+
+    shards = [get_feed_shard_location(str(output), name) for name in ("worker0", "worker1", "missing")]
+    Path(shards[0]).write_text('{"a": 1}\n')
+    Path(shards[1]).write_text('{"b": 1}\n')
+
+    merge_feed_shards(shards, str(output))
+
+    assert output.read_text().splitlines() == ['{"existing": 1}', '{"a": 1}', '{"b": 1}']
+    assert not any(Path(shard).exists() for shard in shards)
+
+
+def test_fused_item_pipeline_overrides_spider_pipelines():
+    for fused, expected in ((False, general_settings["ITEM_PIPELINES"]), (True, fused_item_pipelines)):
+        settings = get_crawl_settings("crawler_output.json", fused)
+        # as Crawler applies a spider's custom_settings
+        settings.setdict({"ITEM_PIPELINES": general_settings["ITEM_PIPELINES"]}, priority="spider")
+        assert settings["FEED_URI"] == "crawler_output.json"
+        assert dict(settings["ITEM_PIPELINES"]) == expected
@@ -0,0 +1,47 @@
+import hashlib
+import os
+
+from dataPipelines.gc_scrapy.gc_scrapy.content_store import ContentStore
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return path
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_first_download_is_stored_and_repeats_become_hardlinks(tmp_path):
+    store = ContentStore(tmp_path / "store")
+    downloads = tmp_path / "downloads"
+    downloads.mkdir()
+    first = write(downloads / "a.pdf", b"same bytes")
+    second = write(downloads / "b.pdf", b"same bytes")
+    other = write(downloads / "c.pdf", b"other bytes")
+
+    assert not store.add(first, sha256(b"same bytes"))
+    assert store.add(second, sha256(b"same bytes"))
+    assert not store.add(other, sha256(b"other bytes"))
+    # the stored file itself isn't a duplicate of its content
+    assert not store.add(first, sha256(b"same bytes"))
+
+    stored = store.path_for(sha256(b"same bytes"))
+    assert sha256(b"same bytes") in store
+    assert os.path.samefile(first, stored) and os.path.samefile(second, stored)
+    assert second.read_bytes() == b"same bytes"
+    assert not os.path.samefile(other, stored)
+    assert (store.added, store.duplicates, store.duplicate_bytes) == (2, 1, 10)
+    assert not [p for p in downloads.iterdir() if p.name.startswith(".")]
+
+
+def test_stored_file_with_the_wrong_size_is_replaced(tmp_path):
+    store = ContentStore(tmp_path / "store")
+    digest = sha256(b"complete")
+    store.path_for(digest).parent.mkdir()
+    write(store.path_for(digest), b"compl")
+
+    download = write(tmp_path / "a.pdf", b"complete")
+    assert not store.add(download, digest)
+    assert os.path.samefile(download, store.path_for(digest))
@@ -0,0 +1,51 @@
+import base64
+import hashlib
+import json
+import os
+
+from dataPipelines.gc_scrapy.gc_scrapy.download_streams import (
+    Base64JsonFieldDecoder,
+    DownloadedFile,
+    StreamedDownload,
+)
+
+
+def chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_base64_json_field_decoder_across_chunks():
+    content = os.urandom(1000)
+    body = json.dumps({"id": 1, "content": base64.b64encode(content).decode()}).replace("/", "\\/").encode()
+
+    for size in (1, 7, 64, len(body)):
+        decoder = Base64JsonFieldDecoder()
+        decoded = b"".join(decoder.decode(chunk) for chunk in chunks(body, size)) + decoder.flush()
+        assert decoded == content
+
+
+def test_streamed_download_restarts_for_new_request(tmp_path):
+    stream = StreamedDownload(tmp_path)
+    redirect, final = object(), object()
+
+    stream.write(redirect, b"moved")
+    stream.write(final, b"abc")
+    stream.write(final, b"def")
+    path, size = stream.finish()
+
+    assert path.read_bytes() == b"abcdef"
+    assert size == 6
+    assert stream.sha256 == hashlib.sha256(b"abcdef").hexdigest()
+
+
+def test_downloaded_file_moves_then_copies(tmp_path):
+    stream = StreamedDownload(tmp_path)
+    stream.write(object(), b"pdf")
+    path, size = stream.finish()
+    downloaded = DownloadedFile(path, size, 200, {})
+
+    downloaded.move_to(tmp_path / "a.pdf")
+    downloaded.move_to(tmp_path / "b.pdf")
+
+    assert not path.exists()
+    assert (tmp_path / "a.pdf").read_bytes() == (tmp_path / "b.pdf").read_bytes() == b"pdf"
@@ -0,0 +1,73 @@
+import hashlib
+import json
+
+from dataPipelines.gc_scrapy.gc_scrapy.hash_index import (
+    BloomFilter,
+    HashIndex,
+    SortedDigests,
+    build_hash_index,
+    to_digest,
+)
+
+
+def sha(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def write_manifest(path, records):
+    with path.open(mode="w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_build_and_lookup_by_crawler(tmp_path):
+    manifest = tmp_path / "cumulative-manifest.json"
+    write_manifest(manifest, [
+        {"version_hash": sha("a1"), "crawler_used": "a"},
+        {"version_hash": sha("a2"), "crawler_used": "a"},
+        {"version_hash": sha("a1"), "crawler_used": "a"},
+        {"version_hash": sha("b1"), "crawler_used": "b"},
+        {"version_hash": "not-a-sha256"},
+    ])
+
+    counts = build_hash_index(manifest, tmp_path / "index", bloom=True)
+    assert counts == {"a": 2, "b": 1, "_unattributed": 1}
+
+    for use_bloom in (True, False):
+        a_hashes = HashIndex(tmp_path / "index", use_bloom).hashes_for("a")
+        assert sha("a1") in a_hashes and sha("a2") in a_hashes
+        assert "not-a-sha256" in a_hashes
+        assert sha("b1") not in a_hashes and sha("new") not in a_hashes
+        assert len(a_hashes) == 3
+
+    assert len(HashIndex(tmp_path / "index").hashes_for("never_crawled")) == 1
+
+
+def test_rebuild_removes_crawlers_no_longer_in_manifest(tmp_path):
+    manifest = tmp_path / "cumulative-manifest.json"
+    write_manifest(manifest, [{"version_hash": sha("a1"), "crawler_used": "a"}])
+    build_hash_index(manifest, tmp_path / "index")
+    write_manifest(manifest, [{"version_hash": sha("b1"), "crawler_used": "b"}])
+    build_hash_index(manifest, tmp_path / "index", bloom=False)
+
+    assert sorted(p.name for p in (tmp_path / "index").iterdir()) == ["b.hashes", "index.json"]
+
+
+def test_sorted_digests_binary_search(tmp_path):
+    digests = sorted(to_digest(sha(str(i))) for i in range(1000))
+    SortedDigests.write(tmp_path / "x.hashes", digests)
+    shard = SortedDigests(tmp_path / "x.hashes")
+
+    assert len(shard) == 1000
+    assert all(digest in shard for digest in digests)
+    assert to_digest(sha("missing")) not in shard
+
+
+def test_bloom_filter_has_no_false_negatives(tmp_path):
+    digests = [to_digest(sha(str(i))) for i in range(5000)]
+    BloomFilter.build(digests).write(tmp_path / "x.bloom")
+    bloom = BloomFilter.open(tmp_path / "x.bloom")
+
+    assert all(digest in bloom for digest in digests)
+    false_positives = sum(to_digest(sha(f"other{i}")) in bloom for i in range(5000))
+    assert false_positives < 250
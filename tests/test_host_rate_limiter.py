@@ -0,0 +1,37 @@
+import multiprocessing
+
+import pytest
+
+from dataPipelines.gc_scrapy.gc_scrapy.middleware_utils.host_rate_limiter import (
+    FileRateLimitBackend,
+    MemoryRateLimitBackend,
+    get_host_limit,
+)
+
+LIMITS = {"mynavyhr.navy.mil": 2, "govinfo.gov": 5}
+
+
+def test_get_host_limit_matches_parent_domain():
+    assert get_host_limit("www.mynavyhr.navy.mil", LIMITS) == ("mynavyhr.navy.mil", 2)
+    assert get_host_limit("govinfo.gov", LIMITS) == ("govinfo.gov", 5)
+    assert get_host_limit("www.jcs.mil", LIMITS) == (None, 0)
+
+
+def test_memory_backend_spaces_reservations():
+    backend = MemoryRateLimitBackend()
+    backend.next_send_times.clear()
+
+    assert [backend.reserve("govinfo.gov", 0.2, 100.0) for _ in range(3)] == pytest.approx([0, 0.2, 0.4])
+
+
+def reserve_many(directory, count):
+    backend = FileRateLimitBackend(directory)
+    return [backend.reserve("mynavyhr.navy.mil", 1.0, 1000.0) for _ in range(count)]
+
+
+def test_file_backend_shares_budget_across_processes(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes=2) as pool:
+        delays = pool.starmap(reserve_many, [(str(tmp_path), 5), (str(tmp_path), 5)])
+
+    assert sorted(delay for worker_delays in delays for delay in worker_delays) == [float(i) for i in range(10)]
@@ -0,0 +1,102 @@
+import copy
+
+import pytest
+from scrapy.exceptions import DropItem
+
+from dataPipelines.gc_scrapy.gc_scrapy.items import DocItem
+from dataPipelines.gc_scrapy.gc_scrapy.pipelines import (
+    AdditionalFieldsPipeline, DeduplicaterPipeline, FileNameFixerPipeline, FusedItemPipeline, ValidateJsonPipeline
+)
+
+
+class ExampleSpider:
+    name = "example_spider"
+    start_urls = ["https://example.local/pubs"]
+    display_org = "Example Org"
+    data_source = "Example Source"
+    source_title = "Example Title"
+    display_source = "Example Display Source"
+
+
+def make_item(doc_name, **fields):
+    item = DocItem(
+        doc_name=doc_name,
+        doc_title="Title",
+        doc_num="1",
+        doc_type="EX",
+        display_doc_type="Document",
+        display_title=f"EX {doc_name}",
+        file_ext="pdf",
+        is_revoked=False,
+        download_url="https://example.local/pubs/1.pdf",
+        downloadable_items=[
+            {"doc_type": "pdf", "download_url": "https://example.local/pubs/1.pdf", "compression_type": None}
+        ],
+        version_hash_raw_data={"item_currency": "1.pdf"},
+        version_hash=f"hash of {doc_name}",
+    )
+    item.update(fields)
+    return item
+
+
+ITEMS = [
+    make_item("EX 1"),
+    make_item("EX/2"),
+    make_item("EX 1"),
+    make_item(""),
+    make_item("EX 3", doc_num=""),
+    make_item("EX 4", downloadable_items=[]),
+    make_item("EX 4"),
+    make_item("EX 5", access_timestamp="2021-05-13 16:55:48"),
+    make_item("EX 6", cac_login_required=True, publication_date="2021-05-13"),
+]
+
+
+def run(pipelines, items):
+    spider = ExampleSpider()
+    results = []
+    for item in copy.deepcopy(items):
+        try:
+            for pipeline in pipelines:
+                item = pipeline.process_item(item, spider)
+            results.append(dict(item))
+        except DropItem as e:
+            results.append(str(e))
+    return results
+
+
+def test_fused_pipeline_matches_staged_pipelines():
+    staged = [FileNameFixerPipeline(), DeduplicaterPipeline(), AdditionalFieldsPipeline(), ValidateJsonPipeline()]
+    fused = [FusedItemPipeline()]
+
+    staged_results = run(staged, ITEMS)
+    fused_results = run(fused, ITEMS)
+
+    for staged_result, fused_result in zip(staged_results, fused_results):
+        if isinstance(staged_result, dict):
+            # set when the item passes through AdditionalFieldsPipeline
+            staged_result.pop("access_timestamp")
+            fused_result.pop("access_timestamp")
+        assert staged_result == fused_result
+
+    # the rest of a validation message depends on the jsonschema version
+    drops = [r.split(":")[0] for r in fused_results if isinstance(r, str)]
+    assert drops == [
+        "Duplicate doc_name found",
+        "No doc_name",
+        "Dropped Item",
+        "Dropped Item",
+        # a name stays seen after its item fails validation
+        "Duplicate doc_name found",
+        "Dropped Item",
+    ]
+
+
+def test_fused_pipeline_keeps_the_fixed_name():
+    item = FusedItemPipeline().process_item(make_item("EX/2"), ExampleSpider())
+    assert item["doc_name"] == "EX_2"
+    assert item["crawler_used"] == "example_spider"
+    assert item["source_fqdn"] == "example.local"
+
+    with pytest.raises(DropItem, match="No doc_name"):
+        FusedItemPipeline().process_item(make_item(None), ExampleSpider())
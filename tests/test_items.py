@@ -0,0 +1,85 @@
+import copy
+import io
+import json
+import pickle
+from pathlib import Path
+
+import pytest
+from itemadapter import ItemAdapter
+from scrapy.exporters import JsonLinesItemExporter
+
+from dataPipelines.gc_scrapy.gc_scrapy.items import CompactDocItem, DocItem
+from dataPipelines.gc_scrapy.gc_scrapy.pipelines import FileDownloadPipeline
+from dataPipelines.gc_scrapy.gc_scrapy.spider_middlewares import CompactItemMiddleware
+from dataPipelines.gc_scrapy.gc_scrapy.validators import DefaultOutputSchemaValidator
+
+from .test_validators import VALID_ITEM
+
+
+def test_compact_item_behaves_like_doc_item():
+    doc_item = DocItem(doc_name="EX 1", version_hash_raw_data={"item_currency": "1.pdf"})
+    item = CompactDocItem(doc_item)
+
+    assert not hasattr(item, "__dict__")
+    assert item["doc_name"] == "EX 1"
+    assert "doc_title" not in item and item.get("doc_title") is None
+    with pytest.raises(KeyError):
+        item["doc_title"]
+    with pytest.raises(KeyError):
+        item["not_a_field"] = 1
+    with pytest.raises(KeyError):
+        del item["doc_title"]
+
+    item["doc_title"] = "Title"
+    assert list(item) == ["doc_name", "doc_title", "version_hash_raw_data"]
+    assert len(item) == 3
+    del item["doc_title"]
+    assert dict(item) == dict(doc_item)
+    assert ItemAdapter(item).asdict() == ItemAdapter(doc_item).asdict()
+    assert dict(copy.deepcopy(item)) == dict(pickle.loads(pickle.dumps(item))) == dict(item)
+
+
+def test_compact_item_exports_and_validates_like_doc_item():
+    def export(item):
+        f = io.BytesIO()
+        JsonLinesItemExporter(f).export_item(item)
+        return json.loads(f.getvalue())
+
+    assert export(CompactDocItem(VALID_ITEM)) == export(DocItem(VALID_ITEM)) == VALID_ITEM
+    DefaultOutputSchemaValidator().validate_dict(ItemAdapter(CompactDocItem(VALID_ITEM)).asdict())
+
+
+def test_copies_share_nested_values_until_replaced():
+    item = CompactDocItem(VALID_ITEM)
+    item_copy = item.copy()
+    assert item_copy["downloadable_items"] is item["downloadable_items"]
+
+    item_copy["doc_name"] = "EX 2"
+    assert item["doc_name"] == VALID_ITEM["doc_name"]
+
+
+@pytest.mark.parametrize("item_type", [DocItem, CompactDocItem, dict])
+def test_nested_zip_items_leave_the_zipped_item_unchanged(item_type):
+    item = item_type(copy.deepcopy(VALID_ITEM))
+    before = copy.deepcopy(dict(item))
+
+    sub_items = list(FileDownloadPipeline.create_items_from_nested_zip(
+        [Path("EX 1 - First.pdf"), Path("EX 2 - Second.pdf")], item))
+
+    assert dict(item) == before
+    assert [(i["doc_name"], i["doc_title"]) for i in sub_items] == [("EX 1 - First", "First"), ("EX 2 - Second", "Second")]
+    for sub_item in sub_items:
+        assert type(sub_item) is item_type
+        raw_data = sub_item["version_hash_raw_data"]
+        assert raw_data["doc_name"] == sub_item["doc_name"]
+        assert raw_data["item_currency"] == VALID_ITEM["version_hash_raw_data"]["item_currency"]
+        assert len(raw_data["sub_file_version_hash"]) == 64
+    assert sub_items[0]["version_hash_raw_data"] is not sub_items[1]["version_hash_raw_data"]
+
+
+def test_middleware_converts_doc_items_only():
+    request = object()
+    outputs = list(CompactItemMiddleware().process_spider_output(None, [DocItem(doc_name="EX 1"), request], None))
+
+    assert type(outputs[0]) is CompactDocItem and outputs[0]["doc_name"] == "EX 1"
+    assert outputs[1] is request
@@ -0,0 +1,173 @@
+import scrapy
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from dataPipelines.gc_scrapy.gc_scrapy.GCSpider import GCSpider
+from dataPipelines.gc_scrapy.gc_scrapy.items import DocItem
+from dataPipelines.gc_scrapy.gc_scrapy.listing_cache import ListingCache, normalize_listing_body
+from dataPipelines.gc_scrapy.gc_scrapy.spider_middlewares import ListingCacheMiddleware
+
+PAGE_1 = "https://example.mil/pubs?Page=1"
+PAGE_2 = "https://example.mil/pubs?Page=2"
+DETAIL = "https://example.mil/pubs/doc-1"
+LISTING = """<html><head><script>var token = "{token}";</script></head><body>
+<input type="hidden" name="__VIEWSTATE" value="{token}"/>
+<a class="doc" href="/pubs/doc-1">DOC 1</a></body></html>"""
+
+
+class ListingSpider(GCSpider):
+    name = "listing_spider"
+
+    def parse(self, response):
+        if self.listing_unchanged(response):
+            yield from self.previous_listing_output(response)
+            return
+        for href in response.css("a.doc::attr(href)").getall():
+            yield response.follow(href, callback=self.parse_detail_page)
+        if response.url == PAGE_1:
+            yield scrapy.Request(PAGE_2, callback=self.parse)
+
+    def parse_detail_page(self, response):
+        yield DocItem(doc_name="DOC 1", download_url=f"{response.url}.pdf", version_hash="v1")
+
+
+class RowSpider(ListingSpider):
+    name = "row_spider"
+
+    def parse(self, response):
+        for row in response.css("a.doc"):
+            request = response.follow(row.attrib["href"], callback=self.parse_detail_page)
+            yield from self.follow_detail_page(request, self.listing_key(row.attrib["href"], row.css("::text").get()))
+
+    def parse_detail_page(self, response):
+        yield from super().parse_detail_page(response)
+        yield scrapy.Request(f"{response.url}/testimony", callback=self.parse_testimony)
+
+    def parse_testimony(self, response):
+        yield DocItem(doc_name="DOC 1 Testimony", version_hash="v2")
+
+
+def start_run(tmp_path, spider_class=ListingSpider):
+    spider = spider_class(listing_cache_location=str(tmp_path / "listings.sqlite"))
+    crawler = get_crawler(spider_class)
+    middleware = ListingCacheMiddleware.from_crawler(crawler)
+    middleware.spider_opened(spider)
+    return spider, middleware, crawler.stats
+
+
+def respond(middleware, spider, request, body="", status=200, headers=None):
+    response = HtmlResponse(request.url, status=status, body=body, headers=headers, encoding="utf-8",
+                            request=request)
+    callback = request.callback or spider.parse
+    return list(middleware.process_spider_output(response, callback(response), spider))
+
+
+def crawl_first_run(tmp_path):
+    spider, middleware, _ = start_run(tmp_path)
+    (page_1,) = middleware.process_start_requests([scrapy.Request(PAGE_1)], spider)
+    detail, page_2 = respond(middleware, spider, page_1, LISTING.format(token="a"), headers={"ETag": '"p1"'})
+    (item,) = respond(middleware, spider, detail)
+    assert respond(middleware, spider, page_2, "<html><body></body></html>") == []
+    middleware.spider_closed(spider)
+    return item
+
+
+def test_listing_pages_are_cached_with_what_they_led_to(tmp_path):
+    item = crawl_first_run(tmp_path)
+
+    with ListingCache(tmp_path / "listings.sqlite") as cache:
+        pages = cache.pages(ListingSpider.name)
+    assert set(pages) == {PAGE_1, PAGE_2}
+    assert pages[PAGE_1].etag == '"p1"'
+    assert pages[PAGE_1].items == [dict(item)]
+    assert pages[PAGE_1].listing_requests == [(PAGE_2, "parse")]
+    assert pages[PAGE_2].items == [] and pages[PAGE_2].listing_requests == []
+
+
+def test_unchanged_listing_pages_reuse_last_runs_output(tmp_path):
+    item = crawl_first_run(tmp_path)
+
+    spider, middleware, stats = start_run(tmp_path)
+    (page_1,) = middleware.process_start_requests([scrapy.Request(PAGE_1)], spider)
+    assert page_1.headers["If-None-Match"] == b'"p1"'
+    assert 304 in page_1.meta["handle_httpstatus_list"]
+
+    reused_item, page_2 = respond(middleware, spider, page_1, status=304)
+    assert dict(reused_item) == dict(item)
+    assert page_2.url == PAGE_2 and page_2.callback == spider.parse
+    # no validators, the body is compared instead
+    assert respond(middleware, spider, page_2, "<html><body></body></html>") == []
+    middleware.spider_closed(spider)
+
+    assert stats.get_value("listing_cache/not_modified") == 1
+    assert stats.get_value("listing_cache/unchanged_pages") == 2
+    assert stats.get_value("listing_cache/reused_items") == 1
+    with ListingCache(tmp_path / "listings.sqlite") as cache:
+        assert cache.pages(ListingSpider.name)[PAGE_1].items == [dict(item)]
+
+
+def test_changed_and_incomplete_listing_pages(tmp_path):
+    crawl_first_run(tmp_path)
+
+    spider, middleware, stats = start_run(tmp_path)
+    # only the hidden view state and script changed
+    _, page_2 = respond(middleware, spider, scrapy.Request(PAGE_1), LISTING.format(token="b"))
+    assert page_2.meta["listing_url"] == PAGE_1
+
+    changed = LISTING.format(token="b").replace("DOC 1", "DOC 1 (revised)")
+    outputs = respond(middleware, spider, page_2, changed)
+    # the detail page it links to is never parsed, so it's left out of the cache
+    assert [o.url for o in outputs] == [DETAIL]
+    middleware.spider_closed(spider)
+
+    assert stats.get_value("listing_cache/unchanged_pages") == 1
+    assert stats.get_value("listing_cache/incomplete_pages") == 1
+    with ListingCache(tmp_path / "listings.sqlite") as cache:
+        assert set(cache.pages(ListingSpider.name)) == {PAGE_1}
+
+
+def test_normalize_listing_body():
+    assert normalize_listing_body(LISTING.format(token="a")) == normalize_listing_body(LISTING.format(token="b"))
+    assert normalize_listing_body("<p>a\n\n  b</p><!-- rendered 12:00 -->") == "<p>a b</p>"
+
+
+def crawl_rows(tmp_path, previous_hashes, body=LISTING.format(token="a")):
+    spider, middleware, stats = start_run(tmp_path, RowSpider)
+    spider.previous_hashes = previous_hashes
+    outputs = respond(middleware, spider, scrapy.Request(PAGE_1), body)
+    if isinstance(outputs[0], scrapy.Request):
+        (item, testimony) = respond(middleware, spider, outputs[0])
+        outputs = [item, *respond(middleware, spider, testimony)]
+    middleware.spider_closed(spider)
+    return outputs, spider, stats
+
+
+def test_unchanged_listing_rows_skip_their_detail_pages(tmp_path):
+    first, _, _ = crawl_rows(tmp_path, set())
+    assert [item["doc_name"] for item in first] == ["DOC 1", "DOC 1 Testimony"]
+
+    # last run's items are only reused once they're in the previous manifest
+    outputs, spider, stats = crawl_rows(tmp_path, {"v1"})
+    assert [dict(item) for item in outputs] == [dict(item) for item in first]
+    assert stats.get_value("listing_cache/skipped_detail_requests") is None
+
+    outputs, spider, stats = crawl_rows(tmp_path, {"v1", "v2"})
+    assert [type(o) for o in outputs] == [DocItem, DocItem]
+    assert [dict(item) for item in outputs] == [dict(item) for item in first]
+    assert stats.get_value("listing_cache/skipped_detail_requests") == 1
+    assert spider.stats[spider.name]["Skipped Detail Requests"] == 1
+
+    changed = LISTING.format(token="a").replace("DOC 1", "DOC 1 (revised)")
+    outputs, _, stats = crawl_rows(tmp_path, {"v1", "v2"}, changed)
+    assert len(outputs) == 2 and stats.get_value("listing_cache/skipped_detail_requests") is None
+
+
+def test_detail_items_are_only_kept_once_every_request_was_parsed(tmp_path):
+    spider, middleware, _ = start_run(tmp_path, RowSpider)
+    (detail,) = respond(middleware, spider, scrapy.Request(PAGE_1), LISTING.format(token="a"))
+    respond(middleware, spider, detail)
+    # the testimony request failed
+    middleware.spider_closed(spider)
+
+    with ListingCache(tmp_path / "listings.sqlite") as cache:
+        assert cache.detail_items(RowSpider.name, detail.meta["listing_key"]) is None
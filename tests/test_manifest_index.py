@@ -0,0 +1,47 @@
+import json
+import os
+
+from dataPipelines.gc_scrapy.gc_scrapy import manifest_index
+from dataPipelines.gc_scrapy.gc_scrapy.manifest_index import ManifestIndex, get_manifest_index
+
+
+def manifest_lines(records):
+    return [json.dumps(record) + "\n" for record in records]
+
+
+def test_index_partitions_by_crawler():
+    index = ManifestIndex.from_lines(manifest_lines([
+        {"version_hash": "a1", "crawler_used": "a"},
+        {"version_hash": "b1", "crawler_used": "b"},
+        {"version_hash": "old", "doc_name": "no crawler_used"},
+        {"version_hash": "a1", "crawler_used": "a"},
+    ]) + ["\n"])
+
+    a_hashes = index.hashes_for("a")
+    assert "a1" in a_hashes and "old" in a_hashes
+    assert "b1" not in a_hashes
+    assert len(a_hashes) == 2
+    assert "old" in index.hashes_for("never_crawled")
+    assert index.line_count == 5
+    assert index.hash_count() == 3
+    assert index.memory_bytes() > 0
+
+
+def test_manifest_is_read_once_until_it_changes(tmp_path, monkeypatch):
+    location = tmp_path / "previous-manifest.json"
+    location.write_text("".join(manifest_lines([{"version_hash": "a1", "crawler_used": "a"}])))
+
+    reads = []
+    from_file = ManifestIndex.from_file
+    monkeypatch.setattr(ManifestIndex, "from_file", classmethod(lambda cls, path: reads.append(path) or from_file(path)))
+    monkeypatch.setattr(manifest_index, "_loaded_indexes", {})
+
+    assert get_manifest_index(location) is get_manifest_index(location)
+    assert len(reads) == 1
+
+    with location.open(mode="a") as f:
+        f.writelines(manifest_lines([{"version_hash": "a2", "crawler_used": "a"}]))
+    os.utime(location, ns=(0, 0))
+
+    assert "a2" in get_manifest_index(location).hashes_for("a")
+    assert len(reads) == 2
@@ -0,0 +1,42 @@
+import json
+
+from dataPipelines.gc_scrapy.gc_scrapy.manifest_shards import (
+    load_shard_hashes,
+    read_shard_index,
+    shard_file_name,
+    shard_manifests,
+)
+
+
+def write_manifest(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+
+def test_shard_manifests_appends_per_crawler(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    write_manifest(manifest, [
+        {"version_hash": "a1", "crawler_used": "a"},
+        {"version_hash": "b1", "crawler_used": "b"},
+        {"version_hash": "old"},
+    ])
+    shard_dir = tmp_path / "shards"
+
+    assert shard_manifests([manifest], shard_dir) == {"a": 1, "b": 1, "_unattributed": 1}
+    write_manifest(manifest, [{"version_hash": "a2", "crawler_used": "a"}])
+    shard_manifests([manifest], shard_dir)
+
+    assert sorted(p.name for p in shard_dir.iterdir()) == ["_unattributed.json", "a.json", "b.json", "index.json"]
+    assert len((shard_dir / "a.json").read_text().splitlines()) == 2
+    index = read_shard_index(shard_dir)
+    assert index["a"]["records"] == 2 and index["a"]["file"] == "a.json"
+
+    a_hashes = load_shard_hashes(shard_dir, "a")
+    assert "a1" in a_hashes and "a2" in a_hashes and "old" in a_hashes
+    assert "b1" not in a_hashes
+    assert len(load_shard_hashes(shard_dir, "new_spider")) == 1
+
+
+def test_shard_file_name_is_a_plain_file_name():
+    assert shard_file_name("us_code") == "us_code.json"
+    assert shard_file_name("") == "_unattributed.json"
+    assert "/" not in shard_file_name("../etc/x")
@@ -0,0 +1,47 @@
+import gzip
+import json
+
+from dataPipelines.gc_scrapy.manifest_store import ManifestStore
+
+
+def record(crawler, doc, version, timestamp):
+    return {"version_hash": version, "doc_name": doc, "crawler_used": crawler, "access_timestamp": timestamp}
+
+
+def test_import_dedupes_and_exports_jsonl(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    lines = [
+        record("a", "doc 1", "v1", "2022-01-01 00:00:00"),
+        record("a", "doc 1", "v1", "2022-01-02 00:00:00"),
+        {"version_hash": "old", "doc_name": "doc 2", "access_timestamp": "2021-01-01 00:00:00", "path": "x.pdf"},
+    ]
+    manifest.write_text("".join(json.dumps(line) + "\n" for line in lines) + "\n")
+
+    with ManifestStore(tmp_path / "manifest.sqlite") as store:
+        assert store.import_jsonl(manifest) == 2
+        assert store.import_jsonl(manifest) == 0
+
+        assert store.export_jsonl(tmp_path / "cumulative-manifest.json") == 2
+        assert store.export_jsonl(tmp_path / "cumulative-manifest.json.gz") == 2
+        assert store.export_jsonl(tmp_path / "a.json", crawler_used="a") == 1
+        assert store.export_jsonl(tmp_path / "recent.json", since="2022-01-01") == 1
+
+    exported = (tmp_path / "cumulative-manifest.json").read_text()
+    assert [json.loads(line) for line in exported.splitlines()] == [lines[2], lines[0]]
+    with gzip.open(tmp_path / "cumulative-manifest.json.gz", mode="rt") as f:
+        assert f.read() == exported
+
+
+def test_compact_keeps_latest_versions(tmp_path):
+    with ManifestStore(tmp_path / "manifest.sqlite") as store:
+        store.add_records([
+            record("a", "doc 1", "v1", "2022-01-01"),
+            record("a", "doc 1", "v2", "2022-01-02"),
+            record("a", "doc 1", "v3", "2022-01-03"),
+            record("b", "doc 1", "v1", "2022-01-01"),
+        ])
+
+        assert store.compact(keep_versions=2) == 1
+        assert sorted((r["crawler_used"], r["version_hash"]) for r in store.iter_records()) == [
+            ("a", "v2"), ("a", "v3"), ("b", "v1")
+        ]
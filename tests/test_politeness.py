@@ -0,0 +1,40 @@
+import pytest
+
+from dataPipelines.gc_scrapy.gc_scrapy.middleware_utils.politeness import (
+    FixedDelay,
+    RandomDelay,
+    TokenBucketDelay,
+    make_delay_policy,
+)
+
+
+def test_fixed_delay_queues_requests():
+    policy = FixedDelay(2)
+
+    assert [policy.next_delay(10) for _ in range(3)] == [0, 2, 4]
+    assert policy.next_delay(20) == 0
+
+
+def test_random_delay_picks_from_choices():
+    policy = RandomDelay([1])
+
+    assert [policy.next_delay(0) for _ in range(3)] == [0, 1, 2]
+
+
+def test_token_bucket_allows_burst_then_rate():
+    policy = TokenBucketDelay(rate=2, burst=2)
+
+    assert [policy.next_delay(0) for _ in range(4)] == [0, 0, 0.5, 1.0]
+    assert policy.next_delay(5) == 0
+
+
+@pytest.mark.parametrize("spec, policy_type", [
+    (True, RandomDelay),
+    (range(1, 3), RandomDelay),
+    (1.5, FixedDelay),
+    ({"rate": 1, "burst": 3}, TokenBucketDelay),
+    (False, type(None)),
+    (None, type(None)),
+])
+def test_make_delay_policy(spec, policy_type):
+    assert isinstance(make_delay_policy(spec), policy_type)
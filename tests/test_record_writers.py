@@ -0,0 +1,69 @@
+import json
+import threading
+
+from dataPipelines.gc_scrapy.gc_scrapy.record_writers import BufferedJsonLinesWriter, FlushPolicy
+
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_writer_flushes_on_record_count_and_close(tmp_path):
+    path = tmp_path / "manifest.json"
+    writer = BufferedJsonLinesWriter(path, FlushPolicy(max_records=3, max_seconds=60))
+
+    writer.write({"n": 0})
+    assert not path.exists()
+
+    writer.write({"n": 1})
+    writer.write({"n": 2})
+    writer.write({"n": 3})
+    assert [r["n"] for r in read_records(path)] == [0, 1, 2]
+
+    writer.close()
+    assert [r["n"] for r in read_records(path)] == [0, 1, 2, 3]
+    assert writer.flush_count == 2
+
+
+def test_writer_flushes_on_age():
+    now = [0.0]
+    writer = BufferedJsonLinesWriter("unused", FlushPolicy(max_records=100, max_seconds=5), clock=lambda: now[0])
+    writer._flush = lambda: writer.buffer.clear()
+
+    writer.write({"n": 0})
+    now[0] = 4.0
+    writer.write({"n": 1})
+    assert len(writer.buffer) == 2
+
+    now[0] = 5.0
+    writer.write({"n": 2})
+    assert not writer.buffer
+
+
+def test_writers_sharing_a_file_from_threads(tmp_path):
+    path = tmp_path / "dead_queue.json"
+    writers = [BufferedJsonLinesWriter(path, FlushPolicy(max_records=7)) for _ in range(2)]
+
+    def write(writer, thread):
+        for n in range(200):
+            writer.write({"thread": thread, "n": n})
+
+    threads = [threading.Thread(target=write, args=(writers[i % 2], i)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for writer in writers:
+        writer.close()
+
+    records = read_records(path)
+    assert len(records) == 800
+    for thread in range(4):
+        assert sorted(r["n"] for r in records if r["thread"] == thread) == list(range(200))
+
+
+def test_close_without_records_creates_no_file(tmp_path):
+    writer = BufferedJsonLinesWriter(tmp_path / "dead_queue.json")
+    writer.close()
+    assert not (tmp_path / "dead_queue.json").exists()
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+from dataPipelines.gc_scrapy.run_state import CrawlRunState
+
+
+def test_run_state_resumes_same_spiders(tmp_path):
+    run_state = CrawlRunState(tmp_path)
+    run_state.start_run(["a", "b"])
+    run_state.spider_closed(SimpleNamespace(name="a"), "finished")
+    run_state.spider_closed(SimpleNamespace(name="b"), "shutdown")
+
+    resumed = CrawlRunState(tmp_path)
+    resumed.start_run(["b", "a"])
+
+    assert resumed.is_completed("a")
+    assert not resumed.is_completed("b")
+
+
+def test_run_state_starts_over_for_other_spiders(tmp_path):
+    run_state = CrawlRunState(tmp_path)
+    run_state.start_run(["a", "b"])
+    run_state.mark_completed("a")
+
+    run_state.start_run(["a"])
+
+    assert not run_state.is_completed("a")
+
+
+def test_run_state_finish_run_clears_state(tmp_path):
+    run_state = CrawlRunState(tmp_path)
+    run_state.start_run(["a"])
+    run_state.mark_completed("a")
+
+    run_state.finish_run()
+    run_state.start_run(["a"])
+
+    assert not run_state.is_completed("a")
+
+
+def test_run_state_is_kept_until_every_spider_finished(tmp_path):
+    run_state = CrawlRunState(tmp_path)
+    run_state.start_run(["a", "b"])
+    run_state.spider_closed(SimpleNamespace(name="a"), "finished")
+    # b crashed, was killed or closed for another reason
+    (tmp_path / "jobs" / "b").mkdir()
+
+    assert not run_state.finish_run()
+
+    resumed = CrawlRunState(tmp_path)
+    resumed.start_run(["a", "b"])
+    assert resumed.is_completed("a")
+    assert (tmp_path / "jobs" / "b").is_dir()
+
+    resumed.spider_closed(SimpleNamespace(name="b"), "finished")
+    assert resumed.finish_run()
+    assert not (tmp_path / "jobs" / "b").exists()
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+from dataPipelines.gc_scrapy.runtime_history import RuntimeHistory, DEFAULT_ELAPSED_SECONDS, MAX_RUNS_KEPT
+from dataPipelines.gc_scrapy.scheduling import order_longest_first, pack_longest_first, predict_wall_time
+from dataPipelines.gc_scrapy.schedule_balancer import (
+    SCHEDULE_DAYS,
+    balance_day_schedules,
+    get_spider_domains,
+    read_day_schedules,
+    write_day_schedules,
+)
+
+DURATIONS = {"a": 7, "b": 5, "c": 4, "d": 3, "e": 1}
+
+
+def test_order_longest_first():
+    assert order_longest_first(["e", "c", "a", "d", "b"], DURATIONS.get) == ["a", "b", "c", "d", "e"]
+
+
+def test_pack_longest_first_balances_bins():
+    bins = pack_longest_first(list(DURATIONS), 2, DURATIONS.get)
+
+    assert bins == [["a", "d"], ["b", "c", "e"]]
+    assert [sum(DURATIONS[j] for j in b) for b in bins] == [10, 10]
+
+
+def test_predict_wall_time():
+    assert predict_wall_time([7, 5, 4, 3, 1]) == 20
+    assert predict_wall_time([7, 5, 4, 3, 1], slots=2) == 10
+    assert predict_wall_time([], slots=3) == 0
+
+
+def test_runtime_history_round_trip(tmp_path: Path):
+    location = tmp_path / "history.json"
+    history = RuntimeHistory(location)
+    assert history.predict_elapsed("unknown") == DEFAULT_ELAPSED_SECONDS
+
+    for elapsed in range(MAX_RUNS_KEPT + 2):
+        history.record_stats({
+            "long": {"Elapsed Time (sec)": 100.0 + elapsed, "Item Scraped Count": 10, "Bytes Downloaded": 2048},
+            "short": {"Elapsed Time (sec)": 10.0},
+            "failed": {"Close Reason": "shutdown"},
+        })
+    history.save()
+
+    reloaded = RuntimeHistory(location)
+    assert len(reloaded.runs["long"]) == MAX_RUNS_KEPT
+    assert "failed" not in reloaded.runs
+    assert reloaded.runs["long"][-1]["bytes_downloaded"] == 2048
+    assert reloaded.predict_elapsed("short") == 10.0
+    # no history, median of the known spiders
+    assert reloaded.predict_elapsed("new") == (reloaded.predict_elapsed("long") + 10.0) / 2
+
+
+def test_pack_longest_first_separates_groups():
+    domains = {"a": ["x.mil"], "b": ["y.mil"], "c": ["x.mil"], "d": ["z.mil"], "e": ["y.mil"]}
+    bins = pack_longest_first(list(DURATIONS), 2, DURATIONS.get, domains.get)
+
+    for b in bins:
+        bin_domains = [d for job in b for d in domains[job]]
+        assert len(bin_domains) == len(set(bin_domains))
+
+
+def test_pack_longest_first_groups_fall_back_to_least_loaded():
+    bins = pack_longest_first(["a", "b", "c"], 2, DURATIONS.get, lambda job: ["same.mil"])
+
+    assert bins == [["a"], ["b", "c"]]
+
+
+def test_normalize_spider_domains():
+    domains = get_spider_domains(
+        ["marines.mil/", "www.mynavyhr.navy.mil"],
+        ["https://www.marines.mil/News/Messages/MARADMINS/", "https://MYNAVYHR.navy.mil/References"],
+    )
+
+    assert domains == ["marines.mil", "mynavyhr.navy.mil"]
+
+
+def test_balance_day_schedules_keeps_every_entry(tmp_path: Path):
+    entries = [f"spider_{i}.py" for i in range(20)]
+    schedules = balance_day_schedules(entries, lambda e: float(len(e)), lambda e: [])
+    write_day_schedules(schedules, tmp_path)
+
+    assert list(schedules) == list(SCHEDULE_DAYS)
+    written = [entry for day_entries in read_day_schedules(tmp_path).values() for entry in day_entries]
+    assert sorted(written) == sorted(entries)
@@ -0,0 +1,51 @@
+import json
+from textwrap import dedent
+
+from dataPipelines.gc_scrapy.gc_scrapy import SPIDER_REGISTRY_PATH
+from dataPipelines.gc_scrapy.spider_registry import (
+    SpiderRegistry,
+    build_spider_registry,
+    import_spider,
+    inspect_spider_source,
+)
+
+
+def test_registry_file_is_up_to_date():
+    with open(SPIDER_REGISTRY_PATH) as f:
+        assert json.load(f) == build_spider_registry(), "run `python -m dataPipelines.gc_scrapy build-registry`"
+
+
+def test_inspect_spider_source():
+    source = dedent("""
+        from dataPipelines.gc_scrapy.gc_scrapy.GCSeleniumSpider import GCSeleniumSpider
+
+        BASE = "https://www.example.mil"
+
+        class Helper:
+            pass
+
+        class ExampleSpider(GCSeleniumSpider):
+            name = "example"
+            base_url = BASE + "/pubs"
+            allowed_domains = ["example.mil"]
+            start_urls = [base_url, f"{BASE}/other"]
+            custom_settings = {"DOWNLOAD_DELAY": 2, **{"LOG_LEVEL": "INFO"}}
+            pages = list(range(3))
+    """)
+
+    entry = inspect_spider_source(source, "example_spider")
+
+    assert entry["module"] == "dataPipelines.gc_scrapy.gc_scrapy.spiders.example_spider"
+    assert entry["class_name"] == "ExampleSpider"
+    assert entry["name"] == "example"
+    assert entry["selenium"] is True
+    assert entry["start_urls"] == ["https://www.example.mil/pubs", "https://www.example.mil/other"]
+    assert entry["custom_settings"] == {"DOWNLOAD_DELAY": 2, "LOG_LEVEL": "INFO"}
+
+
+def test_registry_entry_imports_spider():
+    entry = SpiderRegistry().get("us_code_spider.py")
+    spider = import_spider(entry)
+
+    assert spider.name == entry["name"] == "us_code"
+    assert spider.custom_settings == entry["custom_settings"]
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import sqlite3
+
+import pytest
+from scrapy.http import Response
+from scrapy.utils.test import get_crawler
+
+from dataPipelines.gc_scrapy.gc_scrapy.GCSpider import GCSpider
+from dataPipelines.gc_scrapy.gc_scrapy.pipelines import FileDownloadPipeline
+from dataPipelines.gc_scrapy.gc_scrapy.validator_cache import CachedDownload, ValidatorCache
+
+from .test_validators import VALID_ITEM
+
+URL = VALID_ITEM["downloadable_items"][0]["download_url"]
+BODY = b"%PDF-1.7 unchanged"
+
+
+FILE_NAME = f"{VALID_ITEM['doc_name']}.pdf"
+
+
+def cached(body=BODY, etag='"v1"', last_modified="Thu, 13 May 2021 16:55:48 GMT", file_name=FILE_NAME):
+    return CachedDownload(URL, etag, last_modified, len(body), hashlib.sha256(body).hexdigest(), file_name)
+
+
+def test_cache_keeps_the_last_download_of_each_url(tmp_path):
+    with ValidatorCache(tmp_path / "validators.sqlite") as cache:
+        assert cache.get(URL) is None
+        cache.put(cached(etag=None))
+        cache.put(cached())
+
+    with ValidatorCache(tmp_path / "validators.sqlite") as cache:
+        assert cache.get(URL) == cached()
+    assert cached().conditional_headers() == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Thu, 13 May 2021 16:55:48 GMT"}
+    assert cached(etag=None, last_modified=None).conditional_headers() == {}
+
+
+def test_caches_without_file_names_are_upgraded(tmp_path):
+    location = tmp_path / "validators.sqlite"
+    with sqlite3.connect(str(location)) as connection:
+        connection.execute(
+            "CREATE TABLE validators (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+            "content_length INTEGER NOT NULL, content_sha256 TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        connection.execute("INSERT INTO validators VALUES (?, ?, ?, ?, ?, ?)", (*cached()[:5], "2021-05-13"))
+    connection.close()
+
+    with ValidatorCache(location) as cache:
+        assert cache.get(URL) == cached(file_name=None)
+        cache.put(cached())
+        assert cache.get(URL) == cached()
+
+
+class ExampleSpider(GCSpider):
+    name = "example_spider"
+    dont_filter_previous_hashes = True
+
+
+class ExamplePipeline(FileDownloadPipeline):
+    """Scrapy releases after the 2.6 the project pins made these MediaPipeline methods abstract, the pipeline
+    doesn't use them"""
+
+    def file_path(self, request, response=None, info=None, *, item=None):
+        raise NotImplementedError
+
+    def media_to_download(self, request, info, *, item=None):
+        return None
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    spider = ExampleSpider(download_output_dir=str(tmp_path / "out"),
+                           validator_cache_location=str(tmp_path / "validators.sqlite"))
+    (tmp_path / "out").mkdir()
+    spider.crawler = get_crawler(ExampleSpider)
+    spider.crawler.spider = spider
+    # MediaPipeline's constructor differs between Scrapy releases and sets nothing these tests use
+    pipeline = ExamplePipeline.__new__(ExamplePipeline)
+    pipeline.crawler = spider.crawler
+    pipeline.open_spider(spider)
+    pipeline.spider = spider
+    yield pipeline
+    pipeline.close_spider(spider)
+
+
+class Info:
+    def __init__(self, spider):
+        self.spider = spider
+
+
+def download(pipeline, status, body=b"", headers=None, item=VALID_ITEM):
+    info = Info(pipeline.spider)
+    request = next(iter(pipeline.get_media_requests(dict(item), info)))
+    response = Response(URL, status=status, body=body, headers=headers, request=request)
+    result = pipeline.media_downloaded(response, request, info)
+    return request, result
+
+
+def test_unchanged_downloads_are_written_as_metadata_only(pipeline):
+    # first download, cached once written
+    request, result = download(pipeline, 200, BODY, {"ETag": '"v1"'})
+    assert "If-None-Match" not in request.headers
+    pipeline.write_item_files([(True, result)], dict(VALID_ITEM))
+    pdf = pipeline.output_dir / f"{VALID_ITEM['doc_name']}.pdf"
+    assert pdf.read_bytes() == BODY
+    pdf.unlink()
+
+    # not modified
+    request, result = download(pipeline, 304)
+    assert request.headers["If-None-Match"] == b'"v1"'
+    okay, downloaded, _ = result
+    assert okay and downloaded.unchanged and downloaded.path is None
+    pipeline.write_item_files([(True, result)], dict(VALID_ITEM, doc_title="Reworded"))
+
+    # the server ignores the conditional request but sends the same bytes
+    _, result = download(pipeline, 200, BODY)
+    assert result[1].unchanged
+    assert not [p for p in pipeline.output_dir.iterdir() if p.suffix in (".pdf", ".part")]
+
+    metadata = json.loads(pipeline.output_dir.joinpath(f"{VALID_ITEM['doc_name']}.pdf.metadata").read_text())
+    assert metadata["doc_title"] == "Reworded"
+    pipeline.manifest_writer.flush()
+    records = [json.loads(line) for line in pipeline.job_manifest_path.read_text().splitlines()]
+    assert "content_reference" not in records[0]
+    assert records[1]["content_reference"] and records[1]["content_sha256"] == cached().content_sha256
+
+    stats = pipeline.spider.crawler.stats
+    assert stats.get_value("validator_cache/conditional_requests") == 2
+    assert stats.get_value("validator_cache/not_modified") == 1
+    assert stats.get_value("validator_cache/unchanged_content") == 1
+
+
+def test_changed_content_is_downloaded_and_cached(pipeline):
+    pipeline.validator_cache.put(cached())
+
+    _, result = download(pipeline, 200, b"%PDF-1.7 changed")
+    assert not result[1].unchanged
+    pipeline.write_item_files([(True, result)], dict(VALID_ITEM))
+
+    assert pipeline.validator_cache.get(URL) == cached(b"%PDF-1.7 changed", etag=None, last_modified=None)
+
+
+@pytest.mark.parametrize("status, body", [(304, b""), (200, BODY)])
+def test_renamed_documents_are_written_again(pipeline, status, body):
+    # an earlier run shipped the file under the document's old name
+    pipeline.validator_cache.put(cached(file_name="AFI 1-1 Old Title.pdf"))
+
+    # a 304 can't come back without a conditional request, the server sends the body
+    request, result = download(pipeline, 200, BODY)
+    assert "If-None-Match" not in request.headers
+    okay, downloaded, _ = result
+    assert okay and not downloaded.unchanged
+    pipeline.write_item_files([(True, result)], dict(VALID_ITEM))
+
+    assert pipeline.output_dir.joinpath(FILE_NAME).read_bytes() == BODY
+    assert pipeline.validator_cache.get(URL) == cached(etag=None, last_modified=None)
+    assert pipeline.spider.crawler.stats.get_value("validator_cache/renamed") == 1
+
+    # under its new name the file is left out again
+    request, result = download(pipeline, status, body)
+    assert result[1].unchanged
+    renamed_item = dict(VALID_ITEM, doc_name="AFI 1-1 New Title")
+    request, result = download(pipeline, 200, BODY, item=renamed_item)
+    assert not result[1].unchanged
+    pipeline.write_item_files([(True, result)], renamed_item)
+    assert pipeline.output_dir.joinpath("AFI 1-1 New Title.pdf").read_bytes() == BODY
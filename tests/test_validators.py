@@ -0,0 +1,118 @@
+import copy
+
+import pytest
+from jsonschema import Draft7Validator, ValidationError
+
+from dataPipelines.gc_scrapy.gc_scrapy import INPUT_SPEC_PATH, OUTPUT_SPEC_PATH
+from dataPipelines.gc_scrapy.gc_scrapy.validators import (
+    CompiledSchema, DefaultOutputSchemaValidator, UnsupportedSchema, compiled_validator, load_schema
+)
+
+VALID_ITEM = {
+    "doc_name": "AFI 1-1",
+    "doc_title": "Air Force Standards",
+    "doc_num": "1-1",
+    "doc_type": "AFI",
+    "display_doc_type": "Instruction",
+    "display_org": "Dept. of the Air Force",
+    "display_source": "Air Force Publications",
+    "display_title": "AFI 1-1 Air Force Standards",
+    "data_source": "Air Force Publications",
+    "source_title": "Air Force Publications",
+    "file_ext": "pdf",
+    "publication_date": None,
+    "cac_login_required": False,
+    "crawler_used": "air_force_pubs",
+    "is_revoked": False,
+    "source_page_url": "https://www.e-publishing.af.mil/Product-Index/",
+    "source_fqdn": "www.e-publishing.af.mil",
+    "download_url": "https://static.e-publishing.af.mil/afi1-1.pdf",
+    "downloadable_items": [
+        {"doc_type": "pdf", "download_url": "https://static.e-publishing.af.mil/afi1-1.pdf", "compression_type": None},
+        {"doc_type": "zip", "download_url": "http://example.local/afi1-1.zip", "compression_type": "zip"},
+    ],
+    "version_hash_raw_data": {"item_currency": "afi1-1.pdf"},
+    "version_hash": "65fbca1fcdf0c7f5a2fdb01710398281a206c333dba8dd4a0d96cfe6bb06e2b6",
+    "access_timestamp": "2021-05-13T16:55:48.734478",
+}
+
+
+def changed(path, value):
+    item = copy.deepcopy(VALID_ITEM)
+    target = item
+    for key in path[:-1]:
+        target = target[key]
+    if value is KeyError:
+        del target[path[-1]]
+    else:
+        target[path[-1]] = value
+    return item
+
+
+INVALID_ITEMS = [
+    changed(["doc_name"], ""),
+    changed(["doc_name"], KeyError),
+    changed(["doc_num"], None),
+    changed(["publication_date"], 20200101),
+    changed(["cac_login_required"], 0),
+    changed(["source_page_url"], "ftp://example.local/page"),
+    changed(["source_page_url"], "https://example.local/a page"),
+    changed(["access_timestamp"], "2021-05-13"),
+    changed(["downloadable_items"], []),
+    changed(["downloadable_items"], ({"doc_type": "pdf"},)),
+    changed(["downloadable_items", 0, "compression_type"], "rar"),
+    changed(["downloadable_items", 0, "compression_type"], False),
+    changed(["downloadable_items", 1, "doc_type"], "p df"),
+    changed(["downloadable_items", 1, "download_url"], "example.local/afi1-1.zip"),
+    changed(["downloadable_items", 1, "compression_type"], KeyError),
+    changed(["downloadable_items", 1], "https://example.local/afi1-1.zip"),
+    changed(["version_hash_raw_data"], []),
+    ["not", "an", "object"],
+]
+
+
+def test_output_schema_compiles():
+    assert isinstance(compiled_validator(OUTPUT_SPEC_PATH), CompiledSchema)
+    assert isinstance(compiled_validator(INPUT_SPEC_PATH), (CompiledSchema, Draft7Validator))
+    assert compiled_validator(OUTPUT_SPEC_PATH) is DefaultOutputSchemaValidator().validator
+
+
+@pytest.mark.parametrize("instance", [VALID_ITEM, changed(["publication_date"], "2021-05-13"),
+                                      changed(["access_timestamp"], "at 2021-05-13T16:55:48")])
+def test_compiled_schema_accepts_what_jsonschema_accepts(instance):
+    assert Draft7Validator(load_schema(OUTPUT_SPEC_PATH)).is_valid(instance)
+    assert compiled_validator(OUTPUT_SPEC_PATH).is_valid(instance)
+    DefaultOutputSchemaValidator().validate_dict(instance)
+
+
+@pytest.mark.parametrize("instance", INVALID_ITEMS)
+def test_compiled_schema_errors_match_jsonschema(instance):
+    with pytest.raises(ValidationError) as expected:
+        Draft7Validator(load_schema(OUTPUT_SPEC_PATH)).validate(instance)
+
+    assert not compiled_validator(OUTPUT_SPEC_PATH).is_valid(instance)
+    with pytest.raises(ValidationError) as raised:
+        DefaultOutputSchemaValidator().validate_dict(instance)
+    assert str(raised.value) == str(expected.value)
+
+
+def test_recursive_refs_and_json_equality():
+    schema = {
+        "definitions": {"node": {"type": "object", "properties": {"children": {
+            "type": "array", "items": {"$ref": "#/definitions/node"}}}}},
+        "properties": {"root": {"$ref": "#/definitions/node"}, "flag": {"enum": [1, None]},
+                       "count": {"type": "integer"}},
+    }
+    compiled = CompiledSchema(schema)
+    draft7 = Draft7Validator(schema)
+    for instance in [
+        {"root": {"children": [{"children": []}, {"children": [{}]}]}},
+        {"root": {"children": [{"children": [1]}]}},
+        {"flag": True}, {"flag": 1}, {"count": 2.0}, {"count": True}, {"count": 2.5},
+    ]:
+        assert compiled.is_valid(instance) == draft7.is_valid(instance), instance
+
+
+def test_unsupported_keywords_are_not_compiled():
+    with pytest.raises(UnsupportedSchema):
+        CompiledSchema({"properties": {"a": {"anyOf": [{"type": "string"}, {"type": "null"}]}}})